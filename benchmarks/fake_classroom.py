@@ -0,0 +1,110 @@
+"""
+In-memory stand-in for the Classroom API client, for benchmarks.
+
+Supports the calls import_course makes (courses create/list/get/patch,
+topics, courseWork and courseWorkMaterials create/list), returns the same
+response shapes, and counts calls, so the importer's own overhead can be
+measured without network or credentials.
+"""
+
+import itertools
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+class _Request:
+    def __init__(self, service, name, fn):
+        self.service = service
+        self.name = name
+        self.fn = fn
+
+    def execute(self, num_retries=0):
+        self.service.calls[self.name] += 1
+        return self.fn()
+
+class _Items:
+    def __init__(self, service, kind, id_key, list_key):
+        self.service = service
+        self.kind = kind
+        self.id_key = id_key
+        self.list_key = list_key
+
+    def create(self, courseId, body):
+        def create():
+            item = dict(body, courseId=courseId, updateTime=self.service.now())
+            item[self.id_key] = self.service.new_id()
+            self.service.items.setdefault((self.kind, courseId), []).append(item)
+            return item
+        return _Request(self.service, f'{self.kind}.create', create)
+
+    def list(self, courseId, pageSize=None, pageToken=None, **kwargs):
+        def list_page():
+            items = self.service.items.get((self.kind, courseId), [])
+            start, size = int(pageToken or 0), pageSize or 100
+            page = {self.list_key: items[start:start + size]}
+            if start + size < len(items):
+                page['nextPageToken'] = str(start + size)
+            return page
+        return _Request(self.service, f'{self.kind}.list', list_page)
+
+class _Courses:
+    def __init__(self, service):
+        self.service = service
+
+    def _find(self, id):
+        return next(c for c in self.service.courses_data if c['id'] == id)
+
+    def create(self, body):
+        def create():
+            course = dict(body, id=self.service.new_id(), updateTime=self.service.now())
+            course['alternateLink'] = f"https://classroom.google.com/c/{course['id']}"
+            self.service.courses_data.append(course)
+            return course
+        return _Request(self.service, 'courses.create', create)
+
+    def get(self, id, **kwargs):
+        return _Request(self.service, 'courses.get', lambda: self._find(id))
+
+    def patch(self, id, body, updateMask=None, **kwargs):
+        def patch():
+            course = self._find(id)
+            course.update(body, updateTime=self.service.now())
+            return course
+        return _Request(self.service, 'courses.patch', patch)
+
+    def list(self, pageSize=None, pageToken=None, **kwargs):
+        def list_page():
+            start, size = int(pageToken or 0), pageSize or 100
+            page = {'courses': self.service.courses_data[start:start + size]}
+            if start + size < len(self.service.courses_data):
+                page['nextPageToken'] = str(start + size)
+            return page
+        return _Request(self.service, 'courses.list', list_page)
+
+    def topics(self):
+        return _Items(self.service, 'topics', 'topicId', 'topic')
+
+    def courseWork(self):
+        return _Items(self.service, 'courseWork', 'id', 'courseWork')
+
+    def courseWorkMaterials(self):
+        return _Items(self.service, 'courseWorkMaterials', 'id', 'courseWorkMaterial')
+
+class FakeClassroomService:
+    def __init__(self):
+        self.courses_data = []
+        self.items = {}
+        self.calls = Counter()
+        self._ids = itertools.count(1000)
+        self._lock = threading.Lock()
+
+    def new_id(self):
+        with self._lock:
+            return str(next(self._ids))
+
+    @staticmethod
+    def now():
+        return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+    def courses(self):
+        return _Courses(self)
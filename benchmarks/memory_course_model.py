@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: course JSON as nested dicts vs the slotted course model.
+
+Loads the same batch of cloned courses (as separate JSON documents, like
+many files in class_data/imports) both ways and reports the memory each
+representation keeps alive, measured with tracemalloc.
+
+    python benchmarks/memory_course_model.py [--courses N] [--topics N] [--items N]
+"""
+
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'core'))
+
+from course_model import Course
+
+ACTIVITY_TYPES = ['page', 'forum', 'resource', 'url']
+
+def synthetic_course_json(cohort, topics, items):
+    """One cohort's copy of a course: same topics and titles, small descriptions"""
+    course = {'course_name': f"Pathway 4 - Cohort {cohort}", 'topics': []}
+    for t in range(topics):
+        topic = {'name': f"Week {t + 1}: Data Modeling", 'assignments': [], 'activities': []}
+        for i in range(items):
+            title = f"Exercise {t + 1}.{i + 1}"
+            description = f"<p>Complete exercise {t + 1}.{i + 1} and submit your work.</p>"
+            if i % 2:
+                topic['assignments'].append({'title': title, 'description': description})
+            else:
+                topic['activities'].append({'title': title, 'description': description,
+                                            'type': ACTIVITY_TYPES[i % len(ACTIVITY_TYPES)]})
+        course['topics'].append(topic)
+    return json.dumps(course)
+
+def retained_bytes(load, documents):
+    """Bytes still allocated after loading every document with load"""
+    gc.collect()
+    tracemalloc.start()
+    loaded = [load(document) for document in documents]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    return current
+
+def main():
+    args = sys.argv[1:]
+
+    def option(flag, default):
+        return int(args[args.index(flag) + 1]) if flag in args[:-1] else default
+
+    courses = option('--courses', 50)
+    topics = option('--topics', 20)
+    items = option('--items', 25)
+    documents = [synthetic_course_json(c, topics, items) for c in range(courses)]
+
+    as_dicts = retained_bytes(json.loads, documents)
+    as_model = retained_bytes(lambda document: Course.from_dict(json.loads(document)), documents)
+
+    print(f"📊 {courses} courses x {topics} topics x {items} items")
+    print(f"  dicts:         {as_dicts / 1e6:8.1f} MB")
+    print(f"  course model:  {as_model / 1e6:8.1f} MB  ({1 - as_model / as_dicts:.0%} less)")
+
+if __name__ == '__main__':
+    main()
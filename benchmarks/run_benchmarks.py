@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmarks: times each stage of the Moodle -> Classroom pipeline on
+small, medium and huge synthetic courses (see src/core/synthetic_mbz.py),
+stores the results as JSON, and compares them against a baseline.
+
+Stages:
+    parse_mbz                    backup -> Course
+    convert_html_for_classroom   every description
+    html_to_markdown             every description
+    sanitize_topic_name          every topic name and item title
+    export_course_to_markdown    Course -> fresh markdown folder
+    import_markdown_to_course    markdown folder -> Course (import cache off)
+    import_course                course JSON -> FakeClassroomService
+
+Usage (record a baseline with --save-baseline first; timings are machine-specific,
+so none is committed):
+    python benchmarks/run_benchmarks.py run [--sizes small,medium,huge] [--stages a,b]
+                                            [--repeat N] [--output FILE] [--save-baseline]
+    python benchmarks/run_benchmarks.py compare [results.json] [--baseline FILE] [--threshold 0.25]
+    python benchmarks/run_benchmarks.py check [run options] [--threshold 0.25]
+
+`compare` and `check` exit with status 1 when a stage's best time is more
+than threshold slower than the baseline's (and by more than MIN_DELTA
+seconds, so sub-millisecond noise doesn't count).
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'src', 'core'))
+
+from synthetic_mbz import generate_mbz
+from mbz_to_json import parse_mbz
+from course_model import as_jsonable
+from moodle_json_to_google_classroom import convert_html_for_classroom, sanitize_topic_name, import_course
+from moodle_to_markdown import html_to_markdown, export_course_to_markdown, import_markdown_to_course
+from fake_classroom import FakeClassroomService
+
+RESULTS_PATH = os.path.join(BENCHMARKS_DIR, 'results', 'latest.json')
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+THRESHOLD = 0.25
+MIN_DELTA = 0.005
+
+SIZES = {
+    'small': {'sections': 5, 'activities': 50},
+    'medium': {'sections': 20, 'activities': 1000},
+    'huge': {'sections': 60, 'activities': 10000},
+}
+REPEAT = {'small': 5, 'medium': 3, 'huge': 1}
+STAGES = ['parse_mbz', 'convert_html_for_classroom', 'html_to_markdown', 'sanitize_topic_name',
+          'export_course_to_markdown', 'import_markdown_to_course', 'import_course']
+
+def _items(course):
+    for topic in course.topics:
+        yield from topic.assignments
+        yield from topic.activities
+
+class Inputs:
+    """Everything a size's stages read, generated once (untimed) in the working directory"""
+
+    def __init__(self, size):
+        self.size = size
+        self.mbz = f"{size}.mbz"
+        generate_mbz(self.mbz, archive_format='tar.gz', seed=0, **SIZES[size])
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.course = parse_mbz(self.mbz)
+        self.descriptions = [item.description for item in _items(self.course)]
+        self.names = [topic.name for topic in self.course.topics] + [item.title for item in _items(self.course)]
+        self.json_path = f"{size}.json"
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.course, f, ensure_ascii=False, default=as_jsonable)
+        self.markdown_dir = f"{size}-markdown"
+        with contextlib.redirect_stdout(io.StringIO()):
+            export_course_to_markdown(self.course, self.markdown_dir)
+        self.runs = 0
+
+    def fresh_dir(self):
+        self.runs += 1
+        return f"{self.size}-export-{self.runs}"
+
+def stage_function(stage, inputs):
+    """A no-argument callable running stage once over inputs"""
+    if stage == 'parse_mbz':
+        return lambda: parse_mbz(inputs.mbz)
+    if stage == 'convert_html_for_classroom':
+        return lambda: [convert_html_for_classroom(d) for d in inputs.descriptions]
+    if stage == 'html_to_markdown':
+        return lambda: [html_to_markdown(d) for d in inputs.descriptions]
+    if stage == 'sanitize_topic_name':
+        return lambda: [sanitize_topic_name(n) for n in inputs.names]
+    if stage == 'export_course_to_markdown':
+        return lambda: export_course_to_markdown(inputs.course, inputs.fresh_dir())
+    if stage == 'import_markdown_to_course':
+        return lambda: import_markdown_to_course(inputs.markdown_dir, use_cache=False)
+    if stage == 'import_course':
+        return lambda: import_course(inputs.json_path, service=FakeClassroomService())
+    raise ValueError(f"Unknown stage '{stage}' (known: {', '.join(STAGES)})")
+
+def time_stage(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': statistics.median(times), 'repeat': repeat}
+
+def run(sizes, stages, repeat=None):
+    """{size: {stage: timing}}, measured in a scratch directory"""
+    workdir = tempfile.mkdtemp(prefix='classroom-bench-')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    results = {}
+    try:
+        for size in sizes:
+            print(f"📦 {size}: {SIZES[size]['activities']} activities in {SIZES[size]['sections']} sections")
+            inputs = Inputs(size)
+            results[size] = {}
+            for stage in stages:
+                timing = time_stage(stage_function(stage, inputs), repeat or REPEAT[size])
+                results[size][stage] = timing
+                print(f"  ⏱️  {stage:<28} {timing['min'] * 1000:10.1f} ms (median {timing['median'] * 1000:.1f} ms)")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    document = {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"💾 Results saved to {path}")
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['results']
+
+def missing(path, what):
+    """Print why path can't be compared against; True if it is missing"""
+    if os.path.exists(path):
+        return False
+    if what == 'baseline':
+        print(f"❌ No baseline at {path}; record one first with:")
+        print("   python benchmarks/run_benchmarks.py run --save-baseline")
+    else:
+        print(f"❌ No results at {path}; run the benchmarks first (python benchmarks/run_benchmarks.py run)")
+    return True
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """Print stage-by-stage changes; returns the list of regressions"""
+    regressions = []
+    for size, stages in current.items():
+        for stage, timing in stages.items():
+            before = baseline.get(size, {}).get(stage)
+            if before is None:
+                continue
+            ratio = timing['min'] / before['min'] if before['min'] else 1.0
+            delta = timing['min'] - before['min']
+            if ratio > 1 + threshold and delta > MIN_DELTA:
+                mark = '❌'
+                regressions.append((size, stage, ratio))
+            elif ratio < 1 - threshold and -delta > MIN_DELTA:
+                mark = '🚀'
+            else:
+                mark = '✅'
+            print(f"  {mark} {size:<7} {stage:<28} {before['min'] * 1000:10.1f} ms -> "
+                  f"{timing['min'] * 1000:10.1f} ms ({ratio - 1:+.0%})")
+    return regressions
+
+def report(regressions, threshold):
+    if regressions:
+        print(f"\n❌ {len(regressions)} stage(s) regressed by more than {threshold:.0%}")
+        return 1
+    print(f"\n✅ No stage regressed by more than {threshold:.0%}")
+    return 0
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ('run', 'compare', 'check'):
+        print(__doc__[__doc__.index('Usage'):__doc__.index('`compare`')].rstrip())
+        return 1
+    command = args[0]
+
+    def option(flag, default, cast=str):
+        return cast(args[args.index(flag) + 1]) if flag in args[:-1] else default
+
+    threshold = option('--threshold', THRESHOLD, float)
+    baseline_path = option('--baseline', BASELINE_PATH)
+
+    if command == 'compare':
+        positional = [a for i, a in enumerate(args[1:], 1) if not a.startswith('--') and not args[i - 1].startswith('--')]
+        current_path = positional[0] if positional else RESULTS_PATH
+        if missing(baseline_path, 'baseline') or missing(current_path, 'results'):
+            return 1
+        print(f"📊 {current_path} vs {baseline_path}")
+        return report(compare(load_results(current_path), load_results(baseline_path), threshold), threshold)
+
+    sizes = option('--sizes', ','.join(SIZES)).split(',')
+    stages = option('--stages', ','.join(STAGES)).split(',')
+    for size in sizes:
+        if size not in SIZES:
+            print(f"❌ Unknown size '{size}' (known: {', '.join(SIZES)})")
+            return 1
+    for stage in stages:
+        if stage not in STAGES:
+            print(f"❌ Unknown stage '{stage}' (known: {', '.join(STAGES)})")
+            return 1
+
+    if command == 'check' and '--save-baseline' not in args and missing(baseline_path, 'baseline'):
+        return 1
+    results = run(sizes, stages, option('--repeat', None, int))
+    save_results(results, option('--output', RESULTS_PATH))
+    if '--save-baseline' in args:
+        save_results(results, baseline_path)
+    if command == 'check':
+        print(f"\n📊 Compared with {baseline_path}")
+        return report(compare(results, load_results(baseline_path), threshold), threshold)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,6 +6,7 @@ A command-line interface for converting Moodle courses to Google Classroom.
 
 import sys
 import os
+import shlex
 from pathlib import Path
 
 def print_usage():
@@ -17,16 +18,49 @@ USAGE:
   python cli.py <command> [options]
 
 COMMANDS:
-  convert <mbz_file>                    Convert Moodle backup to JSON
-  import <json_file>                    Import JSON to Google Classroom
-  export <json_file> [output_dir]       Export JSON to markdown format
-  import-md <markdown_dir>              Import markdown back to JSON
-  list-courses                          List all created courses
+  convert <mbz_file> [--attachments] [--clean]
+                                        Convert Moodle backup to JSON (--attachments: store
+                                        embedded files; --clean: strip Word/editor markup)
+  import <json_file> [--account NAME]   Import JSON to Google Classroom
+  import <json_file> --copies N | --cohorts "A,B"
+                                        Import one course as several courses in parallel
+  migrate <mbz_file> [--json] [--no-verify]
+                                        Convert, import and verify in one step
+  plan <json_file> [--unordered]        Compile JSON into an operation plan
+  plan <show|diff> <plan_file>...       Inspect or compare plans
+  apply <plan_file> [--concurrency N] [--batch-size N] [--retries N]
+                                        Execute (or resume) a plan
+  estimate <file>... [--concurrency N]  Project API calls, quota and run time
+  export <json_file> [output_dir] [--archive]
+                                        Export JSON to markdown (--archive: one .zip/.tar.gz)
+  import-md <markdown_dir|archive> [--watch]
+                                        Import markdown back to JSON (--watch keeps it in sync)
+  index                                 Update the search index of imports and exports
+  descriptions <dedupe|inflate> <json>... | status
+                                        Share identical descriptions between course files
+  search <query> [--kind K] [--courses] Search course, topic and item text
+  list-courses [--state S] [--teacher ID] [--search TEXT] [--refresh] [--no-local]
+                                        List courses (from the local mirror)
   archive <course_id>                   Archive a course
   delete <course_id>                    Delete a course
   restore <course_id>                   Restore an archived course
-  verify <course_id>                    Verify course import status
+  bulk <archive|restore|delete> [--name PATTERN] [--older-than DAYS]
+       [--state S] [--where KEY=PATTERN] [--dry-run] [--yes]
+                                        Change many courses at once
+  verify <course_id> [--source FILE]    Verify a course against its source JSON
+  verify --all                          Verify every recorded course in parallel
+  snapshot <course_id> [--output FILE]  Save a live course back to course JSON
+  enqueue <file>... [--no-chain]        Queue .mbz/.json files for batch migration
+  workers <N> [--forever]               Process queued jobs with N workers
+  status [--jobs]                       Show job queue progress
+  daemon <start|stop|status>            Manage the warm background daemon
+  daemon <convert|import|verify|list> [arg]
+                                        Run a job on the running daemon
   auth                                  Manage authentication
+  accounts [list|login <name>]          Manage the owner account pool
+  mirror [sync [--full]|status]         Refresh or inspect the local Classroom mirror
+  pool <fill|maintain|cleanup|status> [N]
+                                        Manage pre-provisioned courses
 
 EXAMPLES:
   # Convert Moodle backup to JSON
@@ -35,12 +69,19 @@ EXAMPLES:
   # Import to Google Classroom
   python cli.py import class_data/imports/course.json
 
+  # Convert, import and verify without intermediate files
+  python cli.py migrate temp_data/backup.mbz
+
   # Export to markdown
   python cli.py export class_data/imports/course.json
 
   # Import markdown back to JSON
   python cli.py import-md class_data/exports/course-folder/
 
+  # Find every course with an assignment mentioning a topic
+  python cli.py index
+  python cli.py search "entity relationship" --kind assignment --courses
+
   # List all courses
   python cli.py list-courses
 
@@ -50,6 +91,10 @@ EXAMPLES:
   # Verify import
   python cli.py verify 123456789
 
+  # Migrate a whole directory of backups unattended
+  python cli.py enqueue backups/*.mbz
+  python cli.py workers 4
+
 WORKFLOW:
   1. Convert Moodle backup: convert <mbz_file>
   2. Import to Classroom: import <json_file>
@@ -70,8 +115,9 @@ def run_command(command, args):
             print(f"❌ Error: MBZ file not found: {mbz_file}")
             return 1
         
+        options = "".join(f" {flag}" for flag in ('--attachments', '--clean') if flag in args)
         print(f"🔄 Converting {mbz_file} to JSON...")
-        os.system(f"python src/core/mbz_to_json.py {mbz_file}")
+        os.system(f"python src/core/mbz_to_json.py {shlex.quote(mbz_file)}{options}")
         return 0
     
     elif command == 'import':
@@ -84,8 +130,29 @@ def run_command(command, args):
             print(f"❌ Error: JSON file not found: {json_file}")
             return 1
         
+        options = []
+        for flag in ('--account', '--copies', '--cohorts'):
+            if flag in args and args.index(flag) + 1 < len(args):
+                options += [flag, shlex.quote(args[args.index(flag) + 1])]
+        options = " ".join(options)
+        
         print(f"🔄 Importing {json_file} to Google Classroom...")
-        os.system(f"python src/core/moodle_json_to_google_classroom.py {json_file}")
+        os.system(f"python src/core/moodle_json_to_google_classroom.py {shlex.quote(json_file)} {options}")
+        return 0
+    
+    elif command == 'migrate':
+        if len(args) < 1:
+            print("❌ Error: Please provide an MBZ file path")
+            return 1
+        
+        mbz_file = args[0]
+        if not os.path.exists(mbz_file):
+            print(f"❌ Error: MBZ file not found: {mbz_file}")
+            return 1
+        
+        options = " ".join(a for a in args[1:] if a in ('--json', '--no-verify'))
+        print(f"🚚 Migrating {mbz_file} to Google Classroom...")
+        os.system(f"python src/core/migrate.py {shlex.quote(mbz_file)} {options}")
         return 0
     
     elif command == 'export':
@@ -94,15 +161,17 @@ def run_command(command, args):
             return 1
         
         json_file = args[0]
-        output_dir = args[1] if len(args) > 1 else None
+        output_dir = next((a for a in args[1:] if a != '--archive'), None)
         
         if not os.path.exists(json_file):
             print(f"❌ Error: JSON file not found: {json_file}")
             return 1
         
-        cmd = f"python src/core/moodle_to_markdown.py export {json_file}"
+        cmd = f"python src/core/moodle_to_markdown.py export {shlex.quote(json_file)}"
         if output_dir:
-            cmd += f" {output_dir}"
+            cmd += f" {shlex.quote(output_dir)}"
+        if '--archive' in args:
+            cmd += " --archive"
         
         print(f"🔄 Exporting {json_file} to markdown...")
         os.system(cmd)
@@ -118,13 +187,34 @@ def run_command(command, args):
             print(f"❌ Error: Markdown directory not found: {markdown_dir}")
             return 1
         
+        options = " ".join(shlex.quote(a) for a in args[1:])
         print(f"🔄 Importing markdown from {markdown_dir}...")
-        os.system(f"python src/core/moodle_to_markdown.py import {markdown_dir}")
+        os.system(f"python src/core/moodle_to_markdown.py import {shlex.quote(markdown_dir)} {options}")
+        return 0
+    
+    elif command == 'index':
+        os.system("python src/core/search_index.py index")
+        return 0
+    
+    elif command == 'search':
+        if len(args) < 1:
+            print("❌ Error: Please provide a search query")
+            return 1
+        
+        os.system("python src/core/search_index.py search " + " ".join(shlex.quote(a) for a in args))
+        return 0
+    
+    elif command == 'descriptions':
+        if len(args) < 1:
+            print("❌ Error: Please provide dedupe, inflate or status")
+            return 1
+        
+        os.system("python src/core/description_store.py " + " ".join(shlex.quote(a) for a in args))
         return 0
     
     elif command == 'list-courses':
         print("📋 Listing all courses...")
-        os.system("python src/core/manage_courses.py list")
+        os.system("python src/core/manage_courses.py list " + " ".join(shlex.quote(a) for a in args))
         return 0
     
     elif command == 'archive':
@@ -134,7 +224,7 @@ def run_command(command, args):
         
         course_id = args[0]
         print(f"📦 Archiving course {course_id}...")
-        os.system(f"python src/core/manage_courses.py archive {course_id}")
+        os.system(f"python src/core/manage_courses.py archive {shlex.quote(course_id)}")
         return 0
     
     elif command == 'delete':
@@ -144,7 +234,7 @@ def run_command(command, args):
         
         course_id = args[0]
         print(f"🗑️  Deleting course {course_id}...")
-        os.system(f"python src/core/manage_courses.py delete {course_id}")
+        os.system(f"python src/core/manage_courses.py delete {shlex.quote(course_id)}")
         return 0
     
     elif command == 'restore':
@@ -154,17 +244,106 @@ def run_command(command, args):
         
         course_id = args[0]
         print(f"🔄 Restoring course {course_id}...")
-        os.system(f"python src/core/manage_courses.py restore {course_id}")
+        os.system(f"python src/core/manage_courses.py restore {shlex.quote(course_id)}")
+        return 0
+    
+    elif command == 'bulk':
+        if len(args) < 1:
+            print("❌ Error: Please provide an action (archive, restore, delete)")
+            return 1
+        
+        print(f"📦 Bulk {args[0]}...")
+        os.system("python src/core/manage_courses.py bulk " + " ".join(shlex.quote(a) for a in args))
         return 0
     
     elif command == 'verify':
+        if len(args) < 1:
+            print("❌ Error: Please provide a course ID or --all")
+            return 1
+        
+        if args[0] == '--all':
+            print("✅ Verifying all recorded courses...")
+        else:
+            print(f"✅ Verifying course {args[0]}...")
+        os.system("python src/core/verify_import.py " + " ".join(shlex.quote(a) for a in args))
+        return 0
+    
+    elif command == 'plan':
+        if len(args) < 1:
+            print("❌ Error: Please provide a JSON file path")
+            return 1
+        
+        if args[0] not in ('show', 'diff'):
+            args = ['compile'] + args
+        os.system("python src/core/plan.py " + " ".join(shlex.quote(a) for a in args))
+        return 0
+    
+    elif command == 'apply':
+        if len(args) < 1:
+            print("❌ Error: Please provide a plan file")
+            return 1
+        
+        os.system("python src/core/plan.py apply " + " ".join(shlex.quote(a) for a in args))
+        return 0
+    
+    elif command == 'estimate':
+        if len(args) < 1:
+            print("❌ Error: Please provide at least one JSON or MBZ file")
+            return 1
+        
+        os.system("python src/core/estimate.py " + " ".join(shlex.quote(a) for a in args))
+        return 0
+    
+    elif command == 'snapshot':
         if len(args) < 1:
             print("❌ Error: Please provide a course ID")
             return 1
         
-        course_id = args[0]
-        print(f"✅ Verifying course {course_id}...")
-        os.system(f"python src/core/verify_import.py {course_id}")
+        print(f"📸 Snapshotting course {args[0]}...")
+        os.system("python src/core/snapshot.py " + " ".join(shlex.quote(a) for a in args))
+        return 0
+    
+    elif command == 'enqueue':
+        if len(args) < 1:
+            print("❌ Error: Please provide at least one MBZ or JSON file")
+            return 1
+        
+        os.system("python src/core/job_queue.py enqueue " + " ".join(shlex.quote(a) for a in args))
+        return 0
+    
+    elif command == 'workers':
+        count = args[0] if args else "1"
+        if not count.isdigit():
+            print("❌ Error: Please provide the number of workers")
+            return 1
+        
+        options = " ".join(a for a in args[1:] if a == '--forever')
+        print(f"👷 Starting {count} worker(s)...")
+        os.system(f"python src/core/job_queue.py workers {count} {options}")
+        return 0
+    
+    elif command == 'status':
+        options = " ".join(a for a in args if a == '--jobs')
+        os.system(f"python src/core/job_queue.py status {options}")
+        return 0
+    
+    elif command == 'daemon':
+        if len(args) < 1:
+            print("❌ Error: Please provide a daemon command (start, stop, status, convert, import, verify, list)")
+            return 1
+        
+        return os.system("python src/core/daemon_client.py " + " ".join(shlex.quote(a) for a in args)) and 1
+    
+    elif command == 'accounts':
+        os.system("python src/core/accounts.py " + (" ".join(shlex.quote(a) for a in args) if args else "list"))
+        return 0
+    
+    elif command == 'pool':
+        os.system("python src/core/course_pool.py " + (" ".join(shlex.quote(a) for a in args) if args else "status"))
+        return 0
+    
+    elif command == 'mirror':
+        os.system("python src/core/mirror.py " + (" ".join(shlex.quote(a) for a in args) if args else "status"))
         return 0
     
     elif command == 'auth':
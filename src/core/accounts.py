@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Account Pool
+Spreads Classroom traffic over several owner accounts so per-user quotas
+don't cap migration throughput.
+
+Accounts are listed in accounts.json (next to credentials.json):
+
+    {
+      "accounts": [
+        {"name": "teacher-a", "token_file": "temp_data/tokens/teacher-a.pickle",
+         "requests_per_minute": 600},
+        {"name": "teacher-b", "service_account_file": "keys/migration-sa.json",
+         "subject": "teacher-b@school.edu", "requests_per_minute": 600, "weight": 2}
+      ]
+    }
+
+OAuth accounts keep their own token pickle (log in with
+`python accounts.py login <name>`); service accounts use domain-wide
+delegation to act as `subject`. Without accounts.json the pool holds a
+single "default" account backed by temp_data/token.pickle.
+
+Each account has its own rate budget and client pool. New courses go to
+the least-loaded account, and later operations on a course use the account
+that owns it (recorded as `owner` in class_data/courses.json).
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from auth_cache import SCOPES, TOKEN_PATH, get_cached_credentials, get_shared_credentials
+from rate_limit import TokenBucket
+from transport import ClassroomClientPool, POOL_SIZE
+
+ACCOUNTS_FILE = 'accounts.json'
+DEFAULT_ACCOUNT = 'default'
+DEFAULT_REQUESTS_PER_MINUTE = 600
+
+def load_account_credentials(entry):
+    """Credentials for one accounts.json entry"""
+    if entry.get('service_account_file'):
+        from google.oauth2 import service_account
+        creds = service_account.Credentials.from_service_account_file(
+            entry['service_account_file'], scopes=SCOPES
+        )
+        if entry.get('subject'):
+            creds = creds.with_subject(entry['subject'])
+        return creds
+    return get_shared_credentials(entry.get('token_file', TOKEN_PATH))
+
+class Account:
+    """One owner identity with its own credentials, rate budget and clients"""
+
+    def __init__(self, name, credentials, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+                 weight=1, pool_size=POOL_SIZE):
+        self.name = name
+        self.credentials = credentials
+        self.weight = weight
+        self.limiter = TokenBucket.per_minute(requests_per_minute)
+        self.clients = ClassroomClientPool(credentials, size=pool_size, limiter=self.limiter)
+        # Scheduler bookkeeping (guarded by the pool's lock)
+        self.active = 0
+        self.assigned = 0
+
+class AccountPool:
+    """Hands out accounts to callers and schedules new courses onto owners"""
+
+    def __init__(self, accounts):
+        if not accounts:
+            raise ValueError("An account pool needs at least one account")
+        self.accounts = {account.name: account for account in accounts}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, path=ACCOUNTS_FILE, pool_size=POOL_SIZE):
+        """Load accounts.json, or fall back to the single cached login"""
+        if not os.path.exists(path):
+            return cls([Account(DEFAULT_ACCOUNT, get_shared_credentials(), pool_size=pool_size)])
+
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        accounts = []
+        for entry in config.get('accounts', []):
+            accounts.append(Account(
+                entry['name'],
+                load_account_credentials(entry),
+                requests_per_minute=entry.get('requests_per_minute', DEFAULT_REQUESTS_PER_MINUTE),
+                weight=entry.get('weight', 1),
+                pool_size=entry.get('pool_size', pool_size),
+            ))
+        return cls(accounts)
+
+    @property
+    def default(self):
+        return next(iter(self.accounts.values()))
+
+    def get(self, name):
+        """The named account, or the default one if name is empty"""
+        if not name:
+            return self.default
+        if name not in self.accounts:
+            raise ValueError(f"Unknown account: {name} (configured: {', '.join(self.accounts)})")
+        return self.accounts[name]
+
+    def for_owner(self, owner):
+        """
+        The account recorded as owner of a course, plan or pooled course; the
+        default one for records written before accounts were configured
+        """
+        return self.accounts.get(owner) or self.default
+
+    def for_course(self, course_id):
+        """The account that owns course_id according to the local registry"""
+        # manage_courses imports this module, so its registry helpers are imported here
+        from manage_courses import load_course_records
+        owner = next((record.get('owner') for record in load_course_records()['courses']
+                      if record['id'] == course_id), None)
+        return self.for_owner(owner)
+
+    @contextmanager
+    def checkout(self):
+        """Pick the least-loaded account (relative to its weight) for a new course"""
+        with self._lock:
+            account = min(
+                self.accounts.values(),
+                key=lambda a: (a.active / a.weight, a.assigned / a.weight)
+            )
+            account.active += 1
+            account.assigned += 1
+        try:
+            yield account
+        finally:
+            with self._lock:
+                account.active -= 1
+
+    def close(self):
+        for account in self.accounts.values():
+            account.clients.close()
+
+def list_accounts(path=ACCOUNTS_FILE):
+    if not os.path.exists(path):
+        print(f"ℹ️  No {path}; using the single cached login (temp_data/token.pickle)")
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f).get('accounts', [])
+
+    from manage_courses import load_course_records
+    owned = {}
+    for record in load_course_records()['courses']:
+        owned[record.get('owner')] = owned.get(record.get('owner'), 0) + 1
+
+    print(f"👥 Accounts ({len(entries)}):")
+    print("=" * 50)
+    for entry in entries:
+        kind = 'service account' if entry.get('service_account_file') else 'oauth'
+        print(f"👤 {entry['name']} ({kind})")
+        if entry.get('subject'):
+            print(f"   Acting as: {entry['subject']}")
+        print(f"   Budget: {entry.get('requests_per_minute', DEFAULT_REQUESTS_PER_MINUTE)} requests/min, "
+              f"weight {entry.get('weight', 1)}")
+        print(f"   Courses owned: {owned.get(entry['name'], 0)}")
+
+def login(name, path=ACCOUNTS_FILE):
+    """Run the browser login for an OAuth account and cache its token"""
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = {e['name']: e for e in json.load(f).get('accounts', [])}
+    entry = entries.get(name)
+    if not entry:
+        print(f"❌ Unknown account: {name}")
+        return
+    if entry.get('service_account_file'):
+        print(f"ℹ️  {name} is a service account; no login needed")
+        return
+    get_cached_credentials(entry.get('token_file', TOKEN_PATH))
+    print(f"✅ {name} is logged in")
+
+def main():
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage:")
+        print("  python accounts.py list            # Show configured accounts")
+        print("  python accounts.py login <name>    # Log in an OAuth account")
+        return
+
+    command = sys.argv[1].lower()
+    if command == 'list':
+        list_accounts()
+    elif command == 'login':
+        if len(sys.argv) < 3:
+            print("❌ Please provide an account name")
+            return
+        login(sys.argv[2])
+    else:
+        print(f"❌ Unknown command: {command}")
+
+if __name__ == '__main__':
+    main()
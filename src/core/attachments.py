@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Attachment Store
+Moodle descriptions embed files as @@PLUGINFILE@@/name.png links. The
+backup lists every file in files.xml (keyed by context, component, file
+area and path) and keeps the bytes in files/<xx>/<contenthash>.
+
+With attachments enabled, parse_mbz:
+- reads files.xml into an index,
+- streams the blobs that activity descriptions can reference out of the
+  archive into a content-addressed store (class_data/attachments), keyed by
+  Moodle's contenthash, so a file shared by many courses is stored once,
+- and rewrites @@PLUGINFILE@@ links to the file's published location.
+
+Publishing goes through a pluggable uploader, and each blob is uploaded once
+per uploader (recorded in uploads.json in the store). The built-in 'local'
+uploader copies files into the store's published/ folder and links to them
+with file:// URLs; it stands in for a real host (Drive, a web server, ...)
+in tests. Register others with register_uploader() and select them with
+CLASSROOM_ATTACHMENT_UPLOADER.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tarfile
+import threading
+import zipfile
+from pathlib import Path
+from urllib.parse import unquote
+from lxml import etree
+from file_lock import file_lock
+
+STORE_DIR = 'class_data/attachments'
+UPLOADER = os.environ.get('CLASSROOM_ATTACHMENT_UPLOADER', 'local')
+PLUGINFILE = '@@PLUGINFILE@@'
+# Descriptions come from each activity's intro
+DESCRIPTION_AREA = 'intro'
+COPY_CHUNK = 1024 * 1024
+
+# @@PLUGINFILE@@/path/name.png, optionally with ?query, inside an attribute or text
+_PLUGINFILE_LINK = re.compile(re.escape(PLUGINFILE) + r'(/[^"\'\s<>?#]*)(?:\?[^"\'\s<>#]*)?')
+
+def _member_name(name):
+    return name[2:] if name.startswith('./') else name
+
+def read_files_index(tmpdir):
+    """{(contextid, component, filearea, filepath, filename): file entry} from files.xml"""
+    files_xml = os.path.join(tmpdir, 'files.xml')
+    if not os.path.exists(files_xml):
+        return {}
+    index = {}
+    for file in etree.parse(files_xml).getroot().iter('file'):
+        filename = file.findtext('filename')
+        if not filename or filename == '.':
+            continue  # Directory entries
+        entry = {
+            'contenthash': file.findtext('contenthash'),
+            'filename': filename,
+            'mimetype': file.findtext('mimetype') or 'application/octet-stream',
+            'filesize': int(file.findtext('filesize') or 0),
+        }
+        key = (file.findtext('contextid'), file.findtext('component'), file.findtext('filearea'),
+               file.findtext('filepath') or '/', filename)
+        index[key] = entry
+    return index
+
+def load_uploads(uploads_file):
+    """{uploader name: {contenthash: URL}}"""
+    if not os.path.exists(uploads_file):
+        return {}
+    with open(uploads_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+class LocalUploader:
+    """Publishes into a local folder; a stand-in for a real upload target"""
+    name = 'local'
+
+    def __init__(self, root=None):
+        self.root = Path(root or os.path.join(STORE_DIR, 'published'))
+
+    def upload(self, blob_path, entry):
+        target = self.root / entry['contenthash'][:12] / entry['filename']
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not target.exists():
+            shutil.copyfile(blob_path, target)
+        return target.resolve().as_uri()
+
+UPLOADERS = {'local': LocalUploader}
+
+def register_uploader(name, factory):
+    """factory() returns an object with .name and .upload(blob_path, entry) -> URL"""
+    UPLOADERS[name] = factory
+
+def get_uploader(name=None):
+    name = name or UPLOADER
+    if name not in UPLOADERS:
+        raise ValueError(f"Unknown attachment uploader: {name} (known: {', '.join(UPLOADERS)})")
+    return UPLOADERS[name]()
+
+class AttachmentStore:
+    """Content-addressed blobs, shared by every course, plus where each was uploaded"""
+
+    def __init__(self, store_dir=STORE_DIR, uploader=None):
+        self.store_dir = Path(store_dir)
+        self.uploader = uploader or get_uploader()
+        self.uploads_file = self.store_dir / 'uploads.json'
+        self._lock = threading.Lock()
+        self._uploads = None
+
+    def blob_path(self, contenthash):
+        return self.store_dir / contenthash[:2] / contenthash
+
+    def has(self, contenthash):
+        return self.blob_path(contenthash).exists()
+
+    def put(self, contenthash, fileobj):
+        """Stream fileobj into the store; returns False if its SHA-1 isn't contenthash"""
+        path = self.blob_path(contenthash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{contenthash}.{os.getpid()}.{threading.get_ident()}.tmp")
+        digest = hashlib.sha1()
+        with open(tmp_path, 'wb') as out:
+            while True:
+                chunk = fileobj.read(COPY_CHUNK)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        if digest.hexdigest() != contenthash:
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, path)
+        return True
+
+    def location(self, entry):
+        """URL of entry's blob, uploading it the first time this uploader sees it"""
+        contenthash = entry['contenthash']
+        with self._lock:
+            if self._uploads is None:
+                self._uploads = load_uploads(self.uploads_file)
+            url = self._uploads.get(self.uploader.name, {}).get(contenthash)
+            if url:
+                return url
+            url = self.uploader.upload(self.blob_path(contenthash), entry)
+            # Merge with uploads other processes recorded meanwhile
+            with file_lock(str(self.uploads_file)):
+                self._uploads = load_uploads(self.uploads_file)
+                self._uploads.setdefault(self.uploader.name, {})[contenthash] = url
+                tmp_path = self.uploads_file.with_name(f"uploads.json.{os.getpid()}.tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._uploads, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.uploads_file)
+            return url
+
+class BackupAttachments:
+    """The files of one backup, resolved against an AttachmentStore"""
+
+    def __init__(self, mbz_path, tmpdir, store):
+        self.mbz_path = mbz_path
+        self.store = store
+        self.index = read_files_index(tmpdir)
+        self.stats = {'files': 0, 'stored': 0, 'reused': 0, 'links': 0, 'unresolved': 0}
+
+    def collect(self):
+        """Stream the blobs descriptions can reference into the store, in one pass over the archive"""
+        wanted = {e['contenthash'] for key, e in self.index.items() if key[2] == DESCRIPTION_AREA}
+        self.stats['files'] = len(wanted)
+        needed = {f"files/{h[:2]}/{h}": h for h in wanted if not self.store.has(h)}
+        self.stats['reused'] = len(wanted) - len(needed)
+        if not needed:
+            return
+        if zipfile.is_zipfile(self.mbz_path):
+            with zipfile.ZipFile(self.mbz_path) as archive:
+                for name in archive.namelist():
+                    contenthash = needed.get(_member_name(name))
+                    if contenthash:
+                        with archive.open(name) as blob:
+                            self._put(contenthash, blob)
+        else:
+            with tarfile.open(self.mbz_path, 'r') as archive:
+                for member in archive:
+                    contenthash = needed.get(_member_name(member.name))
+                    if contenthash and member.isfile():
+                        self._put(contenthash, archive.extractfile(member))
+
+    def _put(self, contenthash, fileobj):
+        if self.store.put(contenthash, fileobj):
+            self.stats['stored'] += 1
+        else:
+            print(f"⚠️  Attachment {contenthash} does not match its hash; links to it are left as they are")
+
+    def rewrite(self, html, contextid, component):
+        """html with its @@PLUGINFILE@@ links pointing at published files"""
+        if not html or PLUGINFILE not in html:
+            return html
+
+        def replace(match):
+            path = unquote(match.group(1))
+            filepath, _, filename = path.rpartition('/')
+            entry = self.index.get((contextid, component, DESCRIPTION_AREA, filepath + '/', filename))
+            if entry is None or not self.store.has(entry['contenthash']):
+                self.stats['unresolved'] += 1
+                return match.group(0)
+            self.stats['links'] += 1
+            return self.store.location(entry)
+
+        return _PLUGINFILE_LINK.sub(replace, html)
+
+    def summary(self):
+        s = self.stats
+        return (f"📎 Attachments: {s['files']} files ({s['stored']} stored, {s['reused']} already in store), "
+                f"{s['links']} links rewritten" + (f", {s['unresolved']} unresolved" if s['unresolved'] else ""))
+
+if __name__ == '__main__':
+    import sys
+
+    args = sys.argv[1:]
+    if not args or args[0] != 'status':
+        print("Usage: python attachments.py status    # Show what the attachment store holds")
+        sys.exit(1)
+    store = Path(STORE_DIR)
+    blobs = [p for p in store.glob('??/*') if p.is_file() and not p.name.endswith('.tmp')]
+    print(f"📎 {len(blobs)} blobs, {sum(p.stat().st_size for p in blobs) / 1e6:.1f} MB in {STORE_DIR}")
+    for name, urls in load_uploads(store / 'uploads.json').items():
+        print(f"  ⬆️  {name}: {len(urls)} uploaded")
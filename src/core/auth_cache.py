@@ -1,9 +1,13 @@
 import os
 import json
 import pickle
+import tempfile
+import threading
+from datetime import datetime, timezone
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from file_lock import file_lock
 
 # Setup OAuth
 SCOPES = [
@@ -13,78 +17,193 @@ SCOPES = [
     'https://www.googleapis.com/auth/classroom.coursework.students'
 ]
 
-def get_cached_credentials():
+# The file token.pickle stores the user's access and refresh tokens
+TOKEN_PATH = 'temp_data/token.pickle'
+
+# Refresh this long before the access token expires
+REFRESH_MARGIN_SECONDS = 300
+# Wait this long before retrying a failed background refresh
+REFRESH_RETRY_SECONDS = 60
+
+def token_file_lock(token_path=TOKEN_PATH):
+    """Exclusive cross-process lock guarding reads and writes of token_path"""
+    return file_lock(token_path)
+
+def _load_token(token_path):
+    if not os.path.exists(token_path):
+        return None
+    with open(token_path, 'rb') as token:
+        return pickle.load(token)
+
+def _save_token(creds, token_path):
+    """Write the pickle atomically so readers never see a partial file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(token_path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as token:
+            pickle.dump(creds, token)
+        os.replace(tmp_path, token_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def seconds_until_expiry(creds):
+    """Seconds left on the access token (None if it has no known expiry)"""
+    if not creds or not creds.expiry:
+        return None
+    # google-auth keeps expiry as a naive UTC datetime
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return (creds.expiry - now).total_seconds()
+
+def get_cached_credentials(token_path=TOKEN_PATH):
     """Get cached credentials or authenticate if needed"""
     creds = None
     
     # Ensure temp_data directory exists
-    os.makedirs('temp_data', exist_ok=True)
+    os.makedirs(os.path.dirname(token_path) or '.', exist_ok=True)
     
-    # The file token.pickle stores the user's access and refresh tokens
-    token_path = 'temp_data/token.pickle'
-    
-    # Load existing credentials if available
-    if os.path.exists(token_path):
+    # Hold the lock for the whole load/refresh/save so concurrent processes
+    # refresh at most once and never read a half-written pickle
+    with token_file_lock(token_path):
+        # Load existing credentials if available
         try:
-            with open(token_path, 'rb') as token:
-                creds = pickle.load(token)
-            print("🔑 Using cached credentials")
+            creds = _load_token(token_path)
+            if creds:
+                print("🔑 Using cached credentials")
         except Exception as e:
             print(f"⚠️  Error loading cached credentials: {e}")
             creds = None
-    
-    # If there are no (valid) credentials available, let the user log in
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+        
+        # If there are no (valid) credentials available, let the user log in
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                try:
+                    creds.refresh(Request())
+                    print("🔄 Refreshed expired credentials")
+                except Exception as e:
+                    print(f"⚠️  Error refreshing credentials: {e}")
+                    creds = None
+            
+            if not creds:
+                print("🔐 Authenticating with Google...")
+                flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
+                creds = flow.run_local_server(port=0)
+                print("✅ Authentication successful")
+            
+            # Save the credentials for the next run
             try:
-                creds.refresh(Request())
-                print("🔄 Refreshed expired credentials")
+                _save_token(creds, token_path)
+                print("💾 Credentials cached for future use")
             except Exception as e:
-                print(f"⚠️  Error refreshing credentials: {e}")
-                creds = None
-        
-        if not creds:
-            print("🔐 Authenticating with Google...")
-            flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-            print("✅ Authentication successful")
-        
-        # Save the credentials for the next run
-        try:
-            with open(token_path, 'wb') as token:
-                pickle.dump(creds, token)
-            print("💾 Credentials cached for future use")
-        except Exception as e:
-            print(f"⚠️  Error saving credentials: {e}")
+                print(f"⚠️  Error saving credentials: {e}")
     
     return creds
 
+class CredentialManager:
+    """
+    One in-memory credentials object shared by every thread of a process.
+    
+    A background thread refreshes the access token REFRESH_MARGIN_SECONDS
+    before it expires, so long batch runs never hit an expired token. The
+    refresh takes the token file lock and first re-reads the cache: if another
+    process already refreshed, its token is adopted instead of refreshing
+    again. The shared object is updated in place, so clients built from it
+    pick up the new token without being rebuilt.
+    """
+
+    def __init__(self, token_path=TOKEN_PATH, refresh_margin=REFRESH_MARGIN_SECONDS):
+        self.token_path = token_path
+        self.refresh_margin = refresh_margin
+        self.credentials = get_cached_credentials(token_path)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """Refresh now (or adopt a fresher token another process cached)"""
+        with self._lock, token_file_lock(self.token_path):
+            try:
+                cached = _load_token(self.token_path)
+            except Exception:
+                cached = None
+            cached_left = seconds_until_expiry(cached)
+            if cached and cached.token and cached_left and cached_left > self.refresh_margin:
+                self.credentials.token = cached.token
+                self.credentials.expiry = cached.expiry
+                return
+            
+            self.credentials.refresh(Request())
+            _save_token(self.credentials, self.token_path)
+            print("🔄 Refreshed credentials ahead of expiry")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            left = seconds_until_expiry(self.credentials)
+            wait = REFRESH_RETRY_SECONDS if left is None else max(left - self.refresh_margin, 0)
+            if self._stopped.wait(wait):
+                return
+            if left is None:
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️  Background credential refresh failed: {e}")
+                self._stopped.wait(REFRESH_RETRY_SECONDS)
+
+    def start(self):
+        if self._thread is None and self.credentials.refresh_token:
+            self._thread = threading.Thread(target=self._run, name='credential-refresh', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+def get_credential_manager(token_path=TOKEN_PATH):
+    """The process-wide, auto-refreshing manager for token_path"""
+    with _managers_lock:
+        if token_path not in _managers:
+            _managers[token_path] = CredentialManager(token_path).start()
+        return _managers[token_path]
+
+def get_shared_credentials(token_path=TOKEN_PATH):
+    """Credentials kept fresh in the background; safe to share across threads"""
+    return get_credential_manager(token_path).credentials
+
 def clear_cached_credentials():
     """Clear cached credentials"""
-    token_path = 'temp_data/token.pickle'
-    if os.path.exists(token_path):
-        os.remove(token_path)
-        print("🗑️  Cached credentials cleared")
-    else:
-        print("ℹ️  No cached credentials found")
+    with token_file_lock(TOKEN_PATH):
+        if os.path.exists(TOKEN_PATH):
+            os.remove(TOKEN_PATH)
+            print("🗑️  Cached credentials cleared")
+        else:
+            print("ℹ️  No cached credentials found")
 
 def get_credential_info():
     """Get information about cached credentials"""
-    token_path = 'temp_data/token.pickle'
+    token_path = TOKEN_PATH
     
     if not os.path.exists(token_path):
         print("ℹ️  No cached credentials found")
         return None
     
     try:
-        with open(token_path, 'rb') as token:
-            creds = pickle.load(token)
+        with token_file_lock(token_path):
+            creds = _load_token(token_path)
         
         print("🔑 Cached Credentials Info:")
         print(f"  Valid: {creds.valid}")
         print(f"  Expired: {creds.expired}")
         print(f"  Has refresh token: {creds.refresh_token is not None}")
         print(f"  Scopes: {creds.scopes}")
+        left = seconds_until_expiry(creds)
+        if left is not None:
+            print(f"  Expires in: {int(left)}s")
         
         return creds
     except Exception as e:
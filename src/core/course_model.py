@@ -0,0 +1,131 @@
+"""
+Course Model
+Compact in-memory representation of course JSON (Course, Topic, Assignment,
+Activity) shared by the parser, importer and exporters.
+
+Objects use __slots__ instead of a per-object dict, and short strings that
+repeat across items and courses (activity types, topic names, titles) are
+interned, so batch runs over many courses hold one copy of each. Attribute
+names match the course JSON keys, and objects also answer item access
+(topic['name'], activity.get('type')), so code written against the JSON
+dicts keeps working.
+
+Adapters at the edges:
+- Course.from_dict / load_course read course JSON into the model, resolving
+  description references (see description_store.py)
+- to_dict / as_jsonable (json.dump default=) turn it back into plain JSON
+"""
+
+import json
+import sys
+from description_store import resolve
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+class _Model:
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def __eq__(self, other):
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return type(self) is type(other) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f"{s}={getattr(self, s)!r}" for s in self.__slots__ if s not in ('topics', 'assignments', 'activities'))
+        return f"{type(self).__name__}({fields})"
+
+class Assignment(_Model):
+    __slots__ = ('title', 'description')
+
+    def __init__(self, title, description=''):
+        self.title = _intern(title)
+        self.description = description
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('title', ''), resolve(data.get('description', '')))
+
+    def to_dict(self):
+        return {'title': self.title, 'description': self.description}
+
+class Activity(_Model):
+    """Any non-assignment Moodle activity (page, forum, resource, ...)"""
+    __slots__ = ('title', 'description', 'type')
+
+    def __init__(self, title, description='', type='activity'):
+        self.title = _intern(title)
+        self.description = description
+        self.type = _intern(type)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('title', ''), resolve(data.get('description', '')), data.get('type', 'activity'))
+
+    def to_dict(self):
+        return {'title': self.title, 'description': self.description, 'type': self.type}
+
+class Topic(_Model):
+    __slots__ = ('name', 'assignments', 'activities')
+
+    def __init__(self, name, assignments=None, activities=None):
+        self.name = _intern(name)
+        self.assignments = assignments if assignments is not None else []
+        self.activities = activities if activities is not None else []
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('name', ''),
+                   [Assignment.from_dict(a) for a in data.get('assignments', [])],
+                   [Activity.from_dict(a) for a in data.get('activities', [])])
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'assignments': [a.to_dict() for a in self.assignments],
+            'activities': [a.to_dict() for a in self.activities],
+        }
+
+class Course(_Model):
+    __slots__ = ('course_name', 'topics')
+
+    def __init__(self, course_name, topics=None):
+        self.course_name = _intern(course_name)
+        self.topics = topics if topics is not None else []
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('course_name'), [Topic.from_dict(t) for t in data.get('topics', [])])
+
+    def to_dict(self):
+        return {'course_name': self.course_name, 'topics': [t.to_dict() for t in self.topics]}
+
+def as_course(course_data):
+    """Course for either a Course or a course JSON dict"""
+    return course_data if isinstance(course_data, Course) else Course.from_dict(course_data)
+
+def as_jsonable(obj):
+    """json.dump(..., default=as_jsonable) writes model objects as course JSON"""
+    if isinstance(obj, _Model):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def load_course(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return Course.from_dict(json.load(f))
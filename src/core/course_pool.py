@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Course Pool
+Keeps a few empty PROVISIONED courses ready, so imports rename one
+instead of waiting for courses.create.
+
+Ready courses are tracked in temp_data/course_pool.db. Claims are
+transactional, so many workers can draw from the pool at once. A pooled
+course can only be used by the account that owns it. Ready courses older
+than POOL_MAX_AGE_DAYS are deleted and replaced.
+
+The pool is optional: `python course_pool.py maintain` (or the daemon, when
+CLASSROOM_COURSE_POOL_SIZE is set) keeps it filled, and imports fall back to
+creating courses whenever it is empty.
+"""
+
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from googleapiclient.errors import HttpError
+from mirror import get_mirror
+
+POOL_DB = 'temp_data/course_pool.db'
+POOL_SIZE = int(os.environ.get('CLASSROOM_COURSE_POOL_SIZE', '0'))
+POOL_MAX_AGE_DAYS = 7
+MAINTAIN_INTERVAL_SECONDS = 60
+PLACEHOLDER_NAME = 'Migration placeholder'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pool_courses (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    claimed_at REAL
+);
+"""
+
+def connect(db_path=POOL_DB):
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+def _max_age_seconds():
+    return POOL_MAX_AGE_DAYS * 86400
+
+def claim(owner, db_path=POOL_DB):
+    """Take the oldest fresh ready course owned by owner; returns its ID or None"""
+    if not os.path.exists(db_path):
+        return None
+    conn = connect(db_path)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute(
+            """SELECT id FROM pool_courses
+               WHERE owner = ? AND claimed_at IS NULL AND created_at > ?
+               ORDER BY created_at LIMIT 1""",
+            (owner, time.time() - _max_age_seconds())
+        ).fetchone()
+        if row:
+            conn.execute('UPDATE pool_courses SET claimed_at = ? WHERE id = ?', (time.time(), row['id']))
+        conn.execute('COMMIT')
+        return row['id'] if row else None
+    finally:
+        conn.close()
+
+def release(course_id, db_path=POOL_DB):
+    """Forget a pooled course (claimed and used, or gone from Classroom)"""
+    conn = connect(db_path)
+    try:
+        conn.execute('DELETE FROM pool_courses WHERE id = ?', (course_id,))
+    finally:
+        conn.close()
+
+def unclaim(course_id, db_path=POOL_DB):
+    """Put a claimed course back in the pool (its rename did not happen)"""
+    conn = connect(db_path)
+    try:
+        conn.execute('UPDATE pool_courses SET claimed_at = NULL WHERE id = ?', (course_id,))
+    finally:
+        conn.close()
+
+def claim_course(service, body, account='default'):
+    """
+    Rename a pooled course to body's name/section/description. Returns the
+    course ID, or None if the pool has nothing usable for this account.
+    """
+    while True:
+        course_id = claim(account)
+        if course_id is None:
+            return None
+        try:
+            course = service.courses().patch(
+                id=course_id,
+                updateMask='name,section,description',
+                body={key: body[key] for key in ('name', 'section', 'description')}
+            ).execute()
+        except Exception as e:
+            if isinstance(e, HttpError) and e.resp.status in (403, 404):
+                # Deleted or no longer ours; drop it and try the next one
+                release(course_id)
+                continue
+            # Anything else (429, 5xx, a timeout): the import fails, and the
+            # still-empty course goes back in the pool for the next one
+            unclaim(course_id)
+            raise
+        release(course_id)
+        get_mirror().record_course(course, account)
+        return course_id
+
+def _create_placeholder(service, account):
+    body = {
+        'name': f"{PLACEHOLDER_NAME} {secrets.token_hex(4)}",
+        'section': 'Reserved for migration',
+        'courseState': 'PROVISIONED',
+        'ownerId': 'me',
+    }
+    course = service.courses().create(body=body).execute()
+    get_mirror().record_course(course, account)
+    return course['id']
+
+def fill(accounts, target=POOL_SIZE, db_path=POOL_DB):
+    """Create placeholder courses until target are ready, spread over the accounts"""
+    conn = connect(db_path)
+    try:
+        ready = conn.execute(
+            'SELECT COUNT(*) FROM pool_courses WHERE claimed_at IS NULL AND created_at > ?',
+            (time.time() - _max_age_seconds(),)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    missing = max(0, target - ready)
+    if not missing:
+        return 0
+
+    def create_one(_):
+        with accounts.checkout() as account, account.clients.client() as service:
+            course_id = _create_placeholder(service, account.name)
+        conn = connect(db_path)
+        try:
+            conn.execute('INSERT INTO pool_courses (id, owner, created_at) VALUES (?, ?, ?)',
+                         (course_id, account.name, time.time()))
+        finally:
+            conn.close()
+        return course_id
+
+    with ThreadPoolExecutor(max_workers=min(missing, 4)) as executor:
+        created = list(executor.map(create_one, range(missing)))
+    return len(created)
+
+def cleanup(accounts, db_path=POOL_DB):
+    """Delete ready courses past their age limit; returns how many were removed"""
+    conn = connect(db_path)
+    try:
+        stale = conn.execute(
+            'SELECT id, owner FROM pool_courses WHERE claimed_at IS NULL AND created_at <= ?',
+            (time.time() - _max_age_seconds(),)
+        ).fetchall()
+        # Claims that never finished (an import that crashed mid-rename)
+        abandoned = conn.execute(
+            'SELECT id, owner FROM pool_courses WHERE claimed_at IS NOT NULL AND claimed_at <= ?',
+            (time.time() - 86400,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    for row in abandoned:
+        # Still a placeholder: the rename never happened, so the course goes back
+        # in the pool (and is deleted below once stale). Renamed: it is in use.
+        with accounts.for_owner(row['owner']).clients.client() as service:
+            try:
+                course = service.courses().get(id=row['id']).execute()
+            except HttpError as e:
+                if e.resp.status != 404:
+                    print(f"⚠️  Could not check pooled course {row['id']}: {e}")
+                    continue
+                course = None
+        if course and course.get('name', '').startswith(PLACEHOLDER_NAME):
+            unclaim(row['id'], db_path)
+        else:
+            release(row['id'], db_path)
+
+    removed = 0
+    for row in stale:
+        with accounts.for_owner(row['owner']).clients.client() as service:
+            try:
+                service.courses().delete(id=row['id']).execute()
+            except HttpError as e:
+                if e.resp.status != 404:
+                    print(f"⚠️  Could not delete pooled course {row['id']}: {e}")
+                    continue
+        release(row['id'], db_path)
+        get_mirror().forget_courses([row['id']])
+        removed += 1
+    return removed
+
+def maintain(accounts, target=POOL_SIZE, interval=MAINTAIN_INTERVAL_SECONDS, stop=None):
+    """Keep the pool filled until stop is set"""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            removed = cleanup(accounts)
+            created = fill(accounts, target)
+            if removed or created:
+                print(f"🏊 Course pool: {created} created, {removed} stale removed")
+        except Exception as e:
+            print(f"⚠️  Course pool maintenance failed: {e}")
+        stop.wait(interval)
+
+def print_status(db_path=POOL_DB):
+    if not os.path.exists(db_path):
+        print("ℹ️  The course pool is empty")
+        return
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            """SELECT owner, SUM(claimed_at IS NULL AND created_at > ?) AS ready,
+                      SUM(claimed_at IS NULL AND created_at <= ?) AS stale,
+                      SUM(claimed_at IS NOT NULL) AS claiming
+               FROM pool_courses GROUP BY owner""",
+            (time.time() - _max_age_seconds(),) * 2
+        ).fetchall()
+    finally:
+        conn.close()
+    print("🏊 Course Pool:")
+    for row in rows:
+        print(f"  👤 {row['owner']}: {row['ready']} ready, {row['stale']} stale, {row['claiming']} being claimed")
+
+def main():
+    import sys
+    from accounts import AccountPool
+
+    args = sys.argv[1:]
+    if not args:
+        print("Usage:")
+        print("  python course_pool.py fill [N]                       # Create courses until N are ready")
+        print("  python course_pool.py maintain [N] [--interval S]    # Keep N ready, checking every S seconds")
+        print("  python course_pool.py cleanup                        # Delete stale pooled courses")
+        print("  python course_pool.py status                         # Show the pool")
+        return
+
+    command = args[0].lower()
+    target = int(args[1]) if len(args) > 1 and args[1].isdigit() else max(POOL_SIZE, 1)
+
+    if command == 'status':
+        print_status()
+        return
+
+    accounts = AccountPool.from_config()
+    try:
+        if command == 'fill':
+            print(f"✅ Created {fill(accounts, target)} pooled course(s)")
+        elif command == 'cleanup':
+            print(f"🧹 Removed {cleanup(accounts)} stale pooled course(s)")
+        elif command == 'maintain':
+            interval = int(args[args.index('--interval') + 1]) if '--interval' in args[:-1] else MAINTAIN_INTERVAL_SECONDS
+            print(f"🏊 Keeping {target} course(s) ready (Ctrl+C to stop)")
+            try:
+                maintain(accounts, target, interval)
+            except KeyboardInterrupt:
+                pass
+        else:
+            print(f"❌ Unknown command: {command}")
+    finally:
+        accounts.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Classroom Daemon
+Keeps credentials and a Classroom client warm and serves convert/import/
+verify/list jobs over a localhost HTTP API, so scripts that call it only
+pay for the API requests themselves.
+
+Use daemon_client.py (or any HTTP client) to talk to it.
+"""
+
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from accounts import AccountPool
+from course_pool import POOL_SIZE, maintain
+from mbz_to_json import parse_mbz, write_json, write_json_to_imports
+from moodle_json_to_google_classroom import import_course
+from mirror import get_mirror
+from verify_import import check_course, has_differences
+
+STATE_FILE = 'temp_data/daemon.json'
+DEFAULT_PORT = int(os.environ.get('CLASSROOM_DAEMON_PORT', '8765'))
+
+class ClassroomDaemon:
+    """Warm state shared by every request handled by the daemon"""
+
+    def __init__(self):
+        # Credentials are refreshed in the background for as long as the daemon
+        # runs; request handlers run on their own threads and check out clients
+        self.accounts = AccountPool.from_config()
+        # Build the first client up front so the first request doesn't pay for it
+        with self.accounts.default.clients.client():
+            pass
+        # Keep pre-provisioned courses ready when CLASSROOM_COURSE_POOL_SIZE is set
+        self.stopping = threading.Event()
+        if POOL_SIZE:
+            threading.Thread(target=maintain, args=(self.accounts, POOL_SIZE),
+                             kwargs={'stop': self.stopping}, daemon=True).start()
+        self.started_at = time.time()
+        self.jobs_served = 0
+        self._counter_lock = threading.Lock()
+
+    def run_job(self, command, args):
+        if command == 'convert':
+            course_data = parse_mbz(args['path'])
+            output_path = write_json_to_imports(course_data, course_data['course_name'])
+            write_json(course_data)
+            return {'json_path': str(output_path), 'course_name': course_data['course_name']}
+
+        if command == 'import':
+            with self.accounts.checkout() as account, account.clients.client() as service:
+                return import_course(args['path'], service=service, owner=account.name)
+        if command == 'verify':
+            # Item-by-item comparison with the source JSON, like `verify` and the job queue
+            report = check_course(self.accounts.for_course(args['course_id']).clients, args['course_id'])
+            return dict(report, ok=not has_differences(report))
+        if command == 'list':
+            courses = []
+            for account in self.accounts.accounts.values():
+                with account.clients.client() as service:
+                    courses += [
+                        {'id': c['id'], 'name': c.get('name'), 'courseState': c.get('courseState'),
+                         'owner': account.name}
+                        for c in get_mirror().courses(service, account.name, refresh=bool(args.get('refresh')))
+                    ]
+            return {'courses': courses}
+
+        raise ValueError(f"Unknown command: {command}")
+
+    def job_finished(self):
+        with self._counter_lock:
+            self.jobs_served += 1
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'jobs_served': self.jobs_served,
+            'accounts': {
+                name: {'credentials_valid': bool(a.credentials.valid), 'pool_size': a.clients.size}
+                for name, a in self.accounts.accounts.items()
+            },
+        }
+
+def make_handler(daemon, token, server_ref):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _authorized(self):
+            # Constant-time comparison, so response timing doesn't leak the token
+            if hmac.compare_digest(self.headers.get('X-Daemon-Token', '').encode('utf-8'), token.encode('utf-8')):
+                return True
+            self._reply(403, {'error': 'missing or invalid X-Daemon-Token'})
+            return False
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            if self.path == '/health':
+                self._reply(200, daemon.health())
+            else:
+                self._reply(404, {'error': f'unknown path {self.path}'})
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            if self.path == '/shutdown':
+                self._reply(200, {'status': 'stopping'})
+                threading.Thread(target=server_ref[0].shutdown, daemon=True).start()
+                return
+            if self.path != '/jobs':
+                self._reply(404, {'error': f'unknown path {self.path}'})
+                return
+
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                started = time.time()
+                result = daemon.run_job(request.get('command'), request.get('args', {}))
+                daemon.job_finished()
+                self._reply(200, {'result': result, 'seconds': round(time.time() - started, 3)})
+            except Exception as e:
+                self._reply(500, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            print(f"🌐 {self.address_string()} {format % args}")
+
+    return Handler
+
+def serve(port=DEFAULT_PORT):
+    """Run the daemon in the foreground on 127.0.0.1:port"""
+    print("🔥 Warming up credentials and Classroom client...")
+    daemon = ClassroomDaemon()
+    token = secrets.token_urlsafe(24)
+    server_ref = []
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(daemon, token, server_ref))
+    server_ref.append(server)
+
+    # Clients find the port and token here; the file is only readable by us
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    fd = os.open(STATE_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'port': server.server_address[1], 'token': token, 'pid': os.getpid()}, f)
+
+    print(f"✅ Daemon listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.stopping.set()
+        daemon.accounts.close()
+        if os.path.exists(STATE_FILE):
+            os.remove(STATE_FILE)
+        print("⏹️  Daemon stopped")
+
+if __name__ == '__main__':
+    import sys
+
+    port = DEFAULT_PORT
+    if '--port' in sys.argv:
+        port = int(sys.argv[sys.argv.index('--port') + 1])
+    serve(port)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Daemon Client
+Talks to a running daemon.py over localhost HTTP. Deliberately uses only the
+standard library so each call starts fast.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+import urllib.error
+
+STATE_FILE = 'temp_data/daemon.json'
+START_TIMEOUT_SECONDS = 60
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return None
+    with open(STATE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def request(method, path, payload=None, state=None):
+    """Send one request to the daemon and return the decoded JSON response"""
+    state = state or load_state()
+    if not state:
+        raise ConnectionError("Daemon is not running (no temp_data/daemon.json)")
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{state['port']}{path}",
+        data=data,
+        method=method,
+        headers={'Content-Type': 'application/json', 'X-Daemon-Token': state['token']}
+    )
+    try:
+        with urllib.request.urlopen(req) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read() or b'{}')
+
+def run_job(command, args):
+    """Run a convert/import/verify/list job on the daemon"""
+    return request('POST', '/jobs', {'command': command, 'args': args})
+
+def start():
+    """Start the daemon in the background and wait until it answers"""
+    if load_state():
+        try:
+            print(f"ℹ️  Daemon already running: {request('GET', '/health')}")
+            return
+        except (ConnectionError, urllib.error.URLError):
+            os.remove(STATE_FILE)
+
+    os.makedirs('temp_data', exist_ok=True)
+    daemon_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'daemon.py')
+    with open('temp_data/daemon.log', 'a') as log:
+        subprocess.Popen(
+            [sys.executable, daemon_script] + sys.argv[2:],
+            stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+        )
+
+    deadline = time.time() + START_TIMEOUT_SECONDS
+    while time.time() < deadline:
+        try:
+            if load_state():
+                print(f"✅ Daemon started: {request('GET', '/health')}")
+                return
+        except (ConnectionError, urllib.error.URLError):
+            pass
+        time.sleep(0.2)
+    print("❌ Daemon did not start; see temp_data/daemon.log")
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage:")
+        print("  python daemon_client.py start [--port N]          # Start the daemon")
+        print("  python daemon_client.py stop                      # Stop the daemon")
+        print("  python daemon_client.py status                    # Show daemon health")
+        print("  python daemon_client.py convert <mbz_file>        # Convert via daemon")
+        print("  python daemon_client.py import <json_file>        # Import via daemon")
+        print("  python daemon_client.py verify <course_id>        # Verify via daemon")
+        print("  python daemon_client.py list [--refresh]          # List courses via daemon")
+        return 1
+
+    command = sys.argv[1].lower()
+    args = sys.argv[2:]
+
+    try:
+        if command == 'start':
+            start()
+            return 0
+        if command == 'stop':
+            print(f"⏹️  {request('POST', '/shutdown', {})}")
+            return 0
+        if command == 'status':
+            print(json.dumps(request('GET', '/health'), indent=2))
+            return 0
+
+        if command in ('convert', 'import'):
+            if not args:
+                print("❌ Please provide a file path")
+                return 1
+            response = run_job(command, {'path': os.path.abspath(args[0])})
+        elif command == 'verify':
+            if not args:
+                print("❌ Please provide a course ID")
+                return 1
+            response = run_job(command, {'course_id': args[0]})
+        elif command == 'list':
+            response = run_job(command, {'refresh': '--refresh' in args})
+        else:
+            print(f"❌ Unknown command: {command}")
+            return 1
+    except (ConnectionError, urllib.error.URLError) as e:
+        print(f"❌ Could not reach daemon: {e}")
+        return 1
+
+    if 'error' in response:
+        print(f"❌ {response['error']}")
+        return 1
+    print(json.dumps(response, indent=2, ensure_ascii=False))
+    if command == 'verify' and not response['result'].get('ok', True):
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Description Store
+Cohort courses are clones, so class_data/imports holds the same multi-KB
+descriptions many times over. This optional store keeps each description
+once, in class_data/descriptions/<xx>/<sha256>.html, and course JSON refers
+to it as {"$description": "<sha256>"}.
+
+- Writers (write_json, write_json_to_imports, import-md) store references
+  when CLASSROOM_DEDUPE_DESCRIPTIONS=1; `python description_store.py dedupe`
+  converts existing files, and `inflate` turns references back into text.
+- Only descriptions of at least MIN_STORED_BYTES are stored; shorter ones
+  stay inline, where a reference would not save anything.
+- Loaders resolve references transparently (course_model.py does it for
+  load_course_data, the markdown exporter and importer). Resolved texts sit
+  in an LRU cache, so courses loaded together share one copy of each.
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+STORE_DIR = 'class_data/descriptions'
+DEDUPE = os.environ.get('CLASSROOM_DEDUPE_DESCRIPTIONS', '') not in ('', '0')
+MIN_STORED_BYTES = 256
+CACHE_SIZE = 4096
+REF_KEY = '$description'
+
+def _path(digest, store_dir=STORE_DIR):
+    return os.path.join(store_dir, digest[:2], f"{digest}.html")
+
+def put(text, store_dir=STORE_DIR):
+    """Store text (once) and return its reference"""
+    data = text.encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()
+    path = _path(digest, store_dir)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return {REF_KEY: digest}
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _read(digest, store_dir=STORE_DIR):
+    with open(_path(digest, store_dir), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def is_reference(value):
+    return isinstance(value, dict) and REF_KEY in value
+
+def resolve(value):
+    """The description text for value, which may be text or a reference"""
+    if is_reference(value):
+        try:
+            return _read(value[REF_KEY])
+        except FileNotFoundError:
+            raise ValueError(f"Description {value[REF_KEY]} is missing from {STORE_DIR}")
+    return value
+
+def _items(course_json):
+    for topic in course_json.get('topics', []):
+        yield from topic.get('assignments', [])
+        yield from topic.get('activities', [])
+
+def deduplicate(course_json, store_dir=STORE_DIR):
+    """A copy of course_json (plain dicts) with long descriptions replaced by references"""
+    # A deep copy as plain dicts (course_model objects convert themselves)
+    course_json = course_json.to_dict() if hasattr(course_json, 'to_dict') else json.loads(json.dumps(course_json))
+    for item in _items(course_json):
+        description = item.get('description')
+        if isinstance(description, str) and len(description.encode('utf-8')) >= MIN_STORED_BYTES:
+            item['description'] = put(description, store_dir)
+    return course_json
+
+def inflate(course_json):
+    """course_json (plain dicts) with every reference replaced by its text, in place"""
+    for item in _items(course_json):
+        item['description'] = resolve(item.get('description', ''))
+    return course_json
+
+def stored_form(course_json):
+    """What writers should save: references if deduplication is on, else course_json as is"""
+    return deduplicate(course_json) if DEDUPE else course_json
+
+def _rewrite(path, transform):
+    with open(path, 'r', encoding='utf-8') as f:
+        before = f.read()
+    after = json.dumps(transform(json.loads(before)), ensure_ascii=False, indent=2)
+    if after != before:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(after)
+        os.replace(tmp_path, path)
+    return len(before.encode('utf-8')), len(after.encode('utf-8'))
+
+def store_size(store_dir=STORE_DIR):
+    """(number of stored descriptions, total bytes)"""
+    count = total = 0
+    for root, _, files in os.walk(store_dir):
+        for name in files:
+            if name.endswith('.html'):
+                count += 1
+                total += os.path.getsize(os.path.join(root, name))
+    return count, total
+
+def main():
+    import sys
+
+    args = sys.argv[1:]
+    if not args or args[0] not in ('dedupe', 'inflate', 'status'):
+        print("Usage:")
+        print("  python description_store.py dedupe <json>...    # Move long descriptions into the store")
+        print("  python description_store.py inflate <json>...   # Put the full text back into the files")
+        print("  python description_store.py status              # Show the store")
+        sys.exit(1)
+
+    command, paths = args[0], args[1:]
+    if command == 'status':
+        count, total = store_size()
+        print(f"🗃️  {count} descriptions, {total / 1024:.1f} KB in {STORE_DIR}")
+        return
+
+    before_total = after_total = 0
+    for path in paths:
+        before, after = _rewrite(path, deduplicate if command == 'dedupe' else inflate)
+        before_total += before
+        after_total += after
+    print(f"✅ {len(paths)} file(s): {before_total / 1024:.1f} KB -> {after_total / 1024:.1f} KB")
+    if command == 'dedupe':
+        count, total = store_size()
+        print(f"🗃️  Store: {count} descriptions, {total / 1024:.1f} KB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Import Estimator
+Counts the API operations one or many course files would need. From the
+latencies recorded in earlier runs (latency.py), it projects how long they
+will take:
+
+- sequentially, as `import` runs them,
+- with `apply` at a given concurrency, limited by the longest ordering chain
+  (see plan.py),
+- and never faster than the accounts' rate budgets allow.
+
+It warns when the run would exceed the daily API quota.
+"""
+
+import json
+import math
+import os
+from accounts import ACCOUNTS_FILE, DEFAULT_REQUESTS_PER_MINUTE
+from latency import load_latency_stats, mean_latency
+from mbz_to_json import parse_mbz
+from moodle_json_to_google_classroom import load_course_data
+from plan import APPLY_BATCH_SIZE, APPLY_CONCURRENCY
+
+# Requests per day the Google Cloud project may make; set to your project's quota
+DAILY_QUOTA = int(os.environ.get('CLASSROOM_DAILY_QUOTA', '4000000'))
+
+# Endpoint each planned operation calls, and the latency assumed before any runs are recorded
+OPERATION_ENDPOINTS = {
+    'create_course': ('POST courses', 1.0),
+    'create_topic': ('POST courses/{id}/topics', 0.5),
+    'create_courseWork': ('POST courses/{id}/courseWork', 0.6),
+    'create_material': ('POST courses/{id}/courseWorkMaterials', 0.6),
+}
+
+def count_operations(course_data):
+    """Operations an import of course_data performs, plus its longest ordering chains"""
+    topics = course_data['topics']
+    items_per_topic = [len(t['assignments']) + len(t.get('activities', [])) for t in topics]
+    return {
+        'create_course': 1,
+        'create_topic': len(topics),
+        'create_courseWork': sum(len(t['assignments']) for t in topics),
+        'create_material': sum(len(t.get('activities', [])) for t in topics),
+        'longest_topic': max(items_per_topic, default=0),
+    }
+
+def load_course_file(path):
+    if path.lower().endswith(('.mbz', '.zip', '.tar', '.gz')):
+        return parse_mbz(path)
+    return load_course_data(path)
+
+def total_requests_per_minute(path=ACCOUNTS_FILE):
+    """The combined rate budget of every configured account"""
+    if not os.path.exists(path):
+        return DEFAULT_REQUESTS_PER_MINUTE
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f).get('accounts', [])
+    return sum(e.get('requests_per_minute', DEFAULT_REQUESTS_PER_MINUTE) for e in entries) or DEFAULT_REQUESTS_PER_MINUTE
+
+def estimate(paths, concurrency=APPLY_CONCURRENCY, batch_size=APPLY_BATCH_SIZE, ordered=True):
+    """Operation counts and projected durations (seconds) for importing every file"""
+    stats = load_latency_stats()
+    latencies = {}
+    recorded = {}
+    for op, (endpoint, default) in OPERATION_ENDPOINTS.items():
+        measured = mean_latency(stats, endpoint)
+        latencies[op] = measured if measured is not None else default
+        recorded[op] = measured is not None
+
+    totals = {op: 0 for op in OPERATION_ENDPOINTS}
+    sequential = 0.0
+    critical_path = 0.0
+    http_requests = 0
+    for path in paths:
+        counts = count_operations(load_course_file(path))
+        course_seconds = sum(counts[op] * latencies[op] for op in OPERATION_ENDPOINTS)
+        sequential += course_seconds
+        for op in OPERATION_ENDPOINTS:
+            totals[op] += counts[op]
+
+        items = counts['create_courseWork'] + counts['create_material']
+        item_latency = max(latencies['create_courseWork'], latencies['create_material'])
+        if ordered:
+            # Topics are created one after another; each topic's items form their own chain
+            chain = latencies['create_course'] + counts['create_topic'] * latencies['create_topic'] \
+                + counts['longest_topic'] * item_latency
+        else:
+            chain = latencies['create_course'] + latencies['create_topic'] + item_latency
+        critical_path = max(critical_path, chain)
+        # Ready items share batch requests of up to batch_size
+        http_requests += 1 + counts['create_topic'] + math.ceil(items / max(batch_size, 1))
+
+    operations = sum(totals.values())
+    rate_limited = operations / total_requests_per_minute() * 60
+    parallel = max(sequential / max(concurrency, 1), critical_path, rate_limited)
+    return {
+        'files': len(paths),
+        'operations': totals,
+        'api_calls': operations,
+        'http_requests': http_requests,
+        'latencies': latencies,
+        'recorded': recorded,
+        'sequential_seconds': max(sequential, rate_limited),
+        'parallel_seconds': parallel,
+        'rate_limited_seconds': rate_limited,
+        'concurrency': concurrency,
+        'quota_days': operations / DAILY_QUOTA,
+    }
+
+def format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} min"
+    return f"{seconds / 3600:.1f} h"
+
+def print_estimate(result):
+    print(f"📊 Estimate for {result['files']} course file(s)")
+    print("=" * 50)
+    for op, count in result['operations'].items():
+        source = 'recorded' if result['recorded'][op] else 'default'
+        print(f"  {op:<18} {count:>7}   ~{result['latencies'][op]:.2f}s each ({source})")
+    print(f"  API calls (quota):  {result['api_calls']:>7}")
+    print(f"  HTTP requests:      {result['http_requests']:>7}   (with batching)")
+    print()
+    print("⏱️  Sequential import:".ljust(34) + format_duration(result['sequential_seconds']))
+    print(f"⏱️  apply at concurrency {result['concurrency']}:".ljust(34) + format_duration(result['parallel_seconds']))
+    print("🚦 Rate budget floor:".ljust(34) + format_duration(result['rate_limited_seconds']))
+    if not all(result['recorded'].values()):
+        print("ℹ️  Some latencies are defaults; run an import to record real ones")
+    if result['quota_days'] > 1:
+        print(f"⚠️  {result['api_calls']} calls exceed the daily quota of {DAILY_QUOTA} "
+              f"(CLASSROOM_DAILY_QUOTA); spread the batch over {math.ceil(result['quota_days'])} days")
+    elif result['quota_days'] > 0.8:
+        print(f"⚠️  This batch uses {result['quota_days']:.0%} of the daily quota")
+
+if __name__ == '__main__':
+    import sys
+
+    args = sys.argv[1:]
+
+    def option(flag, default):
+        return int(args[args.index(flag) + 1]) if flag in args[:-1] else default
+
+    concurrency = option('--concurrency', APPLY_CONCURRENCY)
+    batch_size = option('--batch-size', APPLY_BATCH_SIZE)
+    paths = [a for i, a in enumerate(args)
+             if not a.startswith('--') and (i == 0 or args[i - 1] not in ('--concurrency', '--batch-size'))]
+    if not paths:
+        print("Usage: python estimate.py <file>... [--concurrency N] [--batch-size N] [--unordered]")
+        sys.exit(1)
+    print_estimate(estimate(paths, concurrency, batch_size, ordered='--unordered' not in args))
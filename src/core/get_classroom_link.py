@@ -1,6 +1,7 @@
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from transport import build_classroom_service
+from mirror import get_mirror
 
 # Setup OAuth
 SCOPES = [
@@ -13,18 +14,17 @@ SCOPES = [
 def authenticate():
     flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
     creds = flow.run_local_server(port=0)
-    return build('classroom', 'v1', credentials=creds)
+    return build_classroom_service(creds)
 
-def get_classroom_link():
-    service = authenticate()
-    
-    # Get all courses
-    courses = service.courses().list().execute()
+def get_classroom_link(name='November Cohort 2024'):
+    # Answered from the local mirror; only log in if it needs refreshing
+    mirror = get_mirror()
+    service = None if mirror.courses_fresh() else authenticate()
     
     # Find our imported course
     imported_course = None
-    for course in courses.get('courses', []):
-        if 'November Cohort 2024' in course.get('name', ''):
+    for course in mirror.courses(service):
+        if name in course.get('name', ''):
             imported_course = course
             break
     
@@ -44,4 +44,8 @@ def get_classroom_link():
     print(f"\n📋 Direct link to Classwork: {classroom_url}/c/{course_id}/t/all")
 
 if __name__ == '__main__':
-    get_classroom_link() 
\ No newline at end of file
+    import sys
+    if len(sys.argv) > 1:
+        get_classroom_link(sys.argv[1])
+    else:
+        get_classroom_link() 
\ No newline at end of file
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Job Queue Script
+Persistent SQLite job queue for migrating many Moodle backups unattended.
+
+Jobs move through convert -> import -> verify. Workers lease a job before
+running it; a lease that is not renewed (crashed or killed worker) expires
+and the job is picked up again. Failed jobs are retried with exponential
+backoff until max_attempts is reached. Imports are not repeatable, so an
+import job records the course it created, and a retry resumes that course
+instead of creating another one.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import random
+from accounts import AccountPool
+from mbz_to_json import parse_mbz, write_json_to_imports
+from moodle_json_to_google_classroom import import_course
+from verify_import import check_course, describe_report, has_differences
+
+DB_PATH = 'temp_data/jobs.db'
+
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+IDLE_POLL_SECONDS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    path TEXT,
+    payload TEXT NOT NULL DEFAULT '{}',
+    parent_id INTEGER,
+    chain INTEGER NOT NULL DEFAULT 1,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    next_run_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    duration REAL,
+    error TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, next_run_at);
+"""
+
+def connect(db_path=DB_PATH):
+    """Open a connection to the queue; use one per thread"""
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+def _insert_job(conn, kind, path=None, payload=None, parent_id=None, chain=True):
+    cursor = conn.execute(
+        """INSERT INTO jobs (kind, path, payload, parent_id, chain, max_attempts, next_run_at, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        (kind, path, json.dumps(payload or {}), parent_id, int(chain), MAX_ATTEMPTS, time.time(), time.time())
+    )
+    return cursor.lastrowid
+
+def enqueue(conn, paths, chain=True):
+    """Queue .mbz files for conversion and .json files for import"""
+    job_ids = []
+    for path in paths:
+        if path.lower().endswith('.json'):
+            kind = 'import'
+        elif path.lower().endswith(('.mbz', '.zip', '.tar', '.gz')):
+            kind = 'convert'
+        else:
+            print(f"⚠️  Skipping {path}: expected an .mbz or .json file")
+            continue
+        if not os.path.exists(path):
+            print(f"⚠️  Skipping {path}: file not found")
+            continue
+        job_ids.append(_insert_job(conn, kind, path=os.path.abspath(path), chain=chain))
+    return job_ids
+
+def claim_job(conn, worker_id):
+    """Lease the next runnable job, including jobs whose lease has expired"""
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        while True:
+            row = conn.execute(
+                """SELECT * FROM jobs
+                   WHERE (state = 'pending' AND next_run_at <= ?)
+                      OR (state = 'running' AND lease_expires < ?)
+                   ORDER BY next_run_at, id LIMIT 1""",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            if row['state'] == 'running' and row['attempts'] >= row['max_attempts']:
+                # The last attempt died without reporting back; don't run it again
+                conn.execute(
+                    """UPDATE jobs SET state = 'failed', error = 'worker lost (lease expired)',
+                           lease_owner = NULL, lease_expires = NULL WHERE id = ?""",
+                    (row['id'],)
+                )
+                continue
+            break
+        conn.execute(
+            """UPDATE jobs SET state = 'running', lease_owner = ?, lease_expires = ?,
+                   attempts = attempts + 1, started_at = ?
+               WHERE id = ?""",
+            (worker_id, now + LEASE_SECONDS, now, row['id'])
+        )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    return conn.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+
+def renew_lease(conn, job_id, worker_id):
+    conn.execute(
+        "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND state = 'running'",
+        (time.time() + LEASE_SECONDS, job_id, worker_id)
+    )
+
+def complete_job(conn, job, worker_id, result):
+    """Mark a job done and queue the next pipeline stage"""
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        updated = conn.execute(
+            """UPDATE jobs SET state = 'done', finished_at = ?, duration = ?, result = ?,
+                   error = NULL, lease_owner = NULL, lease_expires = NULL
+               WHERE id = ? AND lease_owner = ? AND state = 'running'""",
+            (now, now - job['started_at'], json.dumps(result), job['id'], worker_id)
+        ).rowcount
+        # Only the lease holder may chain; a worker whose lease was stolen stays quiet
+        if updated and job['chain']:
+            if job['kind'] == 'convert':
+                _insert_job(conn, 'import', path=result['json_path'], parent_id=job['id'])
+            elif job['kind'] == 'import':
+                _insert_job(conn, 'verify', payload=result, parent_id=job['id'])
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+def fail_job(conn, job, worker_id, error):
+    """Schedule a retry with exponential backoff, or give up after max_attempts"""
+    now = time.time()
+    if job['attempts'] >= job['max_attempts']:
+        state, next_run_at = 'failed', job['next_run_at']
+    else:
+        delay = min(BACKOFF_BASE_SECONDS * 2 ** (job['attempts'] - 1), BACKOFF_MAX_SECONDS)
+        state, next_run_at = 'pending', now + delay * random.uniform(0.8, 1.2)
+    conn.execute(
+        """UPDATE jobs SET state = ?, next_run_at = ?, finished_at = ?, duration = ?, error = ?,
+               lease_owner = NULL, lease_expires = NULL
+           WHERE id = ? AND lease_owner = ?""",
+        (state, next_run_at, now, now - job['started_at'], str(error), job['id'], worker_id)
+    )
+    return state
+
+def save_payload(conn, job, worker_id, payload):
+    """Record progress on a running job, for its next attempt"""
+    conn.execute(
+        "UPDATE jobs SET payload = ? WHERE id = ? AND lease_owner = ? AND state = 'running'",
+        (json.dumps(payload), job['id'], worker_id)
+    )
+
+def retry_failed(conn):
+    """Put every failed job back in the queue with a fresh attempt budget"""
+    return conn.execute(
+        "UPDATE jobs SET state = 'pending', attempts = 0, next_run_at = ? WHERE state = 'failed'",
+        (time.time(),)
+    ).rowcount
+
+# Job handlers; save(payload) records progress on the job for a later attempt
+def run_convert(accounts, job, save):
+    course_data = parse_mbz(job['path'])
+    output_path = write_json_to_imports(course_data, course_data['course_name'])
+    return {'json_path': str(output_path), 'course_name': course_data['course_name']}
+
+def run_import(accounts, job, save):
+    payload = json.loads(job['payload'])
+    if payload.get('course_id'):
+        # An earlier attempt created the course; finish it as the account that owns it
+        account = accounts.for_owner(payload.get('owner'))
+        with account.clients.client() as service:
+            return import_course(job['path'], service=service, owner=account.name,
+                                 course_id=payload['course_id'])
+
+    def created(course_id, course_name):
+        save({'course_id': course_id, 'course_name': course_name, 'owner': account.name})
+
+    # The scheduler spreads new courses over the configured owner accounts
+    with accounts.checkout() as account, account.clients.client() as service:
+        return import_course(job['path'], service=service, owner=account.name, on_created=created)
+
+def run_verify(accounts, job, save):
+    expected = json.loads(job['payload'])
+    # Compare every item with the source JSON the import job recorded
+    report = check_course(accounts.for_owner(expected.get('owner')).clients, expected['course_id'])
+    if has_differences(report):
+        raise RuntimeError(describe_report(report))
+    return report['counts']
+
+HANDLERS = {
+    'convert': run_convert,
+    'import': run_import,
+    'verify': run_verify,
+}
+
+class _LeaseKeeper:
+    """Renews a job's lease in the background while the job runs"""
+
+    def __init__(self, job_id, worker_id, db_path):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.db_path = db_path
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        conn = connect(self.db_path)
+        try:
+            while not self.stopped.wait(LEASE_SECONDS / 3):
+                renew_lease(conn, self.job_id, self.worker_id)
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+def worker_loop(worker_id, accounts, stop, db_path=DB_PATH, forever=False):
+    """Claim and run jobs until the queue is drained (or stop is set)"""
+    conn = connect(db_path)
+    try:
+        while not stop.is_set():
+            job = claim_job(conn, worker_id)
+            if job is None:
+                pending = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'running')"
+                ).fetchone()[0]
+                if not pending and not forever:
+                    return
+                stop.wait(IDLE_POLL_SECONDS)
+                continue
+
+            print(f"▶️  [{worker_id}] job {job['id']} {job['kind']} (attempt {job['attempts']})")
+            try:
+                with _LeaseKeeper(job['id'], worker_id, db_path):
+                    result = HANDLERS[job['kind']](
+                        accounts, job, lambda payload: save_payload(conn, job, worker_id, payload))
+                complete_job(conn, job, worker_id, result)
+                print(f"✅ [{worker_id}] job {job['id']} {job['kind']} done")
+            except Exception as e:
+                state = fail_job(conn, job, worker_id, e)
+                print(f"❌ [{worker_id}] job {job['id']} {job['kind']} failed ({state}): {e}")
+    finally:
+        conn.close()
+
+def run_workers(count, db_path=DB_PATH, forever=False):
+    """Run count worker threads against the queue"""
+    accounts = AccountPool.from_config(pool_size=count)
+    stop = threading.Event()
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(target=worker_loop, args=(f"{prefix}:{i}", accounts, stop, db_path, forever))
+        for i in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopping workers after their current jobs...")
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        accounts.close()
+
+def print_status(conn, show_jobs=False):
+    print("📊 Job Queue Status:")
+    print("=" * 50)
+    rows = conn.execute(
+        """SELECT kind, state, COUNT(*) AS n, AVG(duration) AS avg_duration
+           FROM jobs GROUP BY kind, state ORDER BY kind, state"""
+    ).fetchall()
+    if not rows:
+        print("ℹ️  Queue is empty")
+        return
+    for row in rows:
+        timing = f", avg {row['avg_duration']:.1f}s" if row['state'] == 'done' and row['avg_duration'] else ""
+        print(f"  {row['kind']:<8} {row['state']:<8} {row['n']}{timing}")
+
+    now = time.time()
+    if show_jobs:
+        print("-" * 50)
+        for job in conn.execute('SELECT * FROM jobs ORDER BY id'):
+            line = f"  #{job['id']} {job['kind']:<8} {job['state']:<8} attempts={job['attempts']}"
+            if job['duration'] is not None:
+                line += f" {job['duration']:.1f}s"
+            if job['state'] == 'pending' and job['next_run_at'] > now:
+                line += f" retry in {job['next_run_at'] - now:.0f}s"
+            print(line + f"  {job['path'] or json.loads(job['payload']).get('course_id', '')}")
+
+    failed = conn.execute("SELECT id, kind, path, error FROM jobs WHERE state = 'failed' ORDER BY id").fetchall()
+    if failed:
+        print("-" * 50)
+        print("❌ Failed jobs:")
+        for job in failed:
+            print(f"  #{job['id']} {job['kind']} {job['path'] or ''}: {job['error']}")
+
+def main():
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage:")
+        print("  python job_queue.py enqueue <file>... [--no-chain]   # Queue .mbz/.json files")
+        print("  python job_queue.py workers <N> [--forever]          # Run N workers")
+        print("  python job_queue.py status [--jobs]                  # Show queue progress")
+        print("  python job_queue.py retry                            # Re-queue failed jobs")
+        return
+
+    command = sys.argv[1].lower()
+    args = sys.argv[2:]
+    conn = connect()
+
+    if command == 'enqueue':
+        paths = [a for a in args if a != '--no-chain']
+        if not paths:
+            print("❌ Please provide at least one file")
+            return
+        job_ids = enqueue(conn, paths, chain='--no-chain' not in args)
+        print(f"📥 Queued {len(job_ids)} job(s)")
+
+    elif command == 'workers':
+        count = int(args[0]) if args and args[0].isdigit() else 1
+        conn.close()
+        run_workers(count, forever='--forever' in args)
+
+    elif command == 'status':
+        print_status(conn, show_jobs='--jobs' in args)
+
+    elif command == 'retry':
+        print(f"🔁 Re-queued {retry_failed(conn)} failed job(s)")
+
+    else:
+        print(f"❌ Unknown command: {command}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-endpoint latency statistics for Classroom API calls.
+
+transport.py times every HTTP request and records it here under a
+normalized endpoint key such as "POST courses/{id}/courseWork". Totals are
+merged into temp_data/latency_stats.json when the process exits (and
+periodically in long-running processes). estimate.py uses them to project
+how long an import will take.
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+from urllib.parse import urlparse
+from file_lock import file_lock
+
+STATS_FILE = 'temp_data/latency_stats.json'
+# Older samples are scaled down past this count, so recent runs dominate
+MAX_SAMPLES = 1000
+# Flush to disk after this many new samples
+SAVE_EVERY = 500
+
+# Resource names are purely alphabetic; IDs and aliases ("d:school-math") are not
+_ID_SEGMENT = re.compile(r'[0-9:]')
+# API versions ("v1" in batch/classroom/v1) are not IDs either
+_VERSION_SEGMENT = re.compile(r'v\d+(?:(?:alpha|beta)\d*)?')
+
+def endpoint_key(method, uri):
+    """METHOD plus the API path with IDs replaced, e.g. "POST courses/{id}/topics" """
+    path = urlparse(uri).path
+    if path.startswith('/v1/'):
+        path = path[len('/v1/'):]
+    segments = ['{id}' if _ID_SEGMENT.search(s) and not _VERSION_SEGMENT.fullmatch(s) else s
+                for s in path.strip('/').split('/')]
+    return f"{method} {'/'.join(segments)}"
+
+class LatencyStats:
+    """Thread-safe accumulator of request latencies, merged into STATS_FILE on save"""
+
+    def __init__(self, path=STATS_FILE):
+        self.path = path
+        self._pending = {}
+        self._pending_count = 0
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            entry = self._pending.setdefault(key, {'count': 0, 'total': 0.0, 'max': 0.0})
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            self._pending_count += 1
+            flush = self._pending_count >= SAVE_EVERY
+        if flush:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            pending, self._pending, self._pending_count = self._pending, {}, 0
+        if not pending:
+            return
+        with file_lock(self.path):
+            stats = load_latency_stats(self.path)
+            for key, new in pending.items():
+                entry = stats.setdefault(key, {'count': 0, 'total': 0.0, 'max': 0.0})
+                entry['count'] += new['count']
+                entry['total'] += new['total']
+                entry['max'] = max(entry['max'], new['max'])
+                if entry['count'] > MAX_SAMPLES:
+                    scale = MAX_SAMPLES / entry['count']
+                    entry['count'] = MAX_SAMPLES
+                    entry['total'] *= scale
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+def load_latency_stats(path=STATS_FILE):
+    """{endpoint key: {'count', 'total', 'max'}} from previous runs"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def mean_latency(stats, key):
+    entry = stats.get(key)
+    if not entry or not entry['count']:
+        return None
+    return entry['total'] / entry['count']
+
+_stats = LatencyStats()
+atexit.register(_stats.save)
+
+def get_latency_stats():
+    """The process-wide recorder used by transport.py"""
+    return _stats
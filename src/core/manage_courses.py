@@ -1,43 +1,150 @@
+import fnmatch
 import json
 import os
-from googleapiclient.discovery import build
-from auth_cache import get_cached_credentials
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from googleapiclient.errors import HttpError
+from transport import build_classroom_service, iter_items, iter_pages
+from accounts import AccountPool
+from file_lock import file_lock
+from mirror import COURSE_FIELDS, get_mirror
+
+COURSES_FILE = 'class_data/courses.json'
+# Guards the registry across threads; file_lock guards it across processes
+_records_lock = threading.Lock()
 
 def load_course_records():
     """Load course records from class_data/courses.json"""
-    courses_file = 'class_data/courses.json'
-    if os.path.exists(courses_file):
-        with open(courses_file, 'r', encoding='utf-8') as f:
+    if os.path.exists(COURSES_FILE):
+        with open(COURSES_FILE, 'r', encoding='utf-8') as f:
             return json.load(f)
     return {'courses': []}
 
 def save_course_records(courses_data):
     """Save course records to class_data/courses.json"""
     os.makedirs('class_data', exist_ok=True)
-    with open('class_data/courses.json', 'w', encoding='utf-8') as f:
+    # Write a temp file and swap it in so the registry is never half-written
+    tmp_path = f'{COURSES_FILE}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(courses_data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, COURSES_FILE)
 
-def list_courses():
-    """List all courses from both Google Classroom and local records"""
-    # Use cached credentials
-    creds = get_cached_credentials()
-    service = build('classroom', 'v1', credentials=creds)
-    
-    # Get courses from Google Classroom
-    courses = service.courses().list().execute()
+@contextmanager
+def updating_course_records():
+    """
+    Course records for a read-modify-write, saved when the block ends. Every
+    change to courses.json goes through here, so concurrent imports (threads
+    or worker processes) can't lose each other's records.
+    """
+    with _records_lock, file_lock(COURSES_FILE):
+        courses_data = load_course_records()
+        yield courses_data
+        save_course_records(courses_data)
+
+def owner_service(course_id):
+    """A client authorized as the account that owns course_id"""
+    account = AccountPool.from_config(pool_size=1).for_course(course_id)
+    return build_classroom_service(account.credentials, limiter=account.limiter)
+
+COURSE_STATES = ['ACTIVE', 'ARCHIVED', 'PROVISIONED', 'DECLINED', 'SUSPENDED']
+
+# Only request the fields list-courses actually shows
+LIST_FIELDS = 'nextPageToken,courses(id,name,courseState)'
+LIST_PAGE_SIZE = 500
+
+_DONE = object()
+
+def iter_courses(service, course_states=None, teacher_id=None, fields=LIST_FIELDS):
+    """Yield every course matching the server-side filters, one page at a time"""
+    kwargs = {'pageSize': LIST_PAGE_SIZE, 'fields': fields}
+    if course_states:
+        kwargs['courseStates'] = list(course_states)
+    if teacher_id:
+        kwargs['teacherId'] = teacher_id
+    return iter_items(service.courses().list, 'courses', **kwargs)
+
+def iter_courses_concurrently(clients, course_states, teacher_id=None, fields=LIST_FIELDS):
+    """
+    Page through each course state on its own thread and yield courses as
+    soon as any page arrives. Pages of one state are still read in order.
+    """
+    pages = queue.Queue(maxsize=len(course_states) * 2)
+
+    def fetch(state):
+        try:
+            with clients.client() as service:
+                kwargs = {'pageSize': LIST_PAGE_SIZE, 'fields': fields, 'courseStates': [state]}
+                if teacher_id:
+                    kwargs['teacherId'] = teacher_id
+                for page in iter_pages(service.courses().list, 'courses', **kwargs):
+                    pages.put(page)
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(_DONE)
+
+    threads = [threading.Thread(target=fetch, args=(state,), daemon=True) for state in course_states]
+    for thread in threads:
+        thread.start()
+
+    remaining = len(threads)
+    while remaining:
+        page = pages.get()
+        if page is _DONE:
+            remaining -= 1
+        elif isinstance(page, Exception):
+            raise page
+        else:
+            yield from page
+
+def list_courses(course_states=None, teacher_id=None, search=None, refresh=False, show_local=True):
+    """List courses from Google Classroom (every account) and local records"""
+    # Local records are filtered by state only when states are asked for, so
+    # records of deleted courses stay visible by default
+    local_states = [s.upper() for s in course_states] if course_states else None
+    course_states = local_states or COURSE_STATES
+    needle = search.casefold() if search else None
+    pool = AccountPool.from_config(pool_size=len(course_states))
     
-    print("📚 Google Classroom Courses:")
-    print("=" * 50)
+    for account in pool.accounts.values():
+        label = "" if account.name == 'default' else f" ({account.name})"
+        print(f"📚 Google Classroom Courses{label}:")
+        print("=" * 50)
+        
+        mirror = get_mirror()
+        if teacher_id:
+            # Teacher membership isn't mirrored, so this filter is always fetched live
+            courses = iter_courses_concurrently(account.clients, course_states, teacher_id)
+        elif refresh or not mirror.courses_fresh(account.name):
+            # Re-list every state into the mirror, showing courses as they arrive
+            courses = (c for c in mirror.write_through_courses(
+                iter_courses_concurrently(account.clients, COURSE_STATES, fields=COURSE_FIELDS), account.name
+            ) if c.get('courseState') in course_states)
+        else:
+            print(f"ℹ️  From the local mirror (use --refresh to re-fetch)")
+            courses = (c for c in mirror.courses(account=account.name)
+                       if c.get('courseState') in course_states)
+        
+        shown = 0
+        for course in courses:
+            name = course.get('name', 'Unknown')
+            if needle and needle not in name.casefold():
+                continue
+            course_id = course['id']
+            print(f"🆔 {course_id}")
+            print(f"📖 {name}")
+            print(f"📊 State: {course.get('courseState', 'Unknown')}")
+            print(f"🔗 https://classroom.google.com/c/{course_id}")
+            print("-" * 30)
+            shown += 1
+        print(f"📊 {shown} course(s)\n")
+    pool.close()
     
-    for course in courses.get('courses', []):
-        course_id = course['id']
-        name = course.get('name', 'Unknown')
-        state = course.get('courseState', 'Unknown')
-        print(f"🆔 {course_id}")
-        print(f"📖 {name}")
-        print(f"📊 State: {state}")
-        print(f"🔗 https://classroom.google.com/c/{course_id}")
-        print("-" * 30)
+    if not show_local:
+        return
     
     # Get local records
     courses_data = load_course_records()
@@ -45,6 +152,10 @@ def list_courses():
     print("=" * 50)
     
     for course in courses_data['courses']:
+        if needle and needle not in course['name'].casefold():
+            continue
+        if local_states and course['status'].upper() not in local_states:
+            continue
         print(f"🆔 {course['id']}")
         print(f"📖 {course['name']}")
         print(f"📅 Created: {course['created_at']}")
@@ -53,34 +164,175 @@ def list_courses():
         print(f"📋 Status: {course['status']}")
         print("-" * 30)
 
+# Bulk lifecycle operations
+BATCH_SIZE = 50
+BATCH_RETRIES = 3
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+# action -> (new courseState, new local status); delete removes the record
+LIFECYCLE_ACTIONS = {
+    'archive': ('ARCHIVED', 'archived'),
+    'restore': ('ACTIVE', 'active'),
+    'delete': (None, None),
+}
+
+# Courses each action applies to when no --state is given
+DEFAULT_BULK_STATES = {
+    'archive': ['ACTIVE', 'PROVISIONED'],
+    'restore': ['ARCHIVED'],
+    'delete': COURSE_STATES,
+}
+
+def lifecycle_request(service, action, course_id):
+    """The API request for one lifecycle action (patches only courseState)"""
+    if action == 'delete':
+        return service.courses().delete(id=course_id)
+    return service.courses().patch(
+        id=course_id, updateMask='courseState', body={'courseState': LIFECYCLE_ACTIONS[action][0]}
+    )
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def query_registry(conditions):
+    """IDs of local records matching every key=pattern condition (glob patterns)"""
+    matches = set()
+    for record in load_course_records()['courses']:
+        if all(fnmatch.fnmatch(str(record.get(key, '')).casefold(), pattern.casefold())
+               for key, pattern in conditions):
+            matches.add(record['id'])
+    return matches
+
+def select_courses(service, course_states, name_pattern=None, older_than_days=None, registry_ids=None):
+    """Yield courses matching the server-side state filter and the local filters"""
+    cutoff = None
+    if older_than_days is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    
+    fields = 'nextPageToken,courses(id,name,courseState,creationTime)'
+    for course in iter_courses(service, course_states, fields=fields):
+        if registry_ids is not None and course['id'] not in registry_ids:
+            continue
+        if name_pattern and not fnmatch.fnmatch(course.get('name', '').casefold(), name_pattern.casefold()):
+            continue
+        if cutoff and course.get('creationTime') and _parse_time(course['creationTime']) > cutoff:
+            continue
+        yield course
+
+def run_batched(clients, action, course_ids):
+    """
+    Apply action to course_ids in batches of BATCH_SIZE, several batches at a
+    time. Throttled or failed parts are retried in a smaller follow-up batch.
+    Returns (succeeded_ids, {course_id: error}).
+    """
+    def run_chunk(service, chunk):
+        succeeded, errors = [], {}
+        pending = list(chunk)
+        for attempt in range(BATCH_RETRIES):
+            retry = []
+            
+            def callback(request_id, response, exception):
+                if exception is None:
+                    succeeded.append(request_id)
+                elif isinstance(exception, HttpError) and exception.resp.status in RETRYABLE_STATUSES:
+                    retry.append(request_id)
+                else:
+                    errors[request_id] = str(exception)
+            
+            batch = service.new_batch_http_request(callback=callback)
+            for course_id in pending:
+                batch.add(lifecycle_request(service, action, course_id), request_id=course_id)
+            batch.execute()
+            
+            pending = retry
+            if not pending:
+                break
+            time.sleep(2 ** attempt)
+        for course_id in pending:
+            errors[course_id] = 'still throttled after retries'
+        return succeeded, errors
+    
+    chunks = [course_ids[i:i + BATCH_SIZE] for i in range(0, len(course_ids), BATCH_SIZE)]
+    succeeded, errors = [], {}
+    for chunk_succeeded, chunk_errors in clients.map(run_chunk, chunks):
+        succeeded.extend(chunk_succeeded)
+        errors.update(chunk_errors)
+    return succeeded, errors
+
+def apply_to_records(action, course_ids):
+    """Update the local registry and mirror for every changed course in one write"""
+    course_ids = set(course_ids)
+    if action == 'delete':
+        get_mirror().forget_courses(course_ids)
+    else:
+        get_mirror().update_course_states(course_ids, LIFECYCLE_ACTIONS[action][0])
+    with updating_course_records() as courses_data:
+        if action == 'delete':
+            courses_data['courses'] = [c for c in courses_data['courses'] if c['id'] not in course_ids]
+        else:
+            for course_record in courses_data['courses']:
+                if course_record['id'] in course_ids:
+                    course_record['status'] = LIFECYCLE_ACTIONS[action][1]
+
+def bulk_lifecycle(action, name_pattern=None, older_than_days=None, course_states=None,
+                   where=None, dry_run=False, assume_yes=False):
+    """Archive, restore or delete every course matching the query"""
+    course_states = [s.upper() for s in course_states] if course_states else DEFAULT_BULK_STATES[action]
+    registry_ids = query_registry(where) if where else None
+    pool = AccountPool.from_config()
+    
+    # Select per owner account: only the owner may change its courses
+    selected = []
+    for account in pool.accounts.values():
+        with account.clients.client() as service:
+            courses = list(select_courses(service, course_states, name_pattern, older_than_days, registry_ids))
+        if courses:
+            selected.append((account, courses))
+    
+    total = sum(len(courses) for _, courses in selected)
+    print(f"🔎 {total} course(s) match:")
+    for account, courses in selected:
+        for course in courses:
+            print(f"  🆔 {course['id']}  {course.get('courseState', ''):<11} {course.get('name', '')}")
+    
+    if not total or dry_run:
+        pool.close()
+        return
+    
+    if not assume_yes:
+        confirm = input(f"⚠️  {action.upper()} these {total} course(s)? (yes/no): ")
+        if confirm.lower() != 'yes':
+            print("❌ Cancelled")
+            pool.close()
+            return
+    
+    started = time.time()
+    all_succeeded, all_errors = [], {}
+    for account, courses in selected:
+        succeeded, errors = run_batched(account.clients, action, [c['id'] for c in courses])
+        all_succeeded.extend(succeeded)
+        all_errors.update(errors)
+    pool.close()
+    
+    apply_to_records(action, all_succeeded)
+    print(f"✅ {action.capitalize()}d {len(all_succeeded)} course(s) in {time.time() - started:.1f}s")
+    print(f"📝 Local records updated")
+    for course_id, error in all_errors.items():
+        print(f"❌ {course_id}: {error}")
+
 def archive_course(course_id):
     """Archive a course in Google Classroom"""
-    # Use cached credentials
-    creds = get_cached_credentials()
-    service = build('classroom', 'v1', credentials=creds)
+    # Use the credentials of the account that owns the course
+    service = owner_service(course_id)
     
     try:
-        # First get the current course to preserve its name
-        course = service.courses().get(id=course_id).execute()
-        course_name = course.get('name', 'Unknown Course')
-        
-        # Update course state to ARCHIVED while preserving the name
-        body = {
-            'name': course_name,
-            'courseState': 'ARCHIVED'
-        }
-        updated_course = service.courses().update(id=course_id, body=body).execute()
+        # Only courseState is sent, so the name is preserved without a get
+        lifecycle_request(service, 'archive', course_id).execute()
         
         print(f"✅ Course {course_id} archived successfully!")
         
         # Update local record
-        courses_data = load_course_records()
-        for course_record in courses_data['courses']:
-            if course_record['id'] == course_id:
-                course_record['status'] = 'archived'
-                break
-        
-        save_course_records(courses_data)
+        apply_to_records('archive', [course_id])
         print(f"📝 Local record updated")
         
     except Exception as e:
@@ -88,9 +340,8 @@ def archive_course(course_id):
 
 def delete_course(course_id):
     """Delete a course from Google Classroom"""
-    # Use cached credentials
-    creds = get_cached_credentials()
-    service = build('classroom', 'v1', credentials=creds)
+    # Use the credentials of the account that owns the course
+    service = owner_service(course_id)
     
     try:
         # Delete the course
@@ -98,9 +349,7 @@ def delete_course(course_id):
         print(f"✅ Course {course_id} deleted successfully!")
         
         # Remove from local records
-        courses_data = load_course_records()
-        courses_data['courses'] = [c for c in courses_data['courses'] if c['id'] != course_id]
-        save_course_records(courses_data)
+        apply_to_records('delete', [course_id])
         print(f"📝 Removed from local records")
         
     except Exception as e:
@@ -108,25 +357,17 @@ def delete_course(course_id):
 
 def restore_course(course_id):
     """Restore an archived course"""
-    # Use cached credentials
-    creds = get_cached_credentials()
-    service = build('classroom', 'v1', credentials=creds)
+    # Use the credentials of the account that owns the course
+    service = owner_service(course_id)
     
     try:
         # Update course state to ACTIVE
-        body = {'courseState': 'ACTIVE'}
-        course = service.courses().update(id=course_id, body=body).execute()
+        lifecycle_request(service, 'restore', course_id).execute()
         
         print(f"✅ Course {course_id} restored successfully!")
         
         # Update local record
-        courses_data = load_course_records()
-        for course_record in courses_data['courses']:
-            if course_record['id'] == course_id:
-                course_record['status'] = 'active'
-                break
-        
-        save_course_records(courses_data)
+        apply_to_records('restore', [course_id])
         print(f"📝 Local record updated")
         
     except Exception as e:
@@ -137,16 +378,38 @@ def main():
     
     if len(sys.argv) < 2:
         print("Usage:")
-        print("  python manage_courses.py list                    # List all courses")
+        print("  python manage_courses.py list [options]          # List all courses")
+        print("      --state STATE[,STATE]   only these courseStates (server-side)")
+        print("      --teacher ID            only courses this teacher teaches (server-side)")
+        print("      --search TEXT           only names containing TEXT")
+        print("      --refresh               re-fetch instead of reading the local mirror")
+        print("      --no-local              skip local records")
         print("  python manage_courses.py archive <course_id>     # Archive a course")
         print("  python manage_courses.py delete <course_id>      # Delete a course")
         print("  python manage_courses.py restore <course_id>     # Restore archived course")
+        print("  python manage_courses.py bulk <archive|restore|delete> [query] [--dry-run] [--yes]")
+        print("      --name PATTERN          course name glob, e.g. '*2024*'")
+        print("      --older-than DAYS       created more than DAYS days ago")
+        print("      --state STATE[,STATE]   courseStates to consider")
+        print("      --where KEY=PATTERN     local registry match (repeatable), e.g. owner=teacher-a")
         return
     
     command = sys.argv[1].lower()
     
     if command == 'list':
-        list_courses()
+        args = sys.argv[2:]
+        
+        def option(flag):
+            return args[args.index(flag) + 1] if flag in args and args.index(flag) + 1 < len(args) else None
+        
+        states = option('--state')
+        list_courses(
+            course_states=states.split(',') if states else None,
+            teacher_id=option('--teacher'),
+            search=option('--search'),
+            refresh='--refresh' in args,
+            show_local='--no-local' not in args
+        )
     
     elif command == 'archive':
         if len(sys.argv) < 3:
@@ -173,6 +436,38 @@ def main():
         course_id = sys.argv[2]
         restore_course(course_id)
     
+    elif command == 'bulk':
+        args = sys.argv[3:]
+        if len(sys.argv) < 3 or sys.argv[2] not in LIFECYCLE_ACTIONS:
+            print("❌ Please provide an action: archive, restore or delete")
+            return
+        
+        def option(flag):
+            return args[args.index(flag) + 1] if flag in args and args.index(flag) + 1 < len(args) else None
+        
+        where = []
+        for i, a in enumerate(args):
+            if a != '--where':
+                continue
+            key, _, pattern = (args[i + 1] if i + 1 < len(args) else '').partition('=')
+            if not key or not pattern:
+                print(f"❌ --where needs KEY=PATTERN, got: {args[i + 1] if i + 1 < len(args) else '(nothing)'}")
+                sys.exit(1)
+            where.append([key, pattern])
+        if not option('--name') and not option('--older-than') and not option('--state') and not where:
+            print("❌ Please narrow the selection with --name, --older-than, --state or --where")
+            return
+        states = option('--state')
+        bulk_lifecycle(
+            sys.argv[2],
+            name_pattern=option('--name'),
+            older_than_days=float(option('--older-than')) if option('--older-than') else None,
+            course_states=states.split(',') if states else None,
+            where=where,
+            dry_run='--dry-run' in args,
+            assume_yes='--yes' in args
+        )
+    
     else:
         print(f"❌ Unknown command: {command}")
 
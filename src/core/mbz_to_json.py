@@ -1,157 +1,209 @@
 import zipfile
 import tarfile
 import os
+import sys
 import tempfile
 import json
 from datetime import datetime
 from pathlib import Path
 from lxml import etree
+from attachments import AttachmentStore, BackupAttachments
+from course_model import Activity, Assignment, Course, Topic, as_jsonable
+from description_store import stored_form
+from html_cleaner import HtmlCleaner
 
-def parse_mbz(mbz_path):
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Detect archive type
-        is_zip = zipfile.is_zipfile(mbz_path)
-        is_tar = tarfile.is_tarfile(mbz_path)
-        if is_zip:
-            with zipfile.ZipFile(mbz_path, 'r') as zip_ref:
-                zip_ref.extractall(tmpdir)
-        elif is_tar:
-            with tarfile.open(mbz_path, 'r') as tar_ref:
-                tar_ref.extractall(tmpdir)
-        else:
-            raise ValueError("Unsupported archive format. Only .zip, .mbz, or .tar are supported.")
+MEANINGFUL_SECTION_NAMES = ['syllabus', 'course information', 'introduction', 'overview', 'important links']
+
+def _is_blob(name):
+    return name.startswith(('files/', './files/'))
+
+def extract_mbz(mbz_path, tmpdir):
+    """
+    Extract a Moodle backup (zip or tar) into tmpdir, except the files/ blobs,
+    which only attachments.py reads (straight from the archive)
+    """
+    # Detect archive type
+    is_zip = zipfile.is_zipfile(mbz_path)
+    is_tar = tarfile.is_tarfile(mbz_path)
+    if is_zip:
+        with zipfile.ZipFile(mbz_path, 'r') as zip_ref:
+            zip_ref.extractall(tmpdir, members=[n for n in zip_ref.namelist() if not _is_blob(n)])
+    elif is_tar:
+        with tarfile.open(mbz_path, 'r') as tar_ref:
+            tar_ref.extractall(tmpdir, members=(m for m in tar_ref if not _is_blob(m.name)))
+    else:
+        raise ValueError("Unsupported archive format. Only .zip, .mbz, or .tar are supported.")
 
-        # 1. Load course name
-        backup_xml_path = os.path.join(tmpdir, 'moodle_backup.xml')
-        backup_tree = etree.parse(backup_xml_path)
-        course_name = backup_tree.findtext('.//original_course_fullname')
+def read_course_name(tmpdir):
+    backup_xml_path = os.path.join(tmpdir, 'moodle_backup.xml')
+    backup_tree = etree.parse(backup_xml_path)
+    return backup_tree.findtext('.//original_course_fullname')
 
-        # 2. Map sectionid -> section name
-        sections = []
-        section_map = {}
-        section_dir = os.path.join(tmpdir, 'sections')
+def read_sections(tmpdir):
+    """Read section metadata in backup order (no activities yet)"""
+    sections = []
+    section_dir = os.path.join(tmpdir, 'sections')
+    for folder in sorted(os.listdir(section_dir)):
+        xml_path = os.path.join(section_dir, folder, 'section.xml')
+        tree = etree.parse(xml_path)
+        section_id = tree.findtext('.//sectionid')
+        title = tree.findtext('.//name') or tree.findtext('.//title') or tree.findtext('.//summary')
+        sequence = tree.findtext('.//sequence')
         
-        # First pass: collect section sequences and basic info
-        section_sequences = {}
-        for folder in sorted(os.listdir(section_dir)):
-            xml_path = os.path.join(section_dir, folder, 'section.xml')
-            tree = etree.parse(xml_path)
-            section_id = tree.findtext('.//sectionid')
-            title = tree.findtext('.//name') or tree.findtext('.//title') or tree.findtext('.//summary')
-            sequence = tree.findtext('.//sequence')
-            
-            if title and title != '$@NULL@$':
-                # Preserve HTML formatting instead of stripping it
-                title = title.strip()
+        if title and title != '$@NULL@$':
+            # Preserve HTML formatting instead of stripping it
+            title = title.strip()
+        else:
+            title = None  # Will try to derive from activities later
+        sections.append({
+            'folder': folder,
+            'name': title,
+            'sequence': sequence.split(',') if sequence else [],
+            'section_id': section_id
+        })
+    return sections
+
+def index_activities(tmpdir):
+    """Map activity ID -> list of (folder, xml_path) for every parseable activity"""
+    activity_dir = os.path.join(tmpdir, 'activities')
+    index = {}
+    for folder in sorted(os.listdir(activity_dir)):
+        xml_path = os.path.join(activity_dir, folder, 'assign.xml')
+        if not os.path.exists(xml_path):
+            # Try other activity types
+            if folder.startswith('page_'):
+                xml_path = os.path.join(activity_dir, folder, 'page.xml')
+            elif folder.startswith('forum_'):
+                xml_path = os.path.join(activity_dir, folder, 'forum.xml')
+            elif folder.startswith('resource_'):
+                xml_path = os.path.join(activity_dir, folder, 'resource.xml')
             else:
-                title = None  # Will try to derive from activities later
-            section_map[folder] = {'name': title, 'assignments': [], 'sequence': sequence, 'section_id': section_id}
-            section_sequences[folder] = sequence
-            sections.append(section_map[folder])
-        
-        # 3. Load assignments and other activities
-        activity_dir = os.path.join(tmpdir, 'activities')
-        for folder in os.listdir(activity_dir):
-            xml_path = os.path.join(activity_dir, folder, 'assign.xml')
-            if not os.path.exists(xml_path):
-                # Try other activity types
-                if folder.startswith('page_'):
-                    xml_path = os.path.join(activity_dir, folder, 'page.xml')
-                elif folder.startswith('forum_'):
-                    xml_path = os.path.join(activity_dir, folder, 'forum.xml')
-                elif folder.startswith('resource_'):
-                    xml_path = os.path.join(activity_dir, folder, 'resource.xml')
-                else:
-                    continue
-                
-            if not os.path.exists(xml_path):
                 continue
-                
-            tree = etree.parse(xml_path)
-            title = tree.findtext('.//name')
-            desc = tree.findtext('.//intro')
-            if desc:
-                desc = desc.strip()
+        
+        if not os.path.exists(xml_path):
+            continue
+        
+        # Extract activity ID from folder name (e.g., "assign_2835" -> "2835")
+        activity_id = folder.split('_')[1]
+        index.setdefault(activity_id, []).append((folder, xml_path))
+    return index
+
+def assign_activity_owners(sections):
+    """Each activity belongs to the first section whose sequence lists it"""
+    owners = {}
+    for section in sections:
+        for activity_id in section['sequence']:
+            owners.setdefault(activity_id, section['folder'])
+    return owners
+
+def parse_activity(folder, xml_path, attachments=None, cleaner=None):
+    tree = etree.parse(xml_path)
+    title = tree.findtext('.//name')
+    desc = tree.findtext('.//intro')
+    if desc:
+        desc = desc.strip()
+    else:
+        desc = ""
+    
+    if cleaner is not None:
+        desc = cleaner.clean(desc)
+    if attachments is not None:
+        root = tree.getroot()
+        component = 'mod_' + (root.get('modulename') or folder.split('_')[0])
+        desc = attachments.rewrite(desc, root.get('contextid'), component)
+    
+    if folder.startswith('assign_'):
+        return Assignment(title.strip(), desc)
+    # This is another activity type (page, forum, etc.)
+    return Activity(title.strip(), desc, folder.split('_')[0])
+
+def derive_section_name(topic):
+    """Pick a name for a section that has none in the backup"""
+    # First try to use assignment titles
+    if topic.assignments:
+        return topic.assignments[0].title
+    # Then try other activity types
+    if topic.activities:
+        # Look for meaningful activity names
+        for activity in topic.activities:
+            activity_title_lower = activity.title.lower()
+            if any(name in activity_title_lower for name in MEANINGFUL_SECTION_NAMES):
+                return activity.title
+        # If no meaningful name found, use the first activity
+        return topic.activities[0].title
+    return 'Untitled Section'
+
+def build_topic(section, owners, activity_index, attachments=None, cleaner=None):
+    """Parse the activities of one section into a Topic"""
+    topic = Topic(section['name'])
+    
+    # Walk the sequence so assignments and activities keep their Moodle order
+    for activity_id in section['sequence']:
+        if owners.get(activity_id) != section['folder']:
+            continue
+        for folder, xml_path in activity_index.get(activity_id, []):
+            item = parse_activity(folder, xml_path, attachments, cleaner)
+            if isinstance(item, Assignment):
+                topic.assignments.append(item)
             else:
-                desc = ""
-            
-            # Extract activity ID from folder name (e.g., "assign_2835" -> "2835")
-            activity_id = folder.split('_')[1]
-            
-            # Find which section contains this activity using the sequence field
-            section_folder = None
-            for f, s in section_map.items():
-                if s['sequence'] and activity_id in s['sequence'].split(','):
-                    section_folder = f
-                    break
-            
-            if section_folder:
-                if folder.startswith('assign_'):
-                    # This is an assignment - store with sequence position for sorting
-                    sequence_list = section_map[section_folder]['sequence'].split(',')
-                    sequence_position = sequence_list.index(activity_id) if activity_id in sequence_list else 999
-                    assignment = {
-                        'title': title.strip(), 
-                        'description': desc,
-                        'sequence_position': sequence_position,
-                        'activity_id': activity_id
-                    }
-                    section_map[section_folder]['assignments'].append(assignment)
-                else:
-                    # This is another activity type (page, forum, etc.)
-                    if 'activities' not in section_map[section_folder]:
-                        section_map[section_folder]['activities'] = []
-                    activity = {'title': title.strip(), 'description': desc, 'type': folder.split('_')[0]}
-                    section_map[section_folder]['activities'].append(activity)
-
-        # 4. Sort assignments by sequence position and clean up
-        for section in sections:
-            if section['assignments']:
-                # Sort assignments by their sequence position
-                section['assignments'].sort(key=lambda x: x['sequence_position'])
-                # Remove the temporary fields used for sorting
-                for assignment in section['assignments']:
-                    del assignment['sequence_position']
-                    del assignment['activity_id']
-
-        # 5. Assign names to sections with no name
-        for section in sections:
-            if not section['name']:
-                # First try to use assignment titles
-                if section['assignments']:
-                    section['name'] = section['assignments'][0]['title']
-                # Then try other activity types
-                elif 'activities' in section and section['activities']:
-                    # Look for meaningful activity names
-                    meaningful_names = ['syllabus', 'course information', 'introduction', 'overview', 'important links']
-                    for activity in section['activities']:
-                        activity_title_lower = activity['title'].lower()
-                        if any(name in activity_title_lower for name in meaningful_names):
-                            section['name'] = activity['title']
-                            break
-                    # If no meaningful name found, use the first activity
-                    if not section['name']:
-                        section['name'] = section['activities'][0]['title']
-                else:
-                    section['name'] = 'Untitled Section'
-
-        # 6. Prepare output
-        output = {
-            'course_name': course_name,
-            'topics': [
-                {
-                    'name': s['name'], 
-                    'assignments': s['assignments'],
-                    'activities': s.get('activities', [])  # Include other activities
-                } for s in sections if s['assignments'] or s.get('activities') or s['name']
-            ]
-        }
-
-        return output
+                topic.activities.append(item)
+    
+    if not topic.name:
+        topic.name = sys.intern(derive_section_name(topic))
+    return topic
+
+def iter_mbz(mbz_path, reverse=False, attachments=None, clean=False):
+    """
+    Stream a Moodle backup section by section.
+    
+    Yields ('course', course_name) first, then ('topic', topic) for every
+    section. Each topic is complete when yielded, so callers can start
+    uploading it while later sections are still being parsed. With
+    reverse=True the sections are yielded last-to-first, which is the order
+    the importer creates them in.
+    
+    With an AttachmentStore, embedded files are stored and their
+    @@PLUGINFILE@@ links rewritten (see attachments.py). With clean=True,
+    descriptions are stripped of Word/editor markup first (html_cleaner.py);
+    inline data: images go to the attachment store if there is one.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        extract_mbz(mbz_path, tmpdir)
+        
+        yield 'course', read_course_name(tmpdir)
+        
+        backup_files = None
+        if attachments is not None:
+            backup_files = BackupAttachments(mbz_path, tmpdir, attachments)
+            backup_files.collect()
+        cleaner = HtmlCleaner(attachments) if clean else None
+        
+        sections = read_sections(tmpdir)
+        owners = assign_activity_owners(sections)
+        activity_index = index_activities(tmpdir)
+        
+        for section in (reversed(sections) if reverse else sections):
+            yield 'topic', build_topic(section, owners, activity_index, backup_files, cleaner)
+        
+        if cleaner is not None:
+            print(cleaner.summary())
+        if backup_files is not None:
+            print(backup_files.summary())
+
+def parse_mbz(mbz_path, attachments=None, clean=False):
+    """The whole backup as a Course (see course_model.py; it reads like the course JSON dict)"""
+    output = Course(None)
+    for kind, value in iter_mbz(mbz_path, attachments=attachments, clean=clean):
+        if kind == 'course':
+            output.course_name = sys.intern(value) if value else value
+        else:
+            output.topics.append(value)
+    return output
 
 def write_json(data, output_file='temp_data/current_course.json'):
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+        json.dump(stored_form(data), f, ensure_ascii=False, indent=2, default=as_jsonable)
 
 def write_json_to_imports(data, course_name):
     """Write JSON data to class_data/imports directory with timestamp and course name"""
@@ -168,19 +220,31 @@ def write_json_to_imports(data, course_name):
     filename = f"{timestamp}_{safe_course_name}.json"
     output_path = imports_dir / filename
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # Several workers may convert same-named courses in the same second
+    counter = 1
+    while True:
+        try:
+            f = open(output_path, 'x', encoding='utf-8')
+            break
+        except FileExistsError:
+            output_path = imports_dir / f"{timestamp}_{safe_course_name}_{counter}.json"
+            counter += 1
+    
+    with f:
+        json.dump(stored_form(data), f, ensure_ascii=False, indent=2, default=as_jsonable)
     
     return output_path
 
 if __name__ == '__main__':
     import sys
-    if len(sys.argv) < 2:
-        print("Usage: python mbz_to_json.py course.mbz")
+    args = [a for a in sys.argv[1:] if a not in ('--attachments', '--clean')]
+    if not args:
+        print("Usage: python mbz_to_json.py course.mbz [--attachments] [--clean]")
         sys.exit(1)
 
-    mbz_file = sys.argv[1]
-    course_data = parse_mbz(mbz_file)
+    mbz_file = args[0]
+    course_data = parse_mbz(mbz_file, AttachmentStore() if '--attachments' in sys.argv else None,
+                            clean='--clean' in sys.argv)
     
     # Save to imports directory
     output_path = write_json_to_imports(course_data, course_data['course_name'])
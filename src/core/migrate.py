@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+End-to-end Migration Script
+Streams a Moodle backup straight into Google Classroom and verifies it,
+without writing intermediate JSON files.
+"""
+
+import queue
+import threading
+from accounts import AccountPool
+from course_model import Course
+from mbz_to_json import iter_mbz, write_json, write_json_to_imports
+from manage_courses import COURSES_FILE
+from moodle_json_to_google_classroom import (
+    create_course, import_topics, record_course_data, print_import_summary
+)
+from verify_import import verify_course
+
+# How many parsed topics may wait for upload before the parser pauses
+PARSE_AHEAD = 8
+
+_DONE = object()
+
+def _parse_in_background(mbz_path, events, failure):
+    """Run the MBZ parser on a thread, feeding events into a bounded queue"""
+    try:
+        for event in iter_mbz(mbz_path, reverse=True):
+            events.put(event)
+    except Exception as e:
+        failure.append(e)
+    finally:
+        events.put(_DONE)
+
+def _iter_events(events, failure):
+    """The parser's events; a parser failure is raised here, in the consuming thread"""
+    while True:
+        event = events.get()
+        if event is _DONE:
+            if failure:
+                raise failure[0]
+            return
+        yield event
+
+def migrate_mbz(mbz_path, save_json=False, verify=True, accounts=None):
+    """Parse, import and verify one Moodle backup in a single process"""
+    # Start parsing before authenticating so both overlap
+    events = queue.Queue(maxsize=PARSE_AHEAD)
+    failure = []
+    parser = threading.Thread(target=_parse_in_background, args=(mbz_path, events, failure), daemon=True)
+    parser.start()
+
+    # The course goes to the least-loaded account in accounts.json (or the
+    # cached login), which is recorded as its owner
+    own_accounts = accounts is None
+    accounts = accounts or AccountPool.from_config()
+    try:
+        with accounts.checkout() as account, account.clients.client() as service:
+            return _migrate(service, account.name, mbz_path, events, failure, parser, save_json, verify)
+    finally:
+        if own_accounts:
+            accounts.close()
+
+def _migrate(service, owner, mbz_path, events, failure, parser, save_json, verify):
+    stream = _iter_events(events, failure)
+    kind, course_name = next(stream)
+
+    course_id, unique_name = create_course(service, course_name, owner)
+    print(f"Created course: {unique_name}")
+    # Recorded straight away, so a course a failed migration leaves behind can
+    # still be found and removed; the counts are filled in at the end
+    record_course_data(course_id, unique_name, 0, 0, mbz_path, owner)
+
+    # Topics arrive last section first, which is the order Classroom needs
+    imported_topics = []
+
+    def topics():
+        for kind, topic in stream:
+            imported_topics.append(topic)
+            yield topic
+
+    try:
+        topics_count, assignments_count = import_topics(service, course_id, topics())
+        parser.join()
+        if failure:
+            raise failure[0]
+    except Exception:
+        print(f"❌ Migration failed part-way: {unique_name} ({course_id}) is recorded in {COURSES_FILE} "
+              f"with only some of its content; delete it before migrating again")
+        raise
+
+    source_file = mbz_path
+    if save_json:
+        course_data = Course(course_name, list(reversed(imported_topics)))
+        source_file = str(write_json_to_imports(course_data, course_name))
+        write_json(course_data)
+        print(f"✅ Course data saved to: {source_file}")
+
+    record_course_data(course_id, unique_name, topics_count, assignments_count, source_file, owner)
+    print_import_summary(course_id, topics_count, assignments_count)
+
+    if verify:
+        print(f"\n✅ Verifying course {course_id}...")
+        found = verify_course(service, course_id)
+        found_items = found['courseWork'] + found['materials']
+        if found['topics'] == topics_count and found_items == assignments_count:
+            print("✅ Verification passed")
+        else:
+            print(f"❌ Verification mismatch: expected {topics_count} topics and "
+                  f"{assignments_count} items, found {found['topics']} topics and {found_items} items")
+
+    return course_id
+
+if __name__ == '__main__':
+    import sys
+
+    args = sys.argv[1:]
+    save_json = '--json' in args
+    verify = '--no-verify' not in args
+    args = [a for a in args if a not in ('--json', '--no-verify')]
+
+    if not args:
+        print("Usage: python migrate.py <mbz_file> [--json] [--no-verify]")
+        sys.exit(1)
+
+    migrate_mbz(args[0], save_json=save_json, verify=verify)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Classroom Mirror
+A local, read-through copy of Classroom state (courses, topics, courseWork
+and materials) in temp_data/mirror.db, so repeated reads don't refetch
+everything.
+
+- Courses are refreshed with one paginated courses.list when the local
+  copy is older than max_age.
+- courseWork and materials are refreshed incrementally: they are listed
+  newest updateTime first and paging stops at the first item that is no
+  newer than what the mirror already holds. An unchanged course therefore
+  costs one small request per kind.
+- Topics cannot be ordered by updateTime, so they are always re-listed
+  (courses have few topics).
+- Incremental refreshes cannot see deletions. A full refresh (which also
+  drops deleted items) runs when the last one is older than
+  FULL_REFRESH_SECONDS, or on `sync --full`.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from transport import iter_pages
+
+MIRROR_PATH = 'temp_data/mirror.db'
+COURSES_MAX_AGE = int(os.environ.get('CLASSROOM_MIRROR_MAX_AGE', '300'))
+FULL_REFRESH_SECONDS = 24 * 3600
+ITEM_PAGE_SIZE = 100
+
+COURSE_FIELDS = 'nextPageToken,courses(id,name,section,courseState,ownerId,creationTime,updateTime,alternateLink)'
+
+# kind -> (collection accessor, list response key, id field, supports orderBy updateTime)
+KINDS = {
+    'topic': (lambda service: service.courses().topics(), 'topic', 'topicId', False),
+    'courseWork': (lambda service: service.courses().courseWork(), 'courseWork', 'id', True),
+    'material': (lambda service: service.courses().courseWorkMaterials(), 'courseWorkMaterial', 'id', True),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    id TEXT PRIMARY KEY,
+    account TEXT NOT NULL,
+    name TEXT,
+    course_state TEXT,
+    update_time TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    course_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    update_time TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (course_id, kind, id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    full_synced_at REAL,
+    max_update_time TEXT,
+    PRIMARY KEY (scope, kind)
+);
+"""
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+class ClassroomMirror:
+    """Read-through local store of Classroom state; safe to share across threads"""
+
+    def __init__(self, path=MIRROR_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _sync_state(self, scope, kind):
+        return self._conn().execute(
+            'SELECT * FROM sync_state WHERE scope = ? AND kind = ?', (scope, kind)
+        ).fetchone()
+
+    def _mark_synced(self, conn, scope, kind, full, max_update_time=None):
+        previous = self._sync_state(scope, kind)
+        now = time.time()
+        conn.execute(
+            """INSERT OR REPLACE INTO sync_state
+               (scope, kind, synced_at, full_synced_at, max_update_time)
+               VALUES (?, ?, ?, ?, ?)""",
+            (scope, kind, now,
+             now if full else (previous['full_synced_at'] if previous else None),
+             max_update_time or (previous['max_update_time'] if previous else None))
+        )
+
+    # Courses
+    def _upsert_course(self, conn, course, account):
+        conn.execute(
+            """INSERT OR REPLACE INTO courses (id, account, name, course_state, update_time, data)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (course['id'], account, course.get('name'), course.get('courseState'),
+             course.get('updateTime'), json.dumps(course, ensure_ascii=False))
+        )
+
+    def record_course(self, course, account='default'):
+        """Store a course we just created or changed, without a round trip"""
+        with self._conn() as conn:
+            self._upsert_course(conn, course, account)
+
+    def update_course_states(self, course_ids, course_state):
+        with self._conn() as conn:
+            for course_id in course_ids:
+                row = conn.execute('SELECT data FROM courses WHERE id = ?', (course_id,)).fetchone()
+                if row:
+                    data = json.loads(row['data'])
+                    data['courseState'] = course_state
+                    conn.execute(
+                        'UPDATE courses SET course_state = ?, data = ? WHERE id = ?',
+                        (course_state, json.dumps(data, ensure_ascii=False), course_id)
+                    )
+
+    def forget_courses(self, course_ids):
+        with self._conn() as conn:
+            for course_id in course_ids:
+                conn.execute('DELETE FROM courses WHERE id = ?', (course_id,))
+                conn.execute('DELETE FROM items WHERE course_id = ?', (course_id,))
+                conn.execute('DELETE FROM sync_state WHERE scope = ?', (course_id,))
+
+    def write_through_courses(self, courses, account='default', changed=None):
+        """
+        Yield courses while storing them as the account's complete course list.
+        The new list is committed only once the iterable is exhausted; courses
+        missing from it are dropped. IDs whose updateTime changed are appended
+        to `changed`.
+        """
+        conn = self._conn()
+        known = {row['id']: row['update_time'] for row in conn.execute(
+            'SELECT id, update_time FROM courses WHERE account = ?', (account,)
+        )}
+        seen = set()
+        with conn:
+            for course in courses:
+                seen.add(course['id'])
+                if changed is not None and known.get(course['id']) != course.get('updateTime'):
+                    changed.append(course['id'])
+                self._upsert_course(conn, course, account)
+                yield course
+            for course_id in set(known) - seen:
+                conn.execute('DELETE FROM courses WHERE id = ?', (course_id,))
+                conn.execute('DELETE FROM items WHERE course_id = ?', (course_id,))
+                conn.execute('DELETE FROM sync_state WHERE scope = ?', (course_id,))
+            self._mark_synced(conn, f'account:{account}', 'courses', full=True)
+
+    def refresh_courses(self, service, account='default'):
+        """Re-list the account's courses; returns the IDs whose updateTime changed"""
+        courses = (c for page in iter_pages(service.courses().list, 'courses', fields=COURSE_FIELDS)
+                   for c in page)
+        changed = []
+        for _ in self.write_through_courses(courses, account, changed):
+            pass
+        return changed
+
+    def courses_fresh(self, account='default', max_age=COURSES_MAX_AGE):
+        state = self._sync_state(f'account:{account}', 'courses')
+        return bool(state and time.time() - state['synced_at'] <= max_age)
+
+    def courses(self, service=None, account='default', max_age=COURSES_MAX_AGE, refresh=False):
+        """The account's courses, re-listed first if the local copy is stale"""
+        if service is not None and (refresh or not self.courses_fresh(account, max_age)):
+            self.refresh_courses(service, account)
+        return [json.loads(row['data']) for row in self._conn().execute(
+            'SELECT data FROM courses WHERE account = ? ORDER BY rowid', (account,)
+        )]
+
+    def all_courses(self):
+        """Every mirrored course, across accounts, without contacting the API"""
+        return [json.loads(row['data']) for row in self._conn().execute('SELECT data FROM courses ORDER BY rowid')]
+
+    def course(self, course_id, service=None, account='default'):
+        row = self._conn().execute('SELECT data FROM courses WHERE id = ?', (course_id,)).fetchone()
+        if row:
+            return json.loads(row['data'])
+        if service is None:
+            return None
+        course = service.courses().get(id=course_id).execute()
+        self.record_course(course, account)
+        return course
+
+    # Topics, courseWork and materials
+    def refresh_items(self, service, course_id, kind, full=False):
+        """Fetch changed items of one kind; returns how many were stored"""
+        collection, items_key, id_field, ordered = KINDS[kind]
+        state = self._sync_state(course_id, kind)
+        if not ordered or not state or not state['full_synced_at'] or \
+                time.time() - state['full_synced_at'] > FULL_REFRESH_SECONDS:
+            full = True
+        since = None if full else _parse_time(state['max_update_time'])
+
+        kwargs = {'courseId': course_id, 'pageSize': ITEM_PAGE_SIZE}
+        if ordered:
+            kwargs['orderBy'] = 'updateTime desc'
+
+        fetched = []
+        for page in iter_pages(collection(service).list, items_key, **kwargs):
+            reached_known = False
+            for item in page:
+                if since and _parse_time(item.get('updateTime')) and _parse_time(item['updateTime']) < since:
+                    reached_known = True
+                    break
+                fetched.append(item)
+            if reached_known:
+                break
+
+        conn = self._conn()
+        with conn:
+            if full:
+                conn.execute('DELETE FROM items WHERE course_id = ? AND kind = ?', (course_id, kind))
+            for item in fetched:
+                conn.execute(
+                    """INSERT OR REPLACE INTO items (course_id, kind, id, update_time, data)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    (course_id, kind, item[id_field], item.get('updateTime'), json.dumps(item, ensure_ascii=False))
+                )
+            newest = max((i.get('updateTime') for i in fetched if i.get('updateTime')),
+                         key=_parse_time, default=None)
+            if state and state['max_update_time'] and newest and \
+                    _parse_time(state['max_update_time']) > _parse_time(newest):
+                newest = state['max_update_time']
+            self._mark_synced(conn, course_id, kind, full, newest)
+        return len(fetched)
+
+    def items(self, service, course_id, kind, max_age=0, full=False):
+        """Items of one kind, refreshed incrementally unless synced within max_age"""
+        state = self._sync_state(course_id, kind)
+        if service is not None and (full or not state or time.time() - state['synced_at'] > max_age):
+            self.refresh_items(service, course_id, kind, full=full)
+        return [json.loads(row['data']) for row in self._conn().execute(
+            'SELECT data FROM items WHERE course_id = ? AND kind = ? ORDER BY rowid', (course_id, kind)
+        )]
+
+    def sync(self, service, account='default', full=False):
+        """Refresh the course list, then the contents of courses that changed"""
+        changed = set(self.refresh_courses(service, account))
+        refreshed = 0
+        for course in self.courses(account=account):
+            never_synced = any(self._sync_state(course['id'], kind) is None for kind in KINDS)
+            if full or never_synced or course['id'] in changed:
+                for kind in KINDS:
+                    self.refresh_items(service, course['id'], kind, full=full)
+                refreshed += 1
+        return len(changed), refreshed
+
+    def status(self):
+        conn = self._conn()
+        courses = conn.execute('SELECT account, COUNT(*) AS n FROM courses GROUP BY account').fetchall()
+        items = conn.execute('SELECT kind, COUNT(*) AS n FROM items GROUP BY kind').fetchall()
+        return {
+            'courses': {row['account']: row['n'] for row in courses},
+            'items': {row['kind']: row['n'] for row in items},
+        }
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+def get_mirror():
+    """The process-wide mirror instance"""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = ClassroomMirror()
+        return _mirror
+
+def main():
+    import sys
+    from accounts import AccountPool
+
+    if len(sys.argv) < 2:
+        print("Usage:")
+        print("  python mirror.py sync [--full]    # Refresh the local mirror")
+        print("  python mirror.py status           # Show what the mirror holds")
+        return
+
+    command = sys.argv[1].lower()
+    mirror = get_mirror()
+
+    if command == 'sync':
+        pool = AccountPool.from_config(pool_size=1)
+        for account in pool.accounts.values():
+            started = time.time()
+            with account.clients.client() as service:
+                changed, refreshed = mirror.sync(service, account.name, full='--full' in sys.argv)
+            print(f"🔄 {account.name}: {changed} course(s) changed, {refreshed} refreshed "
+                  f"in {time.time() - started:.1f}s")
+        pool.close()
+
+    elif command == 'status':
+        status = mirror.status()
+        print("🪞 Mirror Status:")
+        for account, count in status['courses'].items():
+            print(f"  Courses ({account}): {count}")
+        for kind, count in status['items'].items():
+            print(f"  {kind}: {count}")
+
+    else:
+        print(f"❌ Unknown command: {command}")
+
+if __name__ == '__main__':
+    main()
@@ -1,74 +1,97 @@
 import json
 import os
+from collections import Counter
 from datetime import datetime
-from googleapiclient.discovery import build
-from auth_cache import get_cached_credentials
+from googleapiclient.errors import HttpError
+from transport import build_classroom_service, iter_items
+from auth_cache import get_shared_credentials
+from mirror import get_mirror
+from course_pool import claim_course
+from course_model import load_course
+from manage_courses import COURSES_FILE, updating_course_records
 import re
 from bs4 import BeautifulSoup
 
 # Helper function to get unique course name
-def get_unique_course_name(service, base_name):
+def get_unique_course_name(service, base_name, account='default'):
     """Check if course name exists and return a unique name with number suffix if needed"""
     try:
-        # Get all courses
-        courses = service.courses().list().execute()
+        # Only check active courses (not archived); served from the local mirror
+        # unless it is stale, and courses we create are added to it right away
+        existing_names = set(
+            course.get('name') for course in get_mirror().courses(service, account)
+            if course.get('courseState') != 'ARCHIVED'
+        )
         
-        if 'courses' not in courses:
-            return base_name
-        
-        existing_names = []
-        for course in courses['courses']:
-            # Only check active courses (not archived)
-            if course.get('courseState') != 'ARCHIVED':
-                existing_names.append(course['name'])
-        
-        # If base name doesn't exist, return it
-        if base_name not in existing_names:
-            return base_name
-        
-        # Find the next available number
-        counter = 1
-        while True:
-            new_name = f"{base_name} ({counter})"
-            if new_name not in existing_names:
-                return new_name
-            counter += 1
+        return next_free_name(base_name, existing_names)
             
     except Exception as e:
         print(f"Warning: Could not check existing courses: {e}")
         return base_name
 
+def next_free_name(base_name, existing_names):
+    """base_name, or the first "base_name (N)" not in existing_names"""
+    # If base name doesn't exist, return it
+    if base_name not in existing_names:
+        return base_name
+    
+    # Find the next available number
+    counter = 1
+    while True:
+        new_name = f"{base_name} ({counter})"
+        if new_name not in existing_names:
+            return new_name
+        counter += 1
+
 # 2. Load Course Data
 def load_course_data(filepath='temp_data/current_course.json'):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """Course JSON as a Course (course_model.py), which also reads like the dict"""
+    return load_course(filepath)
 
 # 3. Create Course
-def create_course(service, name):
+def create_course(service, name, account='default'):
     # Get unique course name
-    unique_name = get_unique_course_name(service, name)
+    unique_name = get_unique_course_name(service, name, account)
     
     if unique_name != name:
         print(f"⚠️  Course name '{name}' already exists. Using '{unique_name}' instead.")
     
-    body = {
-        'name': unique_name,
+    return create_named_course(service, unique_name, account), unique_name
+
+def course_body(name):
+    return {
+        'name': name,
         'section': 'Imported',
         'description': 'Imported from Moodle',
         'courseState': 'PROVISIONED'
     }
+
+def create_named_course(service, name, account='default'):
+    """Create a course with exactly this name; returns its ID"""
+    body = course_body(name)
+    
+    # Rename a pre-provisioned course if the pool has one for this account
+    course_id = claim_course(service, body, account)
+    if course_id:
+        return course_id
     
     try:
         course = service.courses().create(body=body).execute()
-        return course['id'], unique_name
-    except Exception as e:
+        get_mirror().record_course(course, account)
+        return course['id']
+    except HttpError as e:
+        # Only a rejected request is safe to send again; after a server error or
+        # timeout the course may exist, and the caller has to look for it first
+        if e.resp.status >= 500:
+            raise
         print(f"Error creating course: {e}")
         print("Trying with ownerId='me'...")
         
         # Try with ownerId='me'
         body['ownerId'] = 'me'
         course = service.courses().create(body=body).execute()
-        return course['id'], unique_name
+        get_mirror().record_course(course, account)
+        return course['id']
 
 # 4. Create Topics
 def sanitize_topic_name(name):
@@ -208,42 +231,33 @@ def convert_html_for_classroom(html):
     
     return text
 
-def create_assignment(service, course_id, title, description, topic_id):
+def assignment_body(title, description):
     # Convert description HTML to supported format
-    description = convert_html_for_classroom(description)
-    coursework = {
+    return {
         'title': title,
-        'description': description,
+        'description': convert_html_for_classroom(description),
         'workType': 'ASSIGNMENT',
-        'state': 'PUBLISHED',
-        'topicId': topic_id
+        'state': 'PUBLISHED'
     }
-    return service.courses().courseWork().create(courseId=course_id, body=coursework).execute()
 
-def create_material(service, course_id, title, description, topic_id):
+def material_body(title, description):
     # Convert description HTML to supported format
-    description = convert_html_for_classroom(description)
-    material = {
+    return {
         'title': title,
-        'description': description,
-        'state': 'PUBLISHED',
-        'topicId': topic_id
+        'description': convert_html_for_classroom(description),
+        'state': 'PUBLISHED'
     }
+
+def create_assignment(service, course_id, title, description, topic_id):
+    coursework = dict(assignment_body(title, description), topicId=topic_id)
+    return service.courses().courseWork().create(courseId=course_id, body=coursework).execute()
+
+def create_material(service, course_id, title, description, topic_id):
+    material = dict(material_body(title, description), topicId=topic_id)
     return service.courses().courseWorkMaterials().create(courseId=course_id, body=material).execute()
 
 # 6. Record Course Data
-def record_course_data(course_id, course_name, topics_count, assignments_count, source_file):
-    # Ensure class_data directory exists
-    os.makedirs('class_data', exist_ok=True)
-    
-    # Load existing data or create new
-    courses_file = 'class_data/courses.json'
-    if os.path.exists(courses_file):
-        with open(courses_file, 'r', encoding='utf-8') as f:
-            courses_data = json.load(f)
-    else:
-        courses_data = {'courses': []}
-    
+def record_course_data(course_id, course_name, topics_count, assignments_count, source_file, owner=None):
     # Create new course record
     course_record = {
         'id': course_id,
@@ -255,62 +269,154 @@ def record_course_data(course_id, course_name, topics_count, assignments_count,
         'classroom_url': f"https://classroom.google.com/c/{course_id}",
         'status': 'active'
     }
+    if owner:
+        # Account (see accounts.py) that created the course and must manage it
+        course_record['owner'] = owner
+    
+    # Copies and job queue workers import concurrently; the registry update is locked and atomic
+    with updating_course_records() as courses_data:
+        # Recording a course again (a resumed import, or a migration filling in
+        # its counts) updates its record instead of adding a second one
+        for index, previous in enumerate(courses_data['courses']):
+            if previous['id'] == course_id:
+                course_record['created_at'] = previous.get('created_at', course_record['created_at'])
+                if previous.get('owner'):
+                    course_record.setdefault('owner', previous['owner'])
+                courses_data['courses'][index] = course_record
+                break
+        else:
+            courses_data['courses'].append(course_record)
     
-    # Add to courses list
-    courses_data['courses'].append(course_record)
-    
-    # Save updated data
-    with open(courses_file, 'w', encoding='utf-8') as f:
-        json.dump(courses_data, f, ensure_ascii=False, indent=2)
-    
-    print(f"📝 Course record saved to {courses_file}")
+    print(f"📝 Course record saved to {COURSES_FILE}")
 
 # 7. Main Logic
-def import_course(filepath='temp_data/current_course.json'):
-    # Use cached credentials
-    creds = get_cached_credentials()
-    service = build('classroom', 'v1', credentials=creds)
-    
-    course_data = load_course_data(filepath)
-    
-    course_id, course_name = create_course(service, course_data['course_name'])
-    print(f"Created course: {course_name}")
+def prepare_topic(topic):
+    """
+    Convert one course JSON topic into ready-to-send request bodies, in the
+    order they must be created (reversed, as Classroom shows newest first)
+    """
+    return {
+        'name': topic['name'],
+        'courseWork': [assignment_body(a['title'], a['description']) for a in reversed(topic['assignments'])],
+        'materials': [material_body(a['title'], a['description']) for a in reversed(topic.get('activities', []))],
+    }
+
+def prepare_course_payloads(course_data):
+    """Prepare every topic of a course once, in creation order"""
+    return [prepare_topic(topic) for topic in reversed(course_data['topics'])]
 
+def existing_content(service, course_id):
+    """
+    {topic name: (topicId, Counter of its (kind, title))} already in a course.
+    Titles are counted, so of two same-titled items only the ones there are skipped.
+    """
+    topics = {t['topicId']: t['name'] for t in iter_items(
+        service.courses().topics().list, 'topic', courseId=course_id)}
+    content = {name: (topic_id, Counter()) for topic_id, name in topics.items()}
+    for collection, key in ((service.courses().courseWork(), 'courseWork'),
+                            (service.courses().courseWorkMaterials(), 'courseWorkMaterial')):
+        for item in iter_items(collection.list, key, courseId=course_id):
+            name = topics.get(item.get('topicId'))
+            if name is not None:
+                content[name][1][(key, item.get('title'))] += 1
+    return content
+
+def import_prepared_topic(service, course_id, prepared, verbose=True, existing=None):
+    """
+    Create one prepared topic with its assignments and materials; returns the
+    item count. With existing (see existing_content), a topic and items that
+    are already there are reused instead of created again.
+    """
+    topic_id, done = (existing or {}).get(sanitize_topic_name(prepared['name']), (None, Counter()))
+    if topic_id is None:
+        topic_id = create_topic(service, course_id, prepared['name'])['topicId']
+    topic_obj = {'topicId': topic_id}
+    if verbose:
+        print(f"  Topic: {prepared['name']}")
+    items_count = 0
+    
+    for body in prepared['courseWork']:
+        if done[('courseWork', body['title'])]:
+            done[('courseWork', body['title'])] -= 1
+            items_count += 1
+            continue
+        service.courses().courseWork().create(
+            courseId=course_id, body=dict(body, topicId=topic_obj['topicId'])
+        ).execute()
+        items_count += 1
+        if verbose:
+            print(f"    Added assignment: {body['title']}")
+    
+    for body in prepared['materials']:
+        if done[('courseWorkMaterial', body['title'])]:
+            done[('courseWorkMaterial', body['title'])] -= 1
+            items_count += 1
+            continue
+        service.courses().courseWorkMaterials().create(
+            courseId=course_id, body=dict(body, topicId=topic_obj['topicId'])
+        ).execute()
+        items_count += 1
+        if verbose:
+            print(f"    Added material: {body['title']}")
+    
+    return items_count
+
+def import_topic(service, course_id, topic, existing=None):
+    """Create one topic with its assignments and materials; returns the item count"""
+    # Assignments, then other activities as materials, each in reverse order
+    return import_prepared_topic(service, course_id, prepare_topic(topic), existing=existing)
+
+def import_topics(service, course_id, topics, existing=None):
+    """
+    Import topics in the order given; returns (topics_count, assignments_count).
+    
+    Google Classroom displays items newest first, so callers pass topics
+    last-section-first. topics may be any iterable, including a generator
+    that is still parsing the backup.
+    """
     topics_count = 0
     assignments_count = 0
+    for topic in topics:
+        assignments_count += import_topic(service, course_id, topic, existing)
+        topics_count += 1
+    return topics_count, assignments_count
+
+def print_import_summary(course_id, topics_count, assignments_count):
+    print(f"\n🎉 Course import completed!")
+    print(f"📊 Summary: {topics_count} topics, {assignments_count} assignments")
+    print(f"🔗 Classroom URL: https://classroom.google.com/c/{course_id}")
+
+def import_course(filepath='temp_data/current_course.json', service=None, owner=None,
+                  course_id=None, on_created=None):
+    """
+    Import a course JSON file into a new course. on_created(course_id,
+    course_name) is called as soon as the course exists. With course_id,
+    resume an earlier import into that course instead: topics and items it
+    already has are not created again.
+    """
+    if service is None:
+        # Kept fresh in the background so a long import never hits an expired token
+        creds = get_shared_credentials()
+        service = build_classroom_service(creds)
+    
+    course_data = load_course_data(filepath)
+    
+    if course_id:
+        course_name = get_mirror().course(course_id, service, owner or 'default')['name']
+        existing = existing_content(service, course_id)
+        print(f"Resuming course: {course_name} ({len(existing)} topics already there)")
+    else:
+        course_id, course_name = create_course(service, course_data['course_name'], owner or 'default')
+        existing = None
+        print(f"Created course: {course_name}")
+        if on_created:
+            on_created(course_id, course_name)
     
     # Reverse the topics order so earlier sections appear first in Google Classroom
     # (Google Classroom displays items in reverse chronological order - newest first)
-    reversed_topics = list(reversed(course_data['topics']))
-    
-    for topic in reversed_topics:
-        topic_obj = create_topic(service, course_id, topic['name'])
-        topics_count += 1
-        print(f"  Topic: {topic['name']}")
-        
-        # Import assignments in reverse order
-        for assignment in reversed(topic['assignments']):
-            create_assignment(
-                service,
-                course_id,
-                assignment['title'],
-                assignment['description'],
-                topic_obj['topicId']
-            )
-            assignments_count += 1
-            print(f"    Added assignment: {assignment['title']}")
-        
-        # Import other activities as materials in reverse order
-        for activity in reversed(topic.get('activities', [])):
-            create_material(
-                service,
-                course_id,
-                activity['title'],
-                activity['description'],
-                topic_obj['topicId']
-            )
-            assignments_count += 1
-            print(f"    Added material: {activity['title']}")
+    topics_count, assignments_count = import_topics(
+        service, course_id, reversed(course_data['topics']), existing
+    )
     
     # Record the course data
     record_course_data(
@@ -318,12 +424,120 @@ def import_course(filepath='temp_data/current_course.json'):
         course_name, 
         topics_count, 
         assignments_count,
-        filepath
+        filepath,
+        owner
     )
     
-    print(f"\n🎉 Course import completed!")
-    print(f"📊 Summary: {topics_count} topics, {assignments_count} assignments")
-    print(f"🔗 Classroom URL: https://classroom.google.com/c/{course_id}")
+    print_import_summary(course_id, topics_count, assignments_count)
+    return {
+        'course_id': course_id,
+        'course_name': course_name,
+        'topics_count': topics_count,
+        'assignments_count': assignments_count,
+        'owner': owner
+    }
+
+# Cohort fan-out: one course JSON imported into several Classroom courses
+COPY_CONCURRENCY = int(os.environ.get('CLASSROOM_COPY_CONCURRENCY', '4'))
+
+def cohort_course_names(base_name, existing_names, copies=None, cohorts=None):
+    """
+    Allocate every copy's name locally from one snapshot of existing names:
+    "<base> - <cohort>" per cohort, or base_name N times, suffixed like
+    get_unique_course_name when taken
+    """
+    wanted = [f"{base_name} - {cohort}" for cohort in cohorts] if cohorts else [base_name] * copies
+    taken = set(existing_names)
+    names = []
+    for name in wanted:
+        name = next_free_name(name, taken)
+        taken.add(name)
+        names.append(name)
+    return names
+
+def import_course_copies(filepath, copies=None, cohorts=None, accounts=None, account_name=None):
+    """
+    Import one course JSON as several courses in parallel. Descriptions are
+    converted once, names are allocated without further API calls, and the
+    copies share the accounts' client pools and rate limits. Topics within a
+    copy are still created one at a time to keep their display order. With
+    account_name, every copy is owned by that account instead of being spread
+    over all of them.
+    
+    Returns one result per copy, in name order. A copy that failed has an
+    'error' and, if its course was created, is still recorded with what it
+    got; the other copies carry on.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from contextlib import nullcontext
+    from accounts import AccountPool
+    
+    own_accounts = accounts is None
+    accounts = accounts or AccountPool.from_config()
+    owner = accounts.get(account_name) if account_name else None
+    course_data = load_course_data(filepath)
+    prepared = prepare_course_payloads(course_data)
+    
+    existing_names = set()
+    for account in [owner] if owner else accounts.accounts.values():
+        with account.clients.client() as service:
+            existing_names.update(
+                c.get('name') for c in get_mirror().courses(service, account.name)
+                if c.get('courseState') != 'ARCHIVED'
+            )
+    names = cohort_course_names(course_data['course_name'], existing_names, copies, cohorts)
+    print(f"📦 Importing {len(names)} copies of '{course_data['course_name']}'...")
+    
+    def import_copy(name):
+        with (nullcontext(owner) if owner else accounts.checkout()) as account, \
+                account.clients.client() as service:
+            course_id = None
+            topics_count = assignments_count = 0
+            try:
+                course_id = create_named_course(service, name, account.name)
+                for topic in prepared:
+                    assignments_count += import_prepared_topic(service, course_id, topic, verbose=False)
+                    topics_count += 1
+            except Exception as e:
+                print(f"❌ {name}: {e}")
+                if course_id:
+                    # Keep the partial course findable so it can be removed or finished
+                    record_course_data(course_id, name, topics_count, assignments_count, filepath, account.name)
+                return {
+                    'course_id': course_id,
+                    'course_name': name,
+                    'topics_count': topics_count,
+                    'assignments_count': assignments_count,
+                    'owner': account.name,
+                    'error': str(e)
+                }
+        record_course_data(course_id, name, topics_count, assignments_count, filepath, account.name)
+        print(f"✅ {name}: {topics_count} topics, {assignments_count} assignments "
+              f"(https://classroom.google.com/c/{course_id})")
+        return {
+            'course_id': course_id,
+            'course_name': name,
+            'topics_count': topics_count,
+            'assignments_count': assignments_count,
+            'owner': account.name
+        }
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(COPY_CONCURRENCY, len(names)))) as executor:
+            futures = {executor.submit(import_copy, name): name for name in names}
+            results = {}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    # Failed before its course was created (no account or client)
+                    print(f"❌ {name}: {e}")
+                    results[name] = {'course_id': None, 'course_name': name, 'error': str(e)}
+        return [results[name] for name in names]
+    finally:
+        if own_accounts:
+            accounts.close()
 
 if __name__ == '__main__':
     import sys
@@ -333,6 +547,31 @@ if __name__ == '__main__':
     if test_mode:
         sys.argv.remove('--test')
     
+    # Optionally import as a specific account from accounts.json
+    account_name = None
+    if '--account' in sys.argv:
+        index = sys.argv.index('--account')
+        account_name = sys.argv[index + 1]
+        del sys.argv[index:index + 2]
+    
+    # Fan out to several courses: --copies N or --cohorts "A,B,C"
+    copies = cohorts = None
+    if '--copies' in sys.argv:
+        index = sys.argv.index('--copies')
+        try:
+            copies = int(sys.argv[index + 1])
+        except (IndexError, ValueError):
+            copies = 0
+        if copies < 1:
+            print("❌ --copies needs a whole number of at least 1")
+            print("Usage: python moodle_json_to_google_classroom.py <json_file> [--copies N | --cohorts \"A,B\"] [--account NAME]")
+            sys.exit(1)
+        del sys.argv[index:index + 2]
+    if '--cohorts' in sys.argv:
+        index = sys.argv.index('--cohorts')
+        cohorts = [c.strip() for c in sys.argv[index + 1].split(',') if c.strip()]
+        del sys.argv[index:index + 2]
+    
     filepath = sys.argv[1] if len(sys.argv) > 1 else 'temp_data/current_course.json'
     
     # Test mode - just read and display the data
@@ -343,5 +582,24 @@ if __name__ == '__main__':
         for topic in course_data['topics']:
             print(f"  - {topic['name']} ({len(topic['assignments'])} assignments, {len(topic.get('activities', []))} activities)")
         print("✅ Script is working correctly!")
+    elif copies or cohorts:
+        try:
+            results = import_course_copies(filepath, copies=copies, cohorts=cohorts, account_name=account_name)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        failed = [r for r in results if 'error' in r]
+        if failed:
+            print(f"❌ {len(failed)} of {len(results)} copies failed: " + ", ".join(r['course_name'] for r in failed))
+            sys.exit(1)
+    elif account_name:
+        from accounts import AccountPool
+        try:
+            account = AccountPool.from_config().get(account_name)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        with account.clients.client() as service:
+            import_course(filepath, service=service, owner=account.name)
     else:
         import_course(filepath)
@@ -1,10 +1,35 @@
+import gzip
+import hashlib
+import io
 import json
 import os
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 import re
+import time
 from bs4 import BeautifulSoup
+from course_model import Assignment, Course, Topic, as_course, as_jsonable, load_course
+from description_store import stored_form
 
+# Records what the last export wrote, so re-exports only touch changed files
+MANIFEST_FILE = '.export-manifest.json'
+# Bump when the rendered layout changes, so old exports are fully rewritten
+RENDER_VERSION = 1
+EXPORT_WORKERS = 8
+ARCHIVE_SUFFIXES = ('.zip', '.tar.gz', '.tgz')
+
+# Parsed markdown files, keyed by path, mtime and size, one cache file per markdown tree
+IMPORT_CACHE_DIR = 'temp_data/markdown_cache'
+# Bump when parsing changes, so cached results are discarded
+PARSE_VERSION = 1
+IMPORT_WORKERS = 8
+WATCH_INTERVAL_SECONDS = 1.0
+
+@lru_cache(maxsize=4096)
 def sanitize_filename(name):
     """Convert a string to a safe filename"""
     # Remove or replace invalid characters
@@ -75,45 +100,51 @@ def html_to_markdown(html_content):
     text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
     return text.strip()
 
-def export_course_to_markdown(course_data, output_dir):
-    """Export course data to markdown-based schema"""
-    
-    # Create output directory
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
-    
+def _section_dir(number, name):
+    return f"section-{number:02d}-{sanitize_filename(name)}"
+
+def _assignment_dir(number, title):
+    return f"assignment-{number:02d}-{sanitize_filename(title)}"
+
+def render_course_markdown(course_data, root_name):
+    """
+    Yield the export as (relative path, content) pairs, one file at a time.
+    Content depends only on course_data, so re-rendering an unchanged course
+    gives identical bytes; the export time lives in the manifest instead.
+    """
+    topics = course_data['topics']
+    total_assignments = sum(len(topic['assignments']) for topic in topics)
+    section_dirs = [_section_dir(i, topic['name']) for i, topic in enumerate(topics, 1)]
+
     # Create course-info.md at root
     course_info_content = f"""# {course_data['course_name']}
 
 ## Course Overview
-This course was exported from Moodle on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.
+This course was exported from Moodle.
 
 ## Course Structure
-This course contains {len(course_data['topics'])} sections with a total of {sum(len(topic['assignments']) for topic in course_data['topics'])} assignments.
+This course contains {len(topics)} sections with a total of {total_assignments} assignments.
 
 ## Sections
 """
     
-    for i, topic in enumerate(course_data['topics'], 1):
+    for i, topic in enumerate(topics, 1):
         if topic['assignments']:
-            course_info_content += f"{i}. [{topic['name']}](section-{i:02d}-{sanitize_filename(topic['name'])}/README.md) - {len(topic['assignments'])} assignments\n"
+            course_info_content += f"{i}. [{topic['name']}]({section_dirs[i-1]}/README.md) - {len(topic['assignments'])} assignments\n"
     
-    course_info_content += "\n## Export Information\n- **Export Date:** " + datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    course_info_content += "\n## Export Information"
+    course_info_content += f"\n- **Export Date:** see {MANIFEST_FILE}"
     course_info_content += "\n- **Source:** Moodle Course Backup"
     course_info_content += "\n- **Format:** Markdown-based schema"
-    
-    with open(output_path / "course-info.md", 'w', encoding='utf-8') as f:
-        f.write(course_info_content)
+    yield ("course-info.md", course_info_content)
     
     # Process each section
-    for i, topic in enumerate(course_data['topics'], 1):
+    for i, topic in enumerate(topics, 1):
         if not topic['assignments']:
             continue
             
-        # Create section folder
-        section_name = sanitize_filename(topic['name'])
-        section_folder = output_path / f"section-{i:02d}-{section_name}"
-        section_folder.mkdir(exist_ok=True)
+        section_folder = section_dirs[i-1]
+        assignment_dirs = [_assignment_dir(j, a['title']) for j, a in enumerate(topic['assignments'], 1)]
         
         # Create section.md (Moodle metadata)
         section_metadata = f"""# Section: {topic['name']}
@@ -122,7 +153,6 @@ This course contains {len(course_data['topics'])} sections with a total of {sum(
 - **Section Number:** {i}
 - **Section Name:** {topic['name']}
 - **Number of Assignments:** {len(topic['assignments'])}
-- **Export Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ## Moodle Metadata
 This section was extracted from Moodle with the following structure:
@@ -133,11 +163,9 @@ This section was extracted from Moodle with the following structure:
 """
         
         for j, assignment in enumerate(topic['assignments'], 1):
-            assignment_filename = f"assignment-{j:02d}-{sanitize_filename(assignment['title'])}"
-            section_metadata += f"{j}. [{assignment['title']}]({assignment_filename}/assignment.md)\n"
+            section_metadata += f"{j}. [{assignment['title']}]({assignment_dirs[j-1]}/assignment.md)\n"
         
-        with open(section_folder / "section.md", 'w', encoding='utf-8') as f:
-            f.write(section_metadata)
+        yield (f"{section_folder}/section.md", section_metadata)
         
         # Create README.md (human-readable summary)
         readme_content = f"""# {topic['name']}
@@ -149,38 +177,36 @@ This section contains {len(topic['assignments'])} assignments focused on {topic[
 """
         
         for j, assignment in enumerate(topic['assignments'], 1):
-            assignment_filename = f"assignment-{j:02d}-{sanitize_filename(assignment['title'])}"
-            readme_content += f"- **[Assignment {j}]({assignment_filename}/assignment.md)**: {assignment['title']}\n"
+            readme_content += f"- **[Assignment {j}]({assignment_dirs[j-1]}/assignment.md)**: {assignment['title']}\n"
         
+        previous_section = section_dirs[i-2] if i > 1 else f"section-{i-1:02d}-index"
+        next_section = section_dirs[i] if i < len(topics) else f"section-{i+1:02d}-index"
         readme_content += f"""
 
 ## Section Summary
 This section covers {topic['name'].lower()} with practical assignments and theoretical content.
 
 ## Navigation
-- [← Previous Section](../section-{i-1:02d}-{sanitize_filename(course_data['topics'][i-2]['name']) if i > 1 else 'index'}/README.md)
+- [← Previous Section](../{previous_section}/README.md)
 - [↑ Course Overview](../course-info.md)
-- [Next Section →](../section-{i+1:02d}-{sanitize_filename(course_data['topics'][i]['name']) if i < len(course_data['topics']) else 'index'}/README.md)
+- [Next Section →](../{next_section}/README.md)
 """
         
-        with open(section_folder / "README.md", 'w', encoding='utf-8') as f:
-            f.write(readme_content)
+        yield (f"{section_folder}/README.md", readme_content)
         
         # Create assignment folders and files
         for j, assignment in enumerate(topic['assignments'], 1):
-            assignment_folder = section_folder / f"assignment-{j:02d}-{sanitize_filename(assignment['title'])}"
-            assignment_folder.mkdir(exist_ok=True)
-            
             # Convert HTML description to markdown
             markdown_description = html_to_markdown(assignment['description'])
             
+            previous_assignment = assignment_dirs[j-2] if j > 1 else f"assignment-{j-1:02d}-index"
+            next_assignment = assignment_dirs[j] if j < len(topic['assignments']) else f"assignment-{j+1:02d}-index"
             # Create assignment.md
             assignment_content = f"""# {assignment['title']}
 
 ## Assignment Information
 - **Assignment Number:** {j}
 - **Section:** {topic['name']}
-- **Export Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ## Assignment Description
 {markdown_description}
@@ -191,13 +217,12 @@ This section covers {topic['name'].lower()} with practical assignments and theor
 - **Order:** {j} of {len(topic['assignments'])} in this section
 
 ## Navigation
-- [← Previous Assignment](../assignment-{j-1:02d}-{sanitize_filename(topic['assignments'][j-2]['title']) if j > 1 else 'index'}/assignment.md)
+- [← Previous Assignment](../{previous_assignment}/assignment.md)
 - [↑ Section Overview](../README.md)
-- [Next Assignment →](../assignment-{j+1:02d}-{sanitize_filename(topic['assignments'][j]['title']) if j < len(topic['assignments']) else 'index'}/assignment.md)
+- [Next Assignment →](../{next_assignment}/assignment.md)
 """
             
-            with open(assignment_folder / "assignment.md", 'w', encoding='utf-8') as f:
-                f.write(assignment_content)
+            yield (f"{section_folder}/{assignment_dirs[j-1]}/assignment.md", assignment_content)
     
     # Create main README.md at root
     main_readme = f"""# {course_data['course_name']}
@@ -213,7 +238,7 @@ This folder contains a human-readable export of the Moodle course "{course_data[
 
 ## Folder Structure
 ```
-{output_path.name}/
+{root_name}/
 ├── course-info.md          # Course overview and metadata
 ├── section-01-*/           # First section
 │   ├── section.md          # Moodle metadata
@@ -232,154 +257,470 @@ This folder contains a human-readable export of the Moodle course "{course_data[
 - The course-info.md file provides the overall structure
 
 ## Export Information
-- **Exported:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+- **Exported:** see {MANIFEST_FILE}
 - **Source:** Moodle Course Backup
 - **Format:** Markdown-based schema
-- **Total Sections:** {len([t for t in course_data['topics'] if t['assignments']])}
-- **Total Assignments:** {sum(len(topic['assignments']) for topic in course_data['topics'])}
+- **Total Sections:** {len([t for t in topics if t['assignments']])}
+- **Total Assignments:** {total_assignments}
 
 ## Getting Started
 Start by reading the [course overview](course-info.md) to understand the course structure.
 """
     
-    with open(output_path / "README.md", 'w', encoding='utf-8') as f:
-        f.write(main_readme)
+    yield ("README.md", main_readme)
+
+def source_hash(course_data):
+    """Hash of everything the rendered export depends on"""
+    payload = json.dumps(course_data, sort_keys=True, ensure_ascii=False, default=as_jsonable)
+    return hashlib.sha256(f"{RENDER_VERSION}\n{payload}".encode('utf-8')).hexdigest()
+
+def load_manifest(output_path):
+    manifest_file = Path(output_path) / MANIFEST_FILE
+    if not manifest_file.exists():
+        return {}
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(output_path, manifest):
+    manifest_file = output_path / MANIFEST_FILE
+    tmp_file = output_path / f"{MANIFEST_FILE}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_file, manifest_file)
+
+def _on_disk(path, entry):
+    """True if path still holds what the manifest recorded for it (checked by stat)"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return False
+    return stat.st_size == entry.get('size') and stat.st_mtime_ns == entry.get('mtime_ns')
+
+def _write_file(path, content):
+    data = content.encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(data)
+    stat = path.stat()
+    return {'sha256': hashlib.sha256(data).hexdigest(), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def export_course_to_markdown(course_data, output_dir, workers=EXPORT_WORKERS):
+    """
+    Export course data to markdown-based schema. Files whose content and
+    on-disk copy are unchanged since the last export are left alone; files
+    from the last export that no longer belong are removed.
+    """
+    
+    # Descriptions stored by reference are resolved here (see description_store.py)
+    course_data = as_course(course_data)
+    
+    # Create output directory
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    
+    previous = load_manifest(output_path)
+    old_files = previous.get('files', {})
+    digest = source_hash(course_data)
+    
+    # Same source and nothing touched on disk: no need to even render
+    if previous.get('source_sha256') == digest and \
+            all(_on_disk(output_path / rel, entry) for rel, entry in old_files.items()):
+        print(f"✅ Export is up to date ({len(old_files)} files unchanged)")
+        return output_path
+    
+    files = list(render_course_markdown(course_data, output_path.name))
+    new_files = {}
+    pending = []
+    for rel, content in files:
+        entry = old_files.get(rel)
+        content_sha = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        if entry and entry.get('sha256') == content_sha and _on_disk(output_path / rel, entry):
+            new_files[rel] = entry
+        else:
+            pending.append((rel, content))
+    
+    for folder in sorted({(output_path / rel).parent for rel, _ in pending}):
+        folder.mkdir(parents=True, exist_ok=True)
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        written = executor.map(lambda item: (item[0], _write_file(output_path / item[0], item[1])), pending)
+        new_files.update(written)
     
+    # Remove files left over from the previous export (renamed or dropped items),
+    # never anything outside the export folder, whatever the manifest says
+    stale = [rel for rel in old_files if rel not in new_files]
+    root = output_path.resolve()
+    removed = 0
+    for rel in stale:
+        path = (output_path / rel).resolve()
+        if root not in path.parents:
+            print(f"⚠️  Not removing {rel}: outside {output_path}")
+            continue
+        path.unlink(missing_ok=True)
+        removed += 1
+        for parent in path.parents:
+            if parent == root or any(parent.iterdir()):
+                break
+            parent.rmdir()
+    
+    if pending or stale or previous.get('source_sha256') != digest:
+        _save_manifest(output_path, {
+            'version': RENDER_VERSION,
+            'exported_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S') if pending or stale else previous.get('exported_at'),
+            'source_sha256': digest,
+            'files': new_files,
+        })
+    
+    print(f"📝 {len(pending)} written, {len(files) - len(pending)} unchanged, {removed} removed")
     return output_path
 
-def import_markdown_to_course(markdown_dir):
-    """Import markdown-based schema back to course data structure"""
+def _parse_course_info(text):
+    # Extract course name from first line
+    return {'course_name': text.split('\n')[0].replace('# ', '')}
+
+def _parse_section(text):
+    # Extract section name
+    return {'name': text.split('\n')[0].replace('# Section: ', '')}
+
+def _parse_assignment(text):
+    # Extract assignment title and description
+    lines = text.split('\n')
+    title = lines[0].replace('# ', '')
+    
+    # Find description section
+    description_start = None
+    for i, line in enumerate(lines):
+        if line.strip() == "## Assignment Description":
+            description_start = i + 1
+            break
+    
+    if description_start:
+        description_lines = []
+        for line in lines[description_start:]:
+            if line.startswith('## '):
+                break
+            description_lines.append(line)
+        description = '\n'.join(description_lines).strip()
+    else:
+        description = ""
+    
+    return {'title': title, 'description': description}
+
+def _sorted_dirs(path, prefix):
+    with os.scandir(path) as entries:
+        return sorted(e.name for e in entries if e.is_dir() and e.name.startswith(prefix))
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def scan_markdown_tree(markdown_dir):
+    """
+    The files an import reads, as [(relative path, [mtime_ns, size])], in
+    course order. Only directories are listed and files stat'ed; nothing is read.
+    """
+    markdown_path = Path(markdown_dir)
+    files = [("course-info.md", _stat(markdown_path / "course-info.md"))]
+    for section in _sorted_dirs(markdown_path, 'section-'):
+        section_stat = _stat(markdown_path / section / "section.md")
+        if section_stat is None:
+            continue
+        files.append((f"{section}/section.md", section_stat))
+        for assignment in _sorted_dirs(markdown_path / section, 'assignment-'):
+            rel = f"{section}/{assignment}/assignment.md"
+            assignment_stat = _stat(markdown_path / rel)
+            if assignment_stat is not None:
+                files.append((rel, assignment_stat))
+    return files
+
+def _parse_file(rel, text):
+    if rel == "course-info.md":
+        return _parse_course_info(text)
+    if rel.endswith("/section.md"):
+        return _parse_section(text)
+    return _parse_assignment(text)
+
+def _cache_path(markdown_dir):
+    key = hashlib.sha1(os.path.abspath(markdown_dir).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(IMPORT_CACHE_DIR, f"{key}.json")
+
+def _load_import_cache(markdown_dir):
+    path = _cache_path(markdown_dir)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get('files', {}) if cache.get('version') == PARSE_VERSION else {}
+
+def _save_import_cache(markdown_dir, files):
+    path = _cache_path(markdown_dir)
+    os.makedirs(IMPORT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': PARSE_VERSION, 'root': os.path.abspath(markdown_dir), 'files': files}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def import_markdown_to_course(markdown_dir, use_cache=True, workers=IMPORT_WORKERS, stats=None):
+    """
+    Import markdown-based schema back to course data structure, from a folder
+    or an archive written by export --archive. Folder files are read
+    concurrently, and parsed results are cached by path, mtime and size, so
+    only edited files are parsed again.
+    """
     markdown_path = Path(markdown_dir)
     
     if not markdown_path.exists():
         raise ValueError(f"Markdown directory does not exist: {markdown_dir}")
+    if markdown_path.is_file() and is_archive_path(markdown_path):
+        course_data = import_markdown_archive(markdown_path)
+        if stats is not None:
+            stats.update({'parsed': 1 + sum(1 + len(t['assignments']) for t in course_data['topics']), 'cached': 0})
+        return course_data
     
-    # Read course info
-    course_info_file = markdown_path / "course-info.md"
-    if not course_info_file.exists():
+    files = scan_markdown_tree(markdown_dir)
+    if files[0][1] is None:
         raise ValueError("course-info.md not found in markdown directory")
     
-    with open(course_info_file, 'r', encoding='utf-8') as f:
-        course_info_content = f.read()
+    cache = _load_import_cache(markdown_dir) if use_cache else {}
+    parsed = {}
+    stale = []
+    for rel, stat in files:
+        entry = cache.get(rel)
+        if entry and entry['stat'] == stat:
+            parsed[rel] = entry['parsed']
+        else:
+            stale.append(rel)
     
-    # Extract course name from first line
-    course_name = course_info_content.split('\n')[0].replace('# ', '')
+    def read_and_parse(rel):
+        with open(markdown_path / rel, 'r', encoding='utf-8') as f:
+            return rel, _parse_file(rel, f.read())
     
-    # Find all section folders
-    section_folders = sorted([d for d in markdown_path.iterdir() 
-                            if d.is_dir() and d.name.startswith('section-')])
+    if stale:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(stale)))) as executor:
+            parsed.update(executor.map(read_and_parse, stale))
+    if stats is not None:
+        stats.update({'parsed': len(stale), 'cached': len(files) - len(stale)})
+    
+    if use_cache and (stale or len(cache) != len(files)):
+        _save_import_cache(markdown_dir, {rel: {'stat': stat, 'parsed': parsed[rel]} for rel, stat in files})
+    
+    return _assemble_course([rel for rel, _ in files], parsed)
+
+def _assemble_course(order, parsed):
+    """A Course from parsed files, given in scan order"""
+    course = Course(parsed["course-info.md"]['course_name'])
+    for rel in order[1:]:
+        if rel.endswith("/section.md"):
+            course.topics.append(Topic(parsed[rel]['name']))
+        else:
+            course.topics[-1].assignments.append(Assignment.from_dict(parsed[rel]))
+    return course
+
+def is_archive_path(path):
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+class ZipSink:
+    """Writes rendered files into a zip, with fixed timestamps so unchanged courses give identical archives"""
+
+    def __init__(self, fileobj):
+        self.archive = zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def add(self, name, data):
+        info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        self.archive.writestr(info, data)
+
+    def close(self):
+        self.archive.close()
+
+class TarSink:
+    """Writes rendered files into a tar.gz, with fixed timestamps like ZipSink"""
+
+    def __init__(self, fileobj):
+        self.gzip = gzip.GzipFile(fileobj=fileobj, mode='wb', mtime=0)
+        self.archive = tarfile.open(fileobj=self.gzip, mode='w', format=tarfile.PAX_FORMAT)
+
+    def add(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mode = 0o644
+        self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.archive.close()
+        self.gzip.close()
+
+def export_course_to_archive(course_data, archive_path):
+    """
+    Stream the markdown export into a .zip or .tar.gz at archive_path, one
+    file at a time, without creating the folder tree. Entries sit under a
+    top-level folder named after the archive.
+    """
+    course_data = as_course(course_data)
+    archive_path = Path(archive_path)
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    name = archive_path.name
+    for suffix in ARCHIVE_SUFFIXES:
+        if name.lower().endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    sink_class = ZipSink if archive_path.name.lower().endswith('.zip') else TarSink
     
-    topics = []
+    tmp_path = archive_path.with_name(f"{archive_path.name}.{os.getpid()}.tmp")
+    count = 0
+    with open(tmp_path, 'wb') as f:
+        sink = sink_class(f)
+        try:
+            for rel, content in render_course_markdown(course_data, name):
+                sink.add(f"{name}/{rel}", content.encode('utf-8'))
+                count += 1
+        finally:
+            sink.close()
+    os.replace(tmp_path, archive_path)
+    print(f"📦 {count} files written to {archive_path}")
+    return archive_path
+
+def _read_archive(archive_path):
+    """{name: text} for the markdown files in a .zip or .tar.gz export"""
+    texts = {}
+    if str(archive_path).lower().endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as archive:
+            for name in archive.namelist():
+                if name.endswith('.md'):
+                    texts[name] = archive.read(name).decode('utf-8')
+    else:
+        with tarfile.open(archive_path, 'r:*') as archive:
+            for member in archive:
+                if member.isfile() and member.name.endswith('.md'):
+                    texts[member.name] = archive.extractfile(member).read().decode('utf-8')
+    return texts
+
+def import_markdown_archive(archive_path):
+    """Import a course from an archive written by export_course_to_archive"""
+    texts = _read_archive(archive_path)
+    roots = [name[:-len("course-info.md")] for name in texts
+             if name == "course-info.md" or name.endswith("/course-info.md")]
+    if not roots:
+        raise ValueError("course-info.md not found in markdown archive")
+    root = min(roots, key=len)
     
-    for section_folder in section_folders:
-        # Read section metadata
-        section_md_file = section_folder / "section.md"
-        if not section_md_file.exists():
+    # Same layout and order scan_markdown_tree gives for a folder
+    files = {name[len(root):]: text for name, text in texts.items() if name.startswith(root)}
+    order = ["course-info.md"]
+    for section in sorted({rel.split('/')[0] for rel in files if rel.startswith('section-') and rel.count('/') == 1}):
+        if f"{section}/section.md" not in files:
             continue
-        
-        with open(section_md_file, 'r', encoding='utf-8') as f:
-            section_content = f.read()
-        
-        # Extract section name
-        section_name = section_content.split('\n')[0].replace('# Section: ', '')
-        
-        # Find all assignment folders
-        assignment_folders = sorted([d for d in section_folder.iterdir() 
-                                   if d.is_dir() and d.name.startswith('assignment-')])
-        
-        assignments = []
-        
-        for assignment_folder in assignment_folders:
-            assignment_md_file = assignment_folder / "assignment.md"
-            if not assignment_md_file.exists():
-                continue
-            
-            with open(assignment_md_file, 'r', encoding='utf-8') as f:
-                assignment_content = f.read()
-            
-            # Extract assignment title and description
-            lines = assignment_content.split('\n')
-            title = lines[0].replace('# ', '')
-            
-            # Find description section
-            description_start = None
-            for i, line in enumerate(lines):
-                if line.strip() == "## Assignment Description":
-                    description_start = i + 1
-                    break
-            
-            if description_start:
-                description_lines = []
-                for line in lines[description_start:]:
-                    if line.startswith('## '):
-                        break
-                    description_lines.append(line)
-                description = '\n'.join(description_lines).strip()
-            else:
-                description = ""
-            
-            assignments.append({
-                'title': title,
-                'description': description
-            })
-        
-        topics.append({
-            'name': section_name,
-            'assignments': assignments
-        })
+        order.append(f"{section}/section.md")
+        order.extend(sorted(rel for rel in files
+                            if rel.startswith(f"{section}/assignment-") and rel.endswith("/assignment.md")
+                            and rel.count('/') == 2))
+    return _assemble_course(order, {rel: _parse_file(rel, files[rel]) for rel in order})
+
+def default_export_path(course_data, json_file):
+    """
+    class_data/exports/<course-name>-<id>, where id is derived from the source
+    JSON's path: stable across re-exports of that file, and different for
+    another course with the same name
+    """
+    source_id = hashlib.sha1(str(Path(json_file).resolve()).encode('utf-8')).hexdigest()[:8]
+    return f"class_data/exports/{sanitize_filename(course_data['course_name'])}-{source_id}"
+
+def default_import_path(course_data):
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    safe_course_name = sanitize_filename(course_data['course_name'])
+    return f"class_data/imports/{timestamp}_{safe_course_name}.json"
+
+def save_course_json(course_data, output_json):
+    # Ensure directory exists
+    Path(output_json).parent.mkdir(parents=True, exist_ok=True)
     
-    return {
-        'course_name': course_name,
-        'topics': topics
-    }
+    tmp_json = f"{output_json}.{os.getpid()}.tmp"
+    with open(tmp_json, 'w', encoding='utf-8') as f:
+        json.dump(stored_form(course_data), f, ensure_ascii=False, indent=2, default=as_jsonable)
+    os.replace(tmp_json, output_json)
+
+def watch_markdown(markdown_dir, output_json=None, interval=WATCH_INTERVAL_SECONDS):
+    """Re-import markdown_dir into output_json whenever a file in it changes (Ctrl+C to stop)"""
+    last_scan = None
+    while True:
+        scan = _stat(markdown_dir) if is_archive_path(markdown_dir) else scan_markdown_tree(markdown_dir)
+        if scan != last_scan:
+            stats = {}
+            try:
+                course_data = import_markdown_to_course(markdown_dir, stats=stats)
+            except (OSError, ValueError) as e:
+                # A file may be mid-save; try again on the next poll
+                print(f"⚠️  Could not import {markdown_dir}: {e}")
+            else:
+                output_json = output_json or default_import_path(course_data)
+                save_course_json(course_data, output_json)
+                print(f"🔄 {datetime.now().strftime('%H:%M:%S')} {stats['parsed']} file(s) parsed, "
+                      f"{stats['cached']} cached -> {output_json}")
+                last_scan = scan
+        time.sleep(interval)
 
 if __name__ == '__main__':
     import sys
     
     if len(sys.argv) < 3:
         print("Usage:")
-        print("  Export: python moodle_to_markdown.py export <json_file> [output_dir]")
-        print("  Import: python moodle_to_markdown.py import <markdown_dir> [output_json]")
+        print("  Export: python moodle_to_markdown.py export <json_file> [output_dir | archive.zip | archive.tar.gz] [--archive]")
+        print("  Import: python moodle_to_markdown.py import <markdown_dir | archive> [output_json] [--watch]")
         sys.exit(1)
     
     command = sys.argv[1]
     
     if command == 'export':
-        json_file = sys.argv[2]
-        output_dir = sys.argv[3] if len(sys.argv) > 3 else None
+        args = [a for a in sys.argv[2:] if a != '--archive']
+        json_file = args[0]
+        output_dir = args[1] if len(args) > 1 else None
         
         # Load course data
-        with open(json_file, 'r', encoding='utf-8') as f:
-            course_data = json.load(f)
+        course_data = load_course(json_file)
         
-        # Generate output directory name if not provided
+        # Generate output directory name if not provided; the same course JSON always
+        # exports to the same folder so re-exports only rewrite what changed
         if not output_dir:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            safe_course_name = sanitize_filename(course_data['course_name'])
-            output_dir = f"class_data/exports/{timestamp}_{safe_course_name}"
+            output_dir = default_export_path(course_data, json_file)
         
-        # Export to markdown
-        output_path = export_course_to_markdown(course_data, output_dir)
+        # Export to markdown, or stream into an archive
+        if '--archive' in sys.argv or is_archive_path(output_dir):
+            if not is_archive_path(output_dir):
+                output_dir += '.zip'
+            output_path = export_course_to_archive(course_data, output_dir)
+        else:
+            output_path = export_course_to_markdown(course_data, output_dir)
         print(f"✅ Course exported to: {output_path}")
         
     elif command == 'import':
-        markdown_dir = sys.argv[2]
-        output_json = sys.argv[3] if len(sys.argv) > 3 else None
+        args = [a for a in sys.argv[2:] if a != '--watch']
+        markdown_dir = args[0]
+        output_json = args[1] if len(args) > 1 else None
+        
+        if '--watch' in sys.argv:
+            print(f"👀 Watching {markdown_dir} for changes (Ctrl+C to stop)")
+            try:
+                watch_markdown(markdown_dir, output_json)
+            except KeyboardInterrupt:
+                pass
+            sys.exit(0)
         
         # Import from markdown
         course_data = import_markdown_to_course(markdown_dir)
         
         # Save to JSON
         if not output_json:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            safe_course_name = sanitize_filename(course_data['course_name'])
-            output_json = f"class_data/imports/{timestamp}_{safe_course_name}.json"
-        
-        # Ensure directory exists
-        Path(output_json).parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(output_json, 'w', encoding='utf-8') as f:
-            json.dump(course_data, f, ensure_ascii=False, indent=2)
+            output_json = default_import_path(course_data)
+        save_course_json(course_data, output_json)
         
         print(f"✅ Course imported from markdown to: {output_json}")
         
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Import Plans
+Splits an import into two steps:
+
+- compile: turn a course JSON into an explicit plan file listing every
+  operation (create course, topics, courseWork, materials) with its
+  converted payload and dependencies. Plans are plain JSON, so they can be
+  inspected, diffed, cached and replayed.
+- apply: run a plan with configurable concurrency, batching and retries.
+  Progress is saved next to the plan, so an interrupted apply resumes where
+  it stopped instead of creating everything again. Operations are marked
+  uncertain before they are sent; ones a crash, timeout or server error
+  left uncertain are looked up in the course on resume, not sent again.
+
+Each operation lists `needs` (operations whose IDs it uses) and `after`
+(operations that must be created first so Classroom, which shows the newest
+first, keeps the original display order). Topics form one chain and the
+items of each topic form their own chain, so items of different topics run
+concurrently. `--unordered` drops the `after` edges when order doesn't matter.
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from googleapiclient.errors import HttpError
+from transport import iter_items
+from manage_courses import RETRYABLE_STATUSES, iter_courses
+from moodle_json_to_google_classroom import (
+    course_body, create_named_course, get_unique_course_name, load_course_data,
+    prepare_course_payloads, record_course_data, sanitize_topic_name
+)
+
+PLANS_DIR = 'class_data/plans'
+PLAN_VERSION = 1
+
+APPLY_CONCURRENCY = 4
+APPLY_BATCH_SIZE = 20
+APPLY_RETRIES = 3
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def default_plan_path(json_path):
+    stem = os.path.splitext(os.path.basename(json_path))[0]
+    return os.path.join(PLANS_DIR, f"{stem}.plan.json")
+
+def build_plan(course_data, ordered=True):
+    """The list of operations that import course_data"""
+    ops = [{'id': 'course', 'op': 'create_course', 'body': course_body(course_data['course_name']),
+            'needs': [], 'after': []}]
+    previous_topic = None
+    for topic_index, prepared in enumerate(prepare_course_payloads(course_data)):
+        topic_id = f"topic:{topic_index}"
+        ops.append({
+            'id': topic_id,
+            'op': 'create_topic',
+            'body': {'name': sanitize_topic_name(prepared['name'])},
+            'needs': ['course'],
+            'after': [previous_topic] if ordered and previous_topic else [],
+        })
+        previous_topic = topic_id
+
+        previous_item = None
+        items = [('create_courseWork', body) for body in prepared['courseWork']] + \
+                [('create_material', body) for body in prepared['materials']]
+        for item_index, (op, body) in enumerate(items):
+            item_id = f"{topic_id}/item:{item_index}"
+            ops.append({
+                'id': item_id,
+                'op': op,
+                'body': dict(body, topicId={'$ref': topic_id}),
+                'needs': ['course', topic_id],
+                'after': [previous_item] if ordered and previous_item else [],
+            })
+            previous_item = item_id
+    return ops
+
+def compile_plan(json_path, output_path=None, ordered=True):
+    """Write the plan for json_path, reusing a cached plan if the source is unchanged"""
+    output_path = output_path or default_plan_path(json_path)
+    source_sha256 = _sha256_file(json_path)
+
+    if os.path.exists(output_path):
+        with open(output_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('source_sha256') == source_sha256 and cached.get('ordered') == ordered \
+                and cached.get('version') == PLAN_VERSION:
+            print(f"♻️  Plan is up to date: {output_path}")
+            return output_path
+
+    course_data = load_course_data(json_path)
+    plan = {
+        'version': PLAN_VERSION,
+        'source_file': json_path,
+        'source_sha256': source_sha256,
+        'course_name': course_data['course_name'],
+        'ordered': ordered,
+        'ops': build_plan(course_data, ordered),
+    }
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, output_path)
+
+    print(f"📝 Plan written to {output_path}")
+    print_plan_summary(plan)
+    return output_path
+
+def load_plan(plan_path):
+    with open(plan_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def plan_counts(plan):
+    counts = {}
+    for op in plan['ops']:
+        counts[op['op']] = counts.get(op['op'], 0) + 1
+    return counts
+
+def print_plan_summary(plan):
+    counts = plan_counts(plan)
+    print(f"📖 {plan['course_name']} ({'ordered' if plan['ordered'] else 'unordered'})")
+    print(f"📊 {len(plan['ops'])} operations: " + ", ".join(f"{n} {op}" for op, n in counts.items()))
+
+def show_plan(plan_path, limit=20):
+    plan = load_plan(plan_path)
+    print_plan_summary(plan)
+    for op in plan['ops'][:limit]:
+        label = op['body'].get('name') or op['body'].get('title')
+        deps = ', '.join(op['needs'] + op['after'])
+        print(f"  {op['id']:<22} {op['op']:<18} {label}" + (f"  ⟵ {deps}" if deps else ""))
+    if len(plan['ops']) > limit:
+        print(f"  ... {len(plan['ops']) - limit} more")
+
+def diff_plans(old_path, new_path):
+    """Print operations added, removed or changed between two plans"""
+    def keyed(plan):
+        return {op['id']: json.dumps(op, sort_keys=True, ensure_ascii=False) for op in plan['ops']}
+
+    old, new = keyed(load_plan(old_path)), keyed(load_plan(new_path))
+    added = [op_id for op_id in new if op_id not in old]
+    removed = [op_id for op_id in old if op_id not in new]
+    changed = [op_id for op_id in new if op_id in old and old[op_id] != new[op_id]]
+    for symbol, op_ids in (('+', added), ('-', removed), ('~', changed)):
+        for op_id in op_ids:
+            print(f"{symbol} {op_id}")
+    print(f"📊 {len(added)} added, {len(removed)} removed, {len(changed)} changed")
+    return added, removed, changed
+
+# Apply
+def state_path_for(plan_path):
+    return f"{plan_path}.state.json"
+
+def _load_state(path, plan_sha256):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('plan_sha256') != plan_sha256:
+            raise RuntimeError(f"{path} belongs to a different version of this plan; "
+                               f"remove it to apply the new plan from scratch")
+        return state
+    return {'plan_sha256': plan_sha256, 'results': {}, 'recorded': False}
+
+def _save_state(path, state):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def _resolve(body, results):
+    """Replace {"$ref": op_id} values with the ID that operation created"""
+    return {key: results[value['$ref']] if isinstance(value, dict) and '$ref' in value else value
+            for key, value in body.items()}
+
+def _item_request(service, op, results):
+    course_id = results['course']
+    body = _resolve(op['body'], results)
+    if op['op'] == 'create_topic':
+        return service.courses().topics().create(courseId=course_id, body=body)
+    if op['op'] == 'create_courseWork':
+        return service.courses().courseWork().create(courseId=course_id, body=body)
+    if op['op'] == 'create_material':
+        return service.courses().courseWorkMaterials().create(courseId=course_id, body=body)
+    raise ValueError(f"Unknown operation: {op['op']}")
+
+def _created_id(op, response):
+    return response['topicId'] if op['op'] == 'create_topic' else response['id']
+
+# Rejected before anything was created, so sending the request again is safe
+THROTTLED_STATUSES = (429,)
+# Course states a course apply_plan created (or a pooled one it renamed) can be in
+NEW_COURSE_STATES = ('PROVISIONED', 'ACTIVE')
+
+def _existing_ids(service, course_id):
+    """{lookup key: [IDs]} of what a course already has, to match uncertain creates against"""
+    existing = {}
+    for topic in iter_items(service.courses().topics().list, 'topic', courseId=course_id):
+        existing.setdefault(('create_topic', topic['name']), []).append(topic['topicId'])
+    for op, collection, key in (('create_courseWork', service.courses().courseWork(), 'courseWork'),
+                                ('create_material', service.courses().courseWorkMaterials(), 'courseWorkMaterial')):
+        for item in iter_items(collection.list, key, courseId=course_id):
+            existing.setdefault((op, item.get('topicId'), item.get('title')), []).append(item['id'])
+    return existing
+
+def _match_existing(service, ops, results):
+    """{op_id: ID} for the ops whose item the course already has"""
+    existing = _existing_ids(service, results['course'])
+    taken = set(results.values())
+    found = {}
+    for op in ops:
+        body = _resolve(op['body'], results)
+        key = (op['op'], body['name']) if op['op'] == 'create_topic' else (op['op'], body.get('topicId'), body['title'])
+        match = next((i for i in existing.get(key, []) if i not in taken), None)
+        if match:
+            found[op['id']] = match
+            taken.add(match)
+    return found
+
+def _mark_uncertain(state, state_path, op_ids):
+    """Record op_ids as possibly created before their requests are sent"""
+    uncertain = state.setdefault('uncertain', [])
+    uncertain.extend(op_id for op_id in op_ids if op_id not in uncertain)
+    _save_state(state_path, state)
+
+def _create_course(service, op, state, state_path, account_name):
+    """
+    Create the plan's course. Its name is chosen and saved first, so if an
+    earlier apply was interrupted around the create, the course it may have
+    made is found by that name instead of being created twice.
+    """
+    name = state.get('course_name')
+    if name and 'course' in state.get('uncertain', []):
+        for course in iter_courses(service, NEW_COURSE_STATES, teacher_id='me'):
+            if course.get('name') == name:
+                print(f"♻️  Found the course an earlier apply created: {name}")
+                return course['id']
+    else:
+        name = get_unique_course_name(service, op['body']['name'], account_name)
+        state['course_name'] = name
+    _mark_uncertain(state, state_path, ['course'])
+    return create_named_course(service, name, account_name)
+
+def _run_group(clients, group, results, retries):
+    """
+    Run one operation, or several as a single batch request. Throttled parts
+    are retried with backoff. A server error, timeout or dropped connection
+    may come after the item was created, so those parts are first looked up
+    by name/title and only sent again if they are missing. Returns
+    ({op_id: created_id}, {op_id: error}, IDs of failed ops that may have
+    been created anyway).
+    """
+    created, errors = {}, {}
+    with clients.client() as service:
+        pending = list(group)
+        uncertain = set()
+        for attempt in range(retries):
+            if uncertain:
+                found = _match_existing(service, [op for op in pending if op['id'] in uncertain],
+                                        dict(results, **created))
+                created.update(found)
+                pending = [op for op in pending if op['id'] not in found]
+                uncertain.clear()
+                if not pending:
+                    break
+            retry = []
+
+            def failed(op, error):
+                if isinstance(error, HttpError) and error.resp.status not in RETRYABLE_STATUSES:
+                    errors[op['id']] = str(error)
+                    return
+                retry.append(op)
+                if not (isinstance(error, HttpError) and error.resp.status in THROTTLED_STATUSES):
+                    uncertain.add(op['id'])
+
+            if len(pending) == 1:
+                op = pending[0]
+                try:
+                    created[op['id']] = _created_id(op, _item_request(service, op, results).execute())
+                except Exception as e:
+                    failed(op, e)
+            else:
+                by_id = {op['id']: op for op in pending}
+
+                def callback(request_id, response, exception):
+                    if exception is None:
+                        created[request_id] = _created_id(by_id[request_id], response)
+                    else:
+                        failed(by_id[request_id], exception)
+
+                batch = service.new_batch_http_request(callback=callback)
+                for op in pending:
+                    batch.add(_item_request(service, op, results), request_id=op['id'])
+                try:
+                    batch.execute()
+                except Exception as e:
+                    # Parts without a callback may or may not have been created
+                    answered = set(created) | set(errors) | {op['id'] for op in retry}
+                    for op in pending:
+                        if op['id'] not in answered:
+                            failed(op, e)
+
+            pending = retry
+            if not pending:
+                break
+            time.sleep(2 ** attempt)
+        for op in pending:
+            errors[op['id']] = 'still failing after retries'
+    return created, errors, uncertain
+
+def apply_plan(plan_path, accounts=None, account_name=None, course_id=None,
+               concurrency=APPLY_CONCURRENCY, batch_size=APPLY_BATCH_SIZE, retries=APPLY_RETRIES):
+    """Execute a plan; returns the course ID. Safe to re-run after a failure."""
+    from accounts import AccountPool
+
+    plan = load_plan(plan_path)
+    state_path = state_path_for(plan_path)
+    state = _load_state(state_path, _sha256_file(plan_path))
+    results = state['results']
+    if course_id:
+        # Apply into an existing course instead of creating one
+        results.setdefault('course', course_id)
+
+    own_accounts = accounts is None
+    accounts = accounts or AccountPool.from_config()
+    if course_id:
+        account = accounts.for_course(course_id)
+    elif state.get('owner'):
+        # Resume as the account that created the course
+        account = accounts.for_owner(state['owner'])
+    else:
+        account = accounts.get(account_name)
+    state['owner'] = account.name
+
+    try:
+        if 'course' not in results:
+            course_op = next(op for op in plan['ops'] if op['op'] == 'create_course')
+            with account.clients.client() as service:
+                results['course'] = _create_course(service, course_op, state, state_path, account.name)
+            state['uncertain'].remove('course')
+            _save_state(state_path, state)
+
+        if state.get('uncertain'):
+            # Creates an earlier apply sent without seeing the outcome may exist anyway
+            ops = [op for op in plan['ops'] if op['id'] in state['uncertain'] and op['id'] not in results]
+            with account.clients.client() as service:
+                results.update(_match_existing(service, ops, results))
+            state['uncertain'] = []
+            _save_state(state_path, state)
+
+        pending = [op for op in plan['ops'] if op['id'] not in results]
+        print(f"🚀 Applying {plan_path}: {len(pending)} of {len(plan['ops'])} operations left "
+              f"(concurrency {concurrency}, batches of up to {batch_size})")
+        started = time.time()
+        errors = {}
+
+        def is_ready(op):
+            return all(dep in results for dep in op['needs'] + op['after'])
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            running = {}
+            while (pending and not errors) or running:
+                ready = [op for op in pending if is_ready(op)] if not errors else []
+                free = concurrency - len(running)
+                if ready and free > 0:
+                    # Spread ready items over the free slots, batching when there are more
+                    size = max(1, min(batch_size, -(-len(ready) // free)))
+                    groups = [ready[i:i + size] for i in range(0, len(ready), size)]
+                    for group in groups[:free]:
+                        for op in group:
+                            pending.remove(op)
+                        _mark_uncertain(state, state_path, [op['id'] for op in group])
+                        future = executor.submit(_run_group, account.clients, group, dict(results), retries)
+                        running[future] = group
+                if not running:
+                    raise RuntimeError("Plan has operations whose dependencies can never be met")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    group = running.pop(future)
+                    group_ids = {op['id'] for op in group}
+                    try:
+                        created, group_errors, uncertain = future.result()
+                    except Exception as e:
+                        created, group_errors, uncertain = {}, {op_id: str(e) for op_id in group_ids}, group_ids
+                    # Settled ops are no longer uncertain: created, or rejected outright
+                    state['uncertain'] = [op_id for op_id in state['uncertain']
+                                          if op_id not in group_ids or op_id in uncertain]
+                    results.update(created)
+                    errors.update(group_errors)
+                    _save_state(state_path, state)
+    finally:
+        if own_accounts:
+            accounts.close()
+
+    if errors:
+        for op_id, error in errors.items():
+            print(f"❌ {op_id}: {error}")
+        raise RuntimeError(f"{len(errors)} operation(s) failed; run apply again to resume")
+
+    counts = plan_counts(plan)
+    course_name = state.get('course_name') or plan['course_name']
+    if not state['recorded'] and not course_id:
+        record_course_data(
+            results['course'], course_name, counts.get('create_topic', 0),
+            counts.get('create_courseWork', 0) + counts.get('create_material', 0),
+            plan['source_file'], account.name
+        )
+        state['recorded'] = True
+        _save_state(state_path, state)
+
+    print(f"✅ Applied {len(plan['ops'])} operations in {time.time() - started:.1f}s")
+    print(f"🔗 Classroom URL: https://classroom.google.com/c/{results['course']}")
+    return results['course']
+
+def main():
+    import sys
+
+    args = sys.argv[1:]
+    if not args:
+        print("Usage:")
+        print("  python plan.py compile <json_file> [--unordered] [--output FILE]   # Write a plan")
+        print("  python plan.py show <plan_file>                                   # Summarize a plan")
+        print("  python plan.py diff <old_plan> <new_plan>                         # Compare two plans")
+        print("  python plan.py apply <plan_file> [options]                        # Execute a plan")
+        print("      --concurrency N     requests in flight (default 4)")
+        print("      --batch-size N      operations per batch request (default 20)")
+        print("      --retries N         attempts for throttled operations (default 3)")
+        print("      --account NAME      owner account for the new course")
+        print("      --course ID         add to an existing course instead")
+        return
+
+    def option(flag, default=None):
+        return args[args.index(flag) + 1] if flag in args and args.index(flag) + 1 < len(args) else default
+
+    command = args[0].lower()
+    if command == 'compile' and len(args) > 1:
+        compile_plan(args[1], option('--output'), ordered='--unordered' not in args)
+    elif command == 'show' and len(args) > 1:
+        show_plan(args[1])
+    elif command == 'diff' and len(args) > 2:
+        diff_plans(args[1], args[2])
+    elif command == 'apply' and len(args) > 1:
+        try:
+            apply_plan(
+                args[1],
+                account_name=option('--account'),
+                course_id=option('--course'),
+                concurrency=int(option('--concurrency', APPLY_CONCURRENCY)),
+                batch_size=int(option('--batch-size', APPLY_BATCH_SIZE)),
+                retries=int(option('--retries', APPLY_RETRIES)),
+            )
+        except (RuntimeError, ValueError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    else:
+        print(f"❌ Unknown or incomplete command: {' '.join(args)}")
+
+if __name__ == '__main__':
+    main()
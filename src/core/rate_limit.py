@@ -0,0 +1,49 @@
+"""
+Client-side rate limiting for Classroom API calls.
+"""
+
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at `rate` tokens per second up to
+    `capacity`, and acquire() blocks until enough tokens are available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute, burst=None):
+        return cls(requests_per_minute / 60.0, burst)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """
+        Take tokens, sleeping until the bucket has refilled enough. Costs
+        larger than the bucket (a big batch) are paid in capacity-sized
+        chunks, so they are charged in full.
+        """
+        while tokens > 0:
+            chunk = min(tokens, self.capacity)
+            self._acquire(chunk)
+            tokens -= chunk
+
+    def _acquire(self, tokens):
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Course Search Index
+A SQLite FTS5 index (temp_data/search.db) over the course JSON files in
+class_data/imports and the markdown exports in class_data/exports (folders
+and archives). It holds course, topic, assignment and activity titles and
+descriptions as plain text, so "which courses mention X" is one query
+instead of a grep over everything.
+
+Indexing is incremental: each source is recorded with a signature (mtime and
+size, or for an export folder its file listing), and only sources whose
+signature changed are re-read. Sources that disappeared are dropped.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from bs4 import BeautifulSoup
+from course_model import load_course
+from moodle_to_markdown import import_markdown_to_course, is_archive_path, scan_markdown_tree
+
+INDEX_PATH = 'temp_data/search.db'
+IMPORTS_DIR = 'class_data/imports'
+EXPORTS_DIR = 'class_data/exports'
+SEARCH_LIMIT = 20
+# Elements whose text is a separate run of words from what's around them
+BLOCK_TAGS = ['p', 'div', 'li', 'td', 'th', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+              'blockquote', 'pre', 'ul', 'ol', 'table', 'section', 'article']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    course_name TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5(
+    source UNINDEXED,
+    kind UNINDEXED,
+    course,
+    topic,
+    title,
+    body,
+    tokenize = 'porter unicode61'
+);
+"""
+
+def connect(db_path=INDEX_PATH):
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+def find_sources(imports_dir=IMPORTS_DIR, exports_dir=EXPORTS_DIR):
+    """Course JSON files, export folders and export archives to index"""
+    sources = []
+    if os.path.isdir(imports_dir):
+        sources += [str(p) for p in sorted(Path(imports_dir).glob('*.json'))]
+    if os.path.isdir(exports_dir):
+        for p in sorted(Path(exports_dir).iterdir()):
+            if (p.is_dir() and (p / 'course-info.md').exists()) or (p.is_file() and is_archive_path(p)):
+                sources.append(str(p))
+    return sources
+
+def source_signature(path):
+    """Changes whenever the source's content may have changed"""
+    if os.path.isdir(path):
+        listing = json.dumps(scan_markdown_tree(path))
+        return hashlib.sha1(listing.encode('utf-8')).hexdigest()
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+def html_to_text(html_content):
+    """Plain text for the tokenizer: blocks and line breaks are kept apart, inline tags are not"""
+    soup = BeautifulSoup(html_content or '', 'html.parser')
+    for tag in soup.find_all(BLOCK_TAGS):
+        tag.insert_before(' ')
+        tag.insert_after(' ')
+    for tag in soup.find_all('br'):
+        tag.replace_with(' ')
+    return ' '.join(soup.get_text().split())
+
+def source_entries(path):
+    """(kind, course, topic, title, body) rows for one source, bodies as plain text"""
+    if path.endswith('.json'):
+        course_data = load_course(path)
+        to_text = html_to_text
+    else:
+        # Markdown exports already hold converted text
+        course_data = import_markdown_to_course(path)
+        to_text = lambda text: text or ''
+
+    course = course_data.get('course_name', '')
+    rows = [('course', course, '', course, '')]
+    for topic in course_data.get('topics', []):
+        rows.append(('topic', course, topic['name'], topic['name'], ''))
+        for assignment in topic.get('assignments', []):
+            rows.append(('assignment', course, topic['name'], assignment.get('title', ''),
+                         to_text(assignment.get('description', ''))))
+        for activity in topic.get('activities', []):
+            rows.append((activity.get('type', 'activity'), course, topic['name'], activity.get('title', ''),
+                         to_text(activity.get('description', ''))))
+    return course, rows
+
+def update_index(sources=None, db_path=INDEX_PATH):
+    """Re-index changed sources and drop missing ones; returns (indexed, unchanged, removed)"""
+    sources = find_sources() if sources is None else sources
+    conn = connect(db_path)
+    try:
+        known = {row['path']: row['signature'] for row in conn.execute('SELECT path, signature FROM sources')}
+        indexed = unchanged = 0
+        for path in sources:
+            try:
+                signature = source_signature(path)
+                if known.get(path) == signature:
+                    unchanged += 1
+                    continue
+                course, rows = source_entries(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  Skipping {path}: {e}")
+                continue
+            conn.execute('BEGIN')
+            conn.execute('DELETE FROM entries WHERE source = ?', (path,))
+            conn.executemany('INSERT INTO entries (source, kind, course, topic, title, body) VALUES (?, ?, ?, ?, ?, ?)',
+                             [(path,) + row for row in rows])
+            conn.execute('INSERT OR REPLACE INTO sources (path, signature, course_name, indexed_at) VALUES (?, ?, ?, ?)',
+                         (path, signature, course, time.time()))
+            conn.execute('COMMIT')
+            indexed += 1
+
+        current = set(sources)
+        removed = [path for path in known if path not in current]
+        if removed:
+            conn.execute('BEGIN')
+            for path in removed:
+                conn.execute('DELETE FROM entries WHERE source = ?', (path,))
+                conn.execute('DELETE FROM sources WHERE path = ?', (path,))
+            conn.execute('COMMIT')
+        return indexed, unchanged, len(removed)
+    finally:
+        conn.close()
+
+def _quote_terms(query):
+    """Treat every word as a literal term, for queries that aren't valid FTS5 syntax"""
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+def search(query, kind=None, limit=SEARCH_LIMIT, db_path=INDEX_PATH):
+    """Best matches for query (FTS5 syntax, or plain words), as dicts"""
+    if not os.path.exists(db_path):
+        return []
+    conn = connect(db_path)
+    sql = """SELECT source, kind, course, topic, title,
+                    snippet(entries, 5, '[', ']', '…', 12) AS snippet
+             FROM entries WHERE entries MATCH ?""" + (" AND kind = ?" if kind else "") + \
+          " ORDER BY bm25(entries, 0.0, 0.0, 4.0, 2.0, 8.0, 1.0) LIMIT ?"
+    try:
+        for match in (query, _quote_terms(query)):
+            params = (match, kind, limit) if kind else (match, limit)
+            try:
+                return [dict(row) for row in conn.execute(sql, params)]
+            except sqlite3.OperationalError:
+                continue
+        return []
+    finally:
+        conn.close()
+
+def print_results(results, query):
+    if not results:
+        print(f"🔍 No matches for '{query}'")
+        return
+    print(f"🔍 {len(results)} match(es) for '{query}':")
+    for row in results:
+        where = f"{row['course']} › {row['topic']}" if row['topic'] and row['kind'] != 'topic' else row['course']
+        print(f"  📄 [{row['kind']}] {row['title']}  ({where})")
+        if row['snippet']:
+            print(f"     {' '.join(row['snippet'].split())}")
+        print(f"     {row['source']}")
+
+def print_courses(results, query):
+    """One line per course with a match"""
+    courses = {}
+    for row in results:
+        courses.setdefault((row['course'], row['source']), []).append(row['title'])
+    print(f"🔍 {len(courses)} course file(s) match '{query}':")
+    for (course, source), titles in courses.items():
+        print(f"  📚 {course}: {len(titles)} match(es)  ({source})")
+
+def main():
+    import sys
+
+    args = sys.argv[1:]
+    if not args:
+        print("Usage:")
+        print("  python search_index.py index                                  # Index new and changed courses")
+        print("  python search_index.py search <query> [--kind K] [--limit N] [--courses]")
+        return
+
+    command = args[0].lower()
+    if command == 'index':
+        start = time.time()
+        indexed, unchanged, removed = update_index()
+        print(f"✅ Indexed {indexed} source(s), {unchanged} unchanged, {removed} removed "
+              f"in {time.time() - start:.2f}s")
+    elif command == 'search':
+        kind = args[args.index('--kind') + 1] if '--kind' in args[:-1] else None
+        limit = int(args[args.index('--limit') + 1]) if '--limit' in args[:-1] else SEARCH_LIMIT
+        skip = {i + 1 for i, a in enumerate(args) if a in ('--kind', '--limit')}
+        query = ' '.join(a for i, a in enumerate(args[1:], 1) if not a.startswith('--') and i not in skip)
+        if not query:
+            print("❌ Please provide a search query")
+            sys.exit(1)
+        start = time.time()
+        if '--courses' in args:
+            results = search(query, kind, limit=10000)
+            print_courses(results, query)
+        else:
+            results = search(query, kind, limit)
+            print_results(results, query)
+        print(f"⏱️  {(time.time() - start) * 1000:.0f} ms")
+    else:
+        print(f"❌ Unknown command: {command}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Course Snapshot Script
+Captures a live Google Classroom course (including teachers' edits) as
+course JSON, the same course_name/topics schema mbz_to_json.py produces, so
+it can be exported to markdown or imported again without a Moodle backup.
+
+Classroom materials don't say which Moodle activity (page, forum, ...) they
+came from. When the course was imported from a source file that is still
+around, each material's type is taken from the source activity with the same
+title; otherwise it is recorded as 'material'.
+"""
+
+import html
+import os
+import re
+from datetime import datetime, timezone
+from accounts import AccountPool
+from mbz_to_json import write_json, write_json_to_imports
+from transport import iter_items
+from verify_import import find_source, load_source
+
+# Only the fields the course JSON needs
+SNAPSHOT_LISTS = {
+    'topic': (lambda service: service.courses().topics(), 'topic',
+              'nextPageToken,topic(topicId,name)'),
+    'courseWork': (lambda service: service.courses().courseWork(), 'courseWork',
+                   'nextPageToken,courseWork(id,title,description,topicId,creationTime)'),
+    'material': (lambda service: service.courses().courseWorkMaterials(), 'courseWorkMaterial',
+                 'nextPageToken,courseWorkMaterial(id,title,description,topicId,creationTime)'),
+}
+
+UNTITLED_TOPIC = 'Untitled Topic'
+
+def _time(item, key):
+    value = item.get(key)
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else datetime.min.replace(tzinfo=timezone.utc)
+
+def text_to_html(text):
+    """Classroom descriptions are plain text; turn them into minimal HTML"""
+    if not text:
+        return ""
+    paragraphs = re.split(r'\n\s*\n', text.replace('\r\n', '\n').strip())
+    return ''.join(
+        '<p>' + '<br>'.join(html.escape(line) for line in paragraph.split('\n')) + '</p>'
+        for paragraph in paragraphs
+    )
+
+def fetch_course(clients, course_id):
+    """The course and its topics, courseWork and materials, listed concurrently"""
+    def fetch(service, kind):
+        if kind == 'course':
+            return service.courses().get(id=course_id, fields='id,name').execute()
+        collection, items_key, fields = SNAPSHOT_LISTS[kind]
+        return list(iter_items(collection(service).list, items_key, courseId=course_id, fields=fields))
+
+    kinds = ['course'] + list(SNAPSHOT_LISTS)
+    return dict(zip(kinds, clients.map(fetch, kinds)))
+
+def source_activity_types(course_id):
+    """{title: type} of the activities in course_id's source file, if it is still around"""
+    source = find_source(course_id)
+    if not source or not os.path.exists(source):
+        return {}
+    return {activity['title']: activity.get('type', 'material')
+            for topic in load_source(source)['topics'] for activity in topic.get('activities', [])}
+
+def build_course_data(fetched, activity_types=None):
+    """Rebuild course JSON from fetched Classroom items"""
+    activity_types = activity_types or {}
+    # topics.list returns topics in Classroom's display order, which includes
+    # any reordering by teachers (unlike updateTime, which changes on edits)
+    by_id = {}
+    course_topics = []
+    for topic in fetched['topic']:
+        entry = {'name': topic.get('name', ''), 'assignments': [], 'activities': []}
+        by_id[topic['topicId']] = entry
+        course_topics.append(entry)
+
+    untitled = None
+    for kind, target in (('courseWork', 'assignments'), ('material', 'activities')):
+        for item in sorted(fetched[kind], key=lambda i: _time(i, 'creationTime'), reverse=True):
+            entry = by_id.get(item.get('topicId'))
+            if entry is None:
+                # Items outside any topic go into one topic at the top
+                if untitled is None:
+                    untitled = {'name': UNTITLED_TOPIC, 'assignments': [], 'activities': []}
+                    course_topics.insert(0, untitled)
+                entry = untitled
+            converted = {'title': item.get('title', ''), 'description': text_to_html(item.get('description', ''))}
+            if kind == 'material':
+                converted['type'] = activity_types.get(converted['title'], 'material')
+            entry[target].append(converted)
+
+    return {'course_name': fetched['course']['name'], 'topics': course_topics}
+
+def snapshot_course(course_id, output_file=None):
+    """Snapshot course_id to class_data/imports (or output_file); returns the path"""
+    accounts = AccountPool.from_config()
+    try:
+        fetched = fetch_course(accounts.for_course(course_id).clients, course_id)
+    finally:
+        accounts.close()
+
+    course_data = build_course_data(fetched, source_activity_types(course_id))
+    if output_file:
+        write_json(course_data, output_file)
+    else:
+        output_file = write_json_to_imports(course_data, course_data['course_name'])
+
+    items = sum(len(t['assignments']) + len(t['activities']) for t in course_data['topics'])
+    print(f"📸 Snapshot of '{course_data['course_name']}': {len(course_data['topics'])} topics, {items} items")
+    print(f"✅ Course data saved to: {output_file}")
+    return output_file
+
+if __name__ == '__main__':
+    import sys
+
+    args = sys.argv[1:]
+    output = None
+    if '--output' in args[:-1]:
+        index = args.index('--output')
+        output = args[index + 1]
+        del args[index:index + 2]
+    if not args:
+        print("Usage: python snapshot.py <course_id> [--output FILE]")
+        sys.exit(1)
+    snapshot_course(args[0], output)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Synthetic MBZ Generator
+Writes Moodle backup archives (zip or tar.gz) with made-up content, so
+parse_mbz, the importer and the exporters can be tested and benchmarked at
+scale without real student-course backups.
+
+The archive has the layout parse_mbz reads: moodle_backup.xml,
+sections/section_<id>/section.xml with each section's activity sequence,
+activities/<module>_<cmid>/<module>.xml (plus module.xml), and, when file
+payloads are requested, files.xml and files/<xx>/<contenthash> with
+@@PLUGINFILE@@ links in the descriptions.
+
+Everything is derived from the seed, so the same options always produce
+the same course.
+"""
+
+import hashlib
+import html
+import io
+import random
+import tarfile
+import time
+import zipfile
+
+MODULES = ('assign', 'page', 'forum', 'resource')
+DEFAULT_MIX = {'assign': 4, 'page': 2, 'forum': 1, 'resource': 1}
+HTML_STYLES = ('plain', 'rich', 'word')
+
+WORDS = (
+    'database schema entity relationship normal form query join index key table column row '
+    'student project review submit lab exercise reading lecture design model diagram team '
+    'deadline rubric feedback example practice module week unit concept summary discussion'
+).split()
+
+def _sentence(rng, words=12):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+def _paragraph(rng, style):
+    text = html.escape(' '.join(_sentence(rng, rng.randint(6, 16)) for _ in range(rng.randint(2, 4))))
+    if style == 'word':
+        return ('<p class="MsoNormal" style="margin-bottom:0in;line-height:normal">'
+                '<span style="font-size:12.0pt;font-family:&quot;Calibri&quot;,sans-serif">'
+                f'{text}<o:p></o:p></span></p>')
+    return f'<p>{text}</p>'
+
+def _rich_block(rng):
+    kind = rng.randrange(4)
+    if kind == 0:
+        return f'<h3>{html.escape(_sentence(rng, 4))}</h3>'
+    if kind == 1:
+        items = ''.join(f'<li><strong>{rng.choice(WORDS)}</strong> {html.escape(_sentence(rng, 6))}</li>' for _ in range(3))
+        return f'<ul>{items}</ul>'
+    if kind == 2:
+        word = rng.choice(WORDS)
+        return f'<p>See the <a href="https://example.org/{word}">{word} guide</a> and <em>{_sentence(rng, 5)}</em></p>'
+    rows = ''.join(f'<tr><td>{rng.choice(WORDS)}</td><td>{rng.randint(1, 100)}</td></tr>' for _ in range(3))
+    return f'<table><tr><th>Item</th><th>Points</th></tr>{rows}</table>'
+
+def make_description(rng, size, style='rich', attachment=None):
+    """HTML of roughly size bytes in the given style, optionally embedding attachment"""
+    parts = []
+    if style == 'word':
+        parts.append('<!--[if gte mso 9]><xml><w:WordDocument><w:View>Normal</w:View></w:WordDocument></xml><![endif]-->')
+    if attachment:
+        parts.append(f'<p><img src="@@PLUGINFILE@@/{attachment}" alt="figure"></p>')
+    length = sum(len(p) for p in parts)
+    while length < size:
+        block = _rich_block(rng) if style == 'rich' and rng.random() < 0.4 else _paragraph(rng, style)
+        parts.append(block)
+        length += len(block)
+    return ''.join(parts)
+
+def parse_mix(text):
+    """'assign=4,page=2' -> {'assign': 4, 'page': 2}"""
+    mix = {}
+    for part in text.split(','):
+        module, _, weight = part.partition('=')
+        if module.strip() not in MODULES:
+            raise ValueError(f"Unknown module '{module}' (known: {', '.join(MODULES)})")
+        mix[module.strip()] = float(weight or 1)
+    return mix
+
+class _ZipWriter:
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def add(self, name, data):
+        self.archive.writestr(name, data)
+
+    def close(self):
+        self.archive.close()
+
+class _TarWriter:
+    def __init__(self, path):
+        self.archive = tarfile.open(path, 'w:gz')
+        self.mtime = int(time.time())
+
+    def add(self, name, data):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = self.mtime
+        self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.archive.close()
+
+def _xml(text):
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n' + text).encode('utf-8')
+
+def generate_mbz(path, sections=10, activities=100, mix=None, description_size=800, html_style='rich',
+                 file_size=0, file_ratio=0.0, unnamed_ratio=0.1, seed=0, course_name=None, archive_format=None):
+    """
+    Write a synthetic backup to path and return a summary of what it holds.
+
+    archive_format is 'zip' or 'tar.gz'; by default it follows the file
+    suffix (.tar.gz/.tgz are tar, anything else zip). With file_size > 0,
+    file_ratio of the activities embed one file of file_size bytes.
+    unnamed_ratio of the sections have no name, as in real backups, so the
+    parser derives one.
+    """
+    if html_style not in HTML_STYLES:
+        raise ValueError(f"Unknown HTML style '{html_style}' (known: {', '.join(HTML_STYLES)})")
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    modules, weights = zip(*mix.items())
+    course_name = course_name or f"Synthetic Course {seed}"
+    archive_format = archive_format or ('tar.gz' if str(path).endswith(('.tar.gz', '.tgz')) else 'zip')
+    writer = _TarWriter(path) if archive_format == 'tar.gz' else _ZipWriter(path)
+
+    # Spread activities over sections; every section gets at least one when possible
+    per_section = [[] for _ in range(sections)]
+    for index in range(activities):
+        target = index if index < sections else rng.randrange(sections)
+        per_section[target].append(100 + index)
+
+    summary = {'sections': sections, 'activities': activities, 'modules': dict.fromkeys(modules, 0),
+               'files': 0, 'bytes': 0}
+    file_entries = []
+    activity_list = []
+    try:
+        for number, cmids in enumerate(per_section):
+            section_id = 1000 + number
+            name = '$@NULL@$' if number and rng.random() < unnamed_ratio else f"Week {number}: {_sentence(rng, 3)[:-1]}"
+            data = _xml(
+                f'<section id="{section_id}">\n'
+                f'  <number>{number}</number>\n'
+                f'  <name>{html.escape(name)}</name>\n'
+                f'  <summary></summary>\n'
+                f'  <sequence>{",".join(str(c) for c in cmids)}</sequence>\n'
+                f'  <visible>1</visible>\n'
+                f'</section>\n')
+            writer.add(f'sections/section_{section_id}/section.xml', data)
+            summary['bytes'] += len(data)
+
+            for cmid in cmids:
+                module = rng.choices(modules, weights)[0]
+                summary['modules'][module] += 1
+                context_id = 5000 + cmid
+                attachment = None
+                if file_size and rng.random() < file_ratio:
+                    attachment = f"figure-{cmid}.png"
+                    blob = rng.randbytes(file_size)
+                    contenthash = hashlib.sha1(blob).hexdigest()
+                    writer.add(f'files/{contenthash[:2]}/{contenthash}', blob)
+                    file_entries.append((len(file_entries) + 1, contenthash, context_id, module, attachment, file_size))
+                    summary['files'] += 1
+                    summary['bytes'] += file_size
+                title = f"{module.title()} {cmid}: {_sentence(rng, 3)[:-1]}"
+                description = make_description(rng, description_size, html_style, attachment)
+                folder = f'activities/{module}_{cmid}'
+                data = _xml(
+                    f'<activity id="{cmid}" moduleid="{cmid}" modulename="{module}" contextid="{context_id}">\n'
+                    f'  <{module} id="{cmid}">\n'
+                    f'    <name>{html.escape(title)}</name>\n'
+                    f'    <intro>{html.escape(description)}</intro>\n'
+                    f'    <introformat>1</introformat>\n'
+                    f'  </{module}>\n'
+                    f'</activity>\n')
+                writer.add(f'{folder}/{module}.xml', data)
+                writer.add(f'{folder}/module.xml', _xml(
+                    f'<module id="{cmid}" version="2023042400">\n'
+                    f'  <modulename>{module}</modulename>\n'
+                    f'  <sectionid>{section_id}</sectionid>\n'
+                    f'  <sectionnumber>{number}</sectionnumber>\n'
+                    f'</module>\n'))
+                summary['bytes'] += len(data)
+                activity_list.append((cmid, module, section_id, title))
+
+        files_xml = ''.join(
+            f'  <file id="{file_id}">\n'
+            f'    <contenthash>{contenthash}</contenthash>\n'
+            f'    <contextid>{context_id}</contextid>\n'
+            f'    <component>mod_{module}</component>\n'
+            f'    <filearea>intro</filearea>\n'
+            f'    <itemid>0</itemid>\n'
+            f'    <filepath>/</filepath>\n'
+            f'    <filename>{filename}</filename>\n'
+            f'    <filesize>{size}</filesize>\n'
+            f'    <mimetype>image/png</mimetype>\n'
+            f'  </file>\n'
+            for file_id, contenthash, context_id, module, filename, size in file_entries)
+        writer.add('files.xml', _xml(f'<files>\n{files_xml}</files>\n'))
+
+        activities_xml = ''.join(
+            f'        <activity>\n'
+            f'          <moduleid>{cmid}</moduleid>\n'
+            f'          <sectionid>{section_id}</sectionid>\n'
+            f'          <modulename>{module}</modulename>\n'
+            f'          <title>{html.escape(title)}</title>\n'
+            f'          <directory>activities/{module}_{cmid}</directory>\n'
+            f'        </activity>\n'
+            for cmid, module, section_id, title in activity_list)
+        sections_xml = ''.join(
+            f'        <section>\n'
+            f'          <sectionid>{1000 + number}</sectionid>\n'
+            f'          <directory>sections/section_{1000 + number}</directory>\n'
+            f'        </section>\n'
+            for number in range(sections))
+        writer.add('moodle_backup.xml', _xml(
+            '<moodle_backup>\n'
+            '  <information>\n'
+            f'    <name>{html.escape(course_name)}.mbz</name>\n'
+            f'    <original_course_fullname>{html.escape(course_name)}</original_course_fullname>\n'
+            f'    <original_course_shortname>SYN{seed}</original_course_shortname>\n'
+            '    <contents>\n'
+            f'      <activities>\n{activities_xml}      </activities>\n'
+            f'      <sections>\n{sections_xml}      </sections>\n'
+            '    </contents>\n'
+            '  </information>\n'
+            '</moodle_backup>\n'))
+    finally:
+        writer.close()
+    return summary
+
+def main():
+    import sys
+
+    args = sys.argv[1:]
+    if not args or args[0].startswith('--'):
+        print("Usage: python synthetic_mbz.py <output.mbz|.zip|.tar.gz> [options]")
+        print("  --sections N            Sections (default 10)")
+        print("  --activities N          Activities in total (default 100)")
+        print("  --mix assign=4,page=2   Relative weights of assign/page/forum/resource")
+        print("  --description-size N    Approximate bytes of HTML per description (default 800)")
+        print("  --html plain|rich|word  Markup style; 'word' adds Word-style cruft")
+        print("  --file-size N           Bytes of each embedded file (default 0: none)")
+        print("  --file-ratio R          Share of activities that embed a file (default 0.1 with --file-size)")
+        print("  --format zip|tar.gz     Archive format (default: from the file name)")
+        print("  --seed N                Seed; the same options and seed give the same course")
+        sys.exit(1)
+
+    def option(flag, default, cast=str):
+        return cast(args[args.index(flag) + 1]) if flag in args[:-1] else default
+
+    file_size = option('--file-size', 0, int)
+    summary = generate_mbz(
+        args[0],
+        sections=option('--sections', 10, int),
+        activities=option('--activities', 100, int),
+        mix=option('--mix', None, parse_mix),
+        description_size=option('--description-size', 800, int),
+        html_style=option('--html', 'rich'),
+        file_size=file_size,
+        file_ratio=option('--file-ratio', 0.1 if file_size else 0.0, float),
+        seed=option('--seed', 0, int),
+        archive_format=option('--format', None),
+    )
+    modules = ', '.join(f"{count} {module}" for module, count in summary['modules'].items())
+    print(f"✅ Wrote {args[0]}: {summary['sections']} sections, {summary['activities']} activities ({modules}), "
+          f"{summary['files']} files, {summary['bytes'] / 1e6:.1f} MB uncompressed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Classroom API transport.
+
+googleapiclient's default httplib2 transport is not thread-safe, so a single
+service object must never be shared between threads. This module is the one
+place Classroom clients are built:
+
+- build_classroom_service() gives a client with its own keep-alive
+  connection, for single-threaded scripts.
+- ClassroomClientPool hands out up to `size` clients to concurrent callers.
+  Idle clients (and their open connections) are reused, most recent first.
+- Either can take a rate limiter (see rate_limit.py); every HTTP request,
+  including each part of a batch, then waits for a token first.
+- Every request's latency is recorded per endpoint (see latency.py).
+
+Responses are gzip-compressed: googleapiclient's JSON model sends
+`accept-encoding: gzip` and the `(gzip)` user-agent marker Google requires,
+and httplib2 decompresses transparently.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+import httplib2
+import google_auth_httplib2
+from googleapiclient.discovery import build, build_from_document
+from latency import endpoint_key, get_latency_stats
+
+POOL_SIZE = int(os.environ.get('CLASSROOM_HTTP_POOL_SIZE', '8'))
+HTTP_TIMEOUT = int(os.environ.get('CLASSROOM_HTTP_TIMEOUT', '60'))
+
+@lru_cache(maxsize=1)
+def _discovery_doc():
+    """
+    The bundled Classroom discovery document as JSON text, read from disk once
+    per process. build_from_document still parses it for every client: it
+    updates the parsed document in place, so one parsed copy can't be shared
+    between threads.
+    """
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+        return get_static_doc('classroom', 'v1')
+    except ImportError:
+        return None
+
+class RateLimitedHttp:
+    """Wraps an http object so each request first takes a token from limiter"""
+
+    def __init__(self, http, limiter):
+        self._wrapped = http
+        self._limiter = limiter
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        self._limiter.acquire(self._cost(uri, method, body))
+        return self._wrapped.request(uri, method=method, body=body, headers=headers, **kwargs)
+
+    @staticmethod
+    def _cost(uri, method, body):
+        """A batch request carries several API calls; charge for each of them"""
+        if method != 'POST' or not uri.endswith('/batch') or not body:
+            return 1
+        marker = b'Content-ID:' if isinstance(body, bytes) else 'Content-ID:'
+        return max(body.count(marker), 1)
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+class TimedHttp:
+    """Wraps an http object and records each request's latency by endpoint"""
+
+    def __init__(self, http, stats):
+        self._wrapped = http
+        self._stats = stats
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        started = time.monotonic()
+        try:
+            return self._wrapped.request(uri, method=method, body=body, headers=headers, **kwargs)
+        finally:
+            self._stats.record(endpoint_key(method, uri), time.monotonic() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+def authorized_http(creds, timeout=HTTP_TIMEOUT, limiter=None):
+    """An httplib2 connection that signs requests with creds"""
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=timeout))
+    # Timed inside the rate limiter, so waiting for a token isn't counted as latency
+    http = TimedHttp(http, get_latency_stats())
+    if limiter is not None:
+        http = RateLimitedHttp(http, limiter)
+    return http
+
+def build_classroom_service(creds, timeout=HTTP_TIMEOUT, limiter=None):
+    """Build a Classroom client with its own keep-alive connection"""
+    http = authorized_http(creds, timeout, limiter)
+    doc = _discovery_doc()
+    if doc:
+        return build_from_document(doc, http=http)
+    return build('classroom', 'v1', http=http, cache_discovery=False)
+
+def iter_pages(method, items_key, **kwargs):
+    """Yield each page's items of a list call, following nextPageToken"""
+    page_token = None
+    while True:
+        response = method(pageToken=page_token, **kwargs).execute()
+        yield response.get(items_key, [])
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return
+
+def iter_items(method, items_key, **kwargs):
+    """Yield every item of a paginated list call"""
+    for page in iter_pages(method, items_key, **kwargs):
+        yield from page
+
+class ClassroomClientPool:
+    """A bounded, thread-safe pool of Classroom clients"""
+
+    def __init__(self, creds, size=POOL_SIZE, timeout=HTTP_TIMEOUT, limiter=None):
+        self.creds = creds
+        self.size = size
+        self.timeout = timeout
+        self.limiter = limiter
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _new_client(self):
+        return build_classroom_service(self.creds, self.timeout, self.limiter)
+
+    @contextmanager
+    def client(self):
+        """Check out a client for exclusive use by the calling thread"""
+        self._slots.acquire()
+        try:
+            try:
+                service = self._idle.get_nowait()
+            except queue.Empty:
+                service = self._new_client()
+            try:
+                yield service
+            finally:
+                self._idle.put(service)
+        finally:
+            self._slots.release()
+
+    def map(self, fn, items):
+        """Run fn(service, item) for every item concurrently, preserving order"""
+        def call(item):
+            with self.client() as service:
+                return fn(service, item)
+
+        items = list(items)
+        if len(items) <= 1:
+            return [call(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.size, len(items))) as executor:
+            return list(executor.map(call, items))
+
+    def close(self):
+        """Close the connections of every idle client"""
+        while True:
+            try:
+                service = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            service._http.close()
@@ -1,57 +1,37 @@
-import json
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-
-# Setup OAuth
-SCOPES = [
-    'https://www.googleapis.com/auth/classroom.courses',
-    'https://www.googleapis.com/auth/classroom.courseworkmaterials',
-    'https://www.googleapis.com/auth/classroom.topics',
-    'https://www.googleapis.com/auth/classroom.coursework.students'
-]
-
-def authenticate():
-    flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-    creds = flow.run_local_server(port=0)
-    return build('classroom', 'v1', credentials=creds)
-
-def verify_import():
-    service = authenticate()
-    
-    # Get all courses
-    courses = service.courses().list().execute()
-    
-    # Find our imported course
-    imported_course = None
-    for course in courses.get('courses', []):
-        if 'November Cohort 2024' in course.get('name', ''):
-            imported_course = course
-            break
-    
-    if not imported_course:
-        print("❌ Imported course not found!")
-        return
-    
-    course_id = imported_course['id']
-    course_name = imported_course['name']
-    
-    print(f"✅ Found imported course: {course_name} (ID: {course_id})")
+import hashlib
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from accounts import AccountPool
+from manage_courses import load_course_records
+from mbz_to_json import parse_mbz
+from mirror import KINDS, get_mirror
+from moodle_json_to_google_classroom import convert_html_for_classroom, load_course_data, sanitize_topic_name
+
+# How many courses `verify --all` checks at once
+VERIFY_CONCURRENCY = 4
+
+DIFFERENCES = ('missing', 'extra', 'changed')
+
+def verify_course(service, course_id):
+    """Print what Classroom holds for course_id and return the item counts"""
+    # Read through the local mirror: only items changed since the last run are fetched
+    mirror = get_mirror()
     
     # Get topics
-    topics = service.courses().topics().list(courseId=course_id).execute()
-    print(f"\n📚 Topics found: {len(topics.get('topic', []))}")
+    topics = mirror.items(service, course_id, 'topic')
+    print(f"\n📚 Topics found: {len(topics)}")
     
-    for topic in topics.get('topic', []):
+    for topic in topics:
         topic_name = topic.get('name', 'Unknown')
         topic_id = topic.get('topicId', '')
         print(f"  - {topic_name} (ID: {topic_id})")
     
     # Get coursework (assignments)
-    coursework = service.courses().courseWork().list(courseId=course_id).execute()
-    print(f"\n📝 Classwork/Assignments found: {len(coursework.get('courseWork', []))}")
+    coursework = mirror.items(service, course_id, 'courseWork')
+    print(f"\n📝 Classwork/Assignments found: {len(coursework)}")
     
-    for work in coursework.get('courseWork', []):
+    for work in coursework:
         title = work.get('title', 'Unknown')
         work_type = work.get('workType', 'Unknown')
         state = work.get('state', 'Unknown')
@@ -64,8 +44,172 @@ def verify_import():
         print()
     
     # Get course materials
-    materials = service.courses().courseWorkMaterials().list(courseId=course_id).execute()
-    print(f"📋 Course materials found: {len(materials.get('courseWorkMaterial', []))}")
+    materials = mirror.items(service, course_id, 'material')
+    print(f"📋 Course materials found: {len(materials)}")
+    
+    return {
+        'topics': len(topics),
+        'courseWork': len(coursework),
+        'materials': len(materials)
+    }
+
+def content_hash(*parts):
+    """Hash of an item's visible content, ignoring line-ending and edge whitespace"""
+    normalized = '\0'.join((part or '').replace('\r\n', '\n').strip() for part in parts)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def expected_items(course_data):
+    """(kind, topic name, title) -> hashes of the items import_course creates from course_data"""
+    expected = {}
+    for topic in course_data['topics']:
+        topic_name = sanitize_topic_name(topic['name'])
+        expected.setdefault(('topic', topic_name, ''), []).append(content_hash(topic_name))
+        for kind, entries in (('courseWork', topic['assignments']), ('material', topic.get('activities', []))):
+            for entry in entries:
+                expected.setdefault((kind, topic_name, entry['title']), []).append(
+                    content_hash(entry['title'], convert_html_for_classroom(entry['description']))
+                )
+    return expected
+
+def live_items(items):
+    """The same mapping as expected_items, for what Classroom holds"""
+    topic_names = {topic['topicId']: topic.get('name', '') for topic in items['topic']}
+    live = {}
+    for name in topic_names.values():
+        live.setdefault(('topic', name, ''), []).append(content_hash(name))
+    for kind in ('courseWork', 'material'):
+        for item in items[kind]:
+            topic_name = topic_names.get(item.get('topicId'), '')
+            live.setdefault((kind, topic_name, item.get('title', '')), []).append(
+                content_hash(item.get('title'), item.get('description'))
+            )
+    return live
+
+def compare_items(expected, live):
+    """Keys of items missing from Classroom, extra in it, or with changed content"""
+    report = {name: [] for name in DIFFERENCES}
+    for key in sorted(set(expected) | set(live)):
+        want = Counter(expected.get(key, []))
+        have = Counter(live.get(key, []))
+        matched = sum((want & have).values())
+        unmatched_want = sum(want.values()) - matched
+        unmatched_have = sum(have.values()) - matched
+        # Same title and topic but different content counts as a change
+        changed = min(unmatched_want, unmatched_have)
+        report['changed'] += [key] * changed
+        report['missing'] += [key] * (unmatched_want - changed)
+        report['extra'] += [key] * (unmatched_have - changed)
+    return report
+
+def find_source(course_id):
+    """The source file recorded for course_id in class_data/courses.json"""
+    for record in load_course_records()['courses']:
+        if record['id'] == course_id:
+            return record.get('source_file')
+    return None
+
+def load_source(path):
+    if path.lower().endswith(('.mbz', '.zip', '.tar', '.gz')):
+        return parse_mbz(path)
+    return load_course_data(path)
+
+def fetch_course_items(clients, course_id, full=True):
+    """Topics, courseWork and materials of a course, each listed concurrently on its own client"""
+    mirror = get_mirror()
+    kinds = list(KINDS)
+    results = clients.map(lambda service, kind: mirror.items(service, course_id, kind, full=full), kinds)
+    return dict(zip(kinds, results))
+
+def check_course(clients, course_id, source=None, full=True):
+    """Compare a live course with the course JSON it was imported from"""
+    source = source or find_source(course_id)
+    items = fetch_course_items(clients, course_id, full)
+    report = {
+        'course_id': course_id,
+        'source': source,
+        'counts': {kind: len(found) for kind, found in items.items()},
+    }
+    if not source:
+        report['error'] = 'no source file recorded'
+    elif not os.path.exists(source):
+        report['error'] = f'source file not found: {source}'
+    else:
+        report.update(compare_items(expected_items(load_source(source)), live_items(items)))
+    return report
+
+def has_differences(report):
+    return bool(report.get('error')) or any(report.get(name) for name in DIFFERENCES)
+
+def describe_report(report):
+    """One line summarizing a check_course report"""
+    if report.get('error'):
+        return f"⚠️  {report['course_id']}: {report['error']}"
+    counts = ', '.join(f"{len(report[name])} {name}" for name in DIFFERENCES)
+    icon = '❌' if has_differences(report) else '✅'
+    return f"{icon} {report['course_id']}: {counts}"
+
+def print_report(report):
+    counts = report['counts']
+    print(f"📚 Topics: {counts['topic']}, 📝 Classwork: {counts['courseWork']}, 📋 Materials: {counts['material']}")
+    print(describe_report(report))
+    labels = {'missing': 'Missing from Classroom', 'extra': 'Not in source', 'changed': 'Content changed'}
+    for name in DIFFERENCES:
+        if report.get(name):
+            print(f"  {labels[name]}:")
+            for kind, topic_name, title in report[name]:
+                print(f"    - {kind}: {title or topic_name}" + (f" (topic: {topic_name})" if title else ""))
+
+def verify_courses(course_ids, full=True):
+    """Check many courses in parallel, each through the account that owns it"""
+    accounts = AccountPool.from_config()
+    
+    def check(course_id):
+        try:
+            return check_course(accounts.for_course(course_id).clients, course_id, full=full)
+        except Exception as e:
+            return {'course_id': course_id, 'counts': {}, 'error': str(e)}
+    
+    try:
+        with ThreadPoolExecutor(max_workers=VERIFY_CONCURRENCY) as executor:
+            return list(executor.map(check, course_ids))
+    finally:
+        accounts.close()
+
+def verify_import(course_id, source=None):
+    """Verify one course against its source JSON; returns True if it matches"""
+    accounts = AccountPool.from_config()
+    clients = accounts.for_course(course_id).clients
+    try:
+        with clients.client() as service:
+            course = get_mirror().course(course_id, service)
+        print(f"✅ Found imported course: {course['name']} (ID: {course_id})")
+        report = check_course(clients, course_id, source)
+    finally:
+        accounts.close()
+    print_report(report)
+    return not has_differences(report)
+
+def verify_all():
+    """Verify every course in the local registry; returns True if all match"""
+    course_ids = [record['id'] for record in load_course_records()['courses']]
+    print(f"🔎 Verifying {len(course_ids)} course(s)...")
+    reports = verify_courses(course_ids)
+    for report in reports:
+        print(describe_report(report))
+    failed = sum(1 for report in reports if has_differences(report))
+    print(f"\n📊 {len(reports) - failed} match, {failed} differ or could not be checked")
+    return failed == 0
 
 if __name__ == '__main__':
-    verify_import() 
\ No newline at end of file
+    import sys
+    
+    args = sys.argv[1:]
+    if '--all' in args:
+        sys.exit(0 if verify_all() else 1)
+    if not args:
+        print("Usage:")
+        print("  python verify_import.py <course_id> [--source FILE]   # Verify one course")
+        print("  python verify_import.py --all                         # Verify every recorded course")
+        sys.exit(1)
+    source = args[args.index('--source') + 1] if '--source' in args[:-1] else None
+    sys.exit(0 if verify_import(args[0], source) else 1)
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src', 'core'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Run each test in its own directory, since the scripts use relative class_data/ and temp_data/ paths"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
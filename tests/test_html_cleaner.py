@@ -0,0 +1,25 @@
+"""
+Regression tests for the opt-in HTML cleaner (src/core/html_cleaner.py).
+"""
+
+import pytest
+
+from html_cleaner import clean_html
+
+@pytest.mark.parametrize('source, cleaned', [
+    ('<xml><w:View/></xml><p>Hello</p>', '<p>Hello</p>'),
+    ('<title/>text after', 'text after'),
+    ('<xml><o:OfficeDocumentSettings><o:AllowPNG/></o:OfficeDocumentSettings></xml><p>Hi</p>', '<p>Hi</p>'),
+])
+def test_self_closing_tags_dont_swallow_what_follows(source, cleaned):
+    assert clean_html(source) == cleaned
+
+@pytest.mark.parametrize('source, cleaned', [
+    ('<ul><li>one<li>two</ul>', '<ul><li>one</li><li>two</li></ul>'),
+    ('<div><p>a<p>b</div>', '<div><p>a</p><p>b</p></div>'),
+    ('<table><tr><td>a<td>b</table>', '<table><tr><td>a</td><td>b</td></tr></table>'),
+    ('<table><tr><th>a<td>b<tr><td>c</table>',
+     '<table><tr><th>a</th><td>b</td></tr><tr><td>c</td></tr></table>'),
+])
+def test_unclosed_elements_are_closed_not_nested(source, cleaned):
+    assert clean_html(source) == cleaned
@@ -0,0 +1,100 @@
+"""
+Smoke tests for the pipeline on synthetic backups: generate -> parse_mbz ->
+markdown round trip -> import into the fake Classroom service.
+"""
+
+import json
+
+import pytest
+
+from attachments import AttachmentStore, LocalUploader
+from course_model import as_jsonable
+from fake_classroom import FakeClassroomService
+from mbz_to_json import parse_mbz
+from moodle_json_to_google_classroom import import_course, sanitize_topic_name
+from moodle_to_markdown import export_course_to_markdown, import_markdown_to_course
+from synthetic_mbz import generate_mbz
+
+SECTIONS = 4
+ACTIVITIES = 30
+
+def _items(course):
+    for topic in course.topics:
+        yield from topic.assignments
+        yield from topic.activities
+
+@pytest.fixture
+def course(workdir):
+    generate_mbz('course.mbz', sections=SECTIONS, activities=ACTIVITIES, seed=1)
+    return parse_mbz('course.mbz')
+
+def test_generated_backup_parses(course):
+    assert course.course_name == 'Synthetic Course 1'
+    assert len(course.topics) == SECTIONS
+    assert sum(1 for _ in _items(course)) == ACTIVITIES
+    assert all(topic.name for topic in course.topics)
+    assert {a.type for t in course.topics for a in t.activities} <= {'page', 'forum', 'resource'}
+
+def test_zip_and_tar_backups_parse_the_same(workdir):
+    generate_mbz('course.zip', sections=SECTIONS, activities=ACTIVITIES, seed=2)
+    generate_mbz('course.tar.gz', sections=SECTIONS, activities=ACTIVITIES, seed=2)
+    assert parse_mbz('course.zip') == parse_mbz('course.tar.gz')
+
+def test_embedded_files_are_stored_and_linked(workdir):
+    generate_mbz('files.mbz', sections=2, activities=10, file_size=1000, file_ratio=1.0, seed=3)
+    store = AttachmentStore('store', uploader=LocalUploader('published'))
+    course = parse_mbz('files.mbz', store)
+    descriptions = [item.description for item in _items(course)]
+    assert not any('@@PLUGINFILE@@' in d for d in descriptions)
+    assert all('file://' in d for d in descriptions)
+
+def test_markdown_round_trip(course, workdir):
+    export_course_to_markdown(course, 'markdown')
+    imported = import_markdown_to_course('markdown', use_cache=False)
+    assert imported.course_name == course.course_name
+    assert [t.name for t in imported.topics] == [t.name for t in course.topics]
+    # The markdown format carries assignments
+    assert [[a.title for a in t.assignments] for t in imported.topics] == \
+        [[a.title for a in t.assignments] for t in course.topics]
+
+def test_import_into_fake_classroom(course, workdir):
+    with open('course.json', 'w', encoding='utf-8') as f:
+        json.dump(course, f, default=as_jsonable)
+    service = FakeClassroomService()
+    result = import_course('course.json', service=service)
+
+    assert result['topics_count'] == SECTIONS
+    assert result['assignments_count'] == ACTIVITIES
+    course_id = result['course_id']
+    topics = service.items[('topics', course_id)]
+    assert {t['name'] for t in topics} == {sanitize_topic_name(t.name) for t in course.topics}
+    assert len(service.items.get(('courseWork', course_id), [])) == sum(len(t.assignments) for t in course.topics)
+    assert len(service.items.get(('courseWorkMaterials', course_id), [])) == \
+        sum(len(t.activities) for t in course.topics)
+    with open('class_data/courses.json', encoding='utf-8') as f:
+        assert [r['id'] for r in json.load(f)['courses']] == [course_id]
+
+def test_resumed_import_creates_nothing_twice(course, workdir):
+    with open('course.json', 'w', encoding='utf-8') as f:
+        json.dump(course, f, default=as_jsonable)
+    service = FakeClassroomService()
+    first = import_course('course.json', service=service)
+    again = import_course('course.json', service=service, course_id=first['course_id'])
+
+    assert again['assignments_count'] == ACTIVITIES
+    assert service.calls['courses.create'] == 1
+    assert len(service.items[('topics', first['course_id'])]) == SECTIONS
+
+def test_resumed_import_creates_missing_duplicate_titles(workdir):
+    assignment = {'title': 'Reading', 'description': '<p>Read</p>'}
+    data = {'course_name': 'Repeats', 'topics': [{'name': 'Week 1', 'assignments': [assignment, assignment]}]}
+    with open('course.json', 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    service = FakeClassroomService()
+    first = import_course('course.json', service=service)
+    course_id = first['course_id']
+    # As if the import stopped after the first of the two
+    service.items[('courseWork', course_id)].pop()
+    import_course('course.json', service=service, course_id=course_id)
+
+    assert [w['title'] for w in service.items[('courseWork', course_id)]] == ['Reading', 'Reading']